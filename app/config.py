@@ -1,7 +1,23 @@
 import os
+from typing import Dict, Optional
+
 from app.storage_backends.file_storage import FileStorage
 from app.storage_backends.db_storage import DBStorage
 from app.storage_backends.minio_storage import MinioStorage
+from app.storage_backends.cached_storage import CachedStorage
+from app.storage_backends.coalescing_storage import CoalescingStorage
+from app.storage_backends.disk_cache import DiskCache
+from app.storage_backends.disk_cached_storage import DiskCachedStorage
+from app.storage_backends.indexed_storage import IndexedStorage
+from app.storage_backends.io_pool import IOPool
+from app.storage_backends.metadata_index import MetadataIndex
+from app.storage_backends.object_cache import ObjectCache
+from app.storage_backends.tiered_storage import TieredStorage
+from app.services.gltf_compaction import GltfCompactor
+from app.services.gltf_conversion import GlbConverter
+from app.services.gltf_index import GltfIndexer
+from app.services.lod_generation import LodGenerator
+from app.services.precompression import Precompressor
 
 
 def get_storage_backend():
@@ -11,11 +27,46 @@ def get_storage_backend():
     storage implementation. Supports hot-swapping storage backends without code changes.
 
     Environment Variables:
-        STORAGE_BACKEND (str): Storage system to use (file/db/minio) - default: file
-        MINIO_ENDPOINT (str): [minio] Server URL - default: minio:9000
-        MINIO_ACCESS_KEY (str): [minio] Access key - default: minio
-        MINIO_SECRET_KEY (str): [minio] Secret key - default: minio123
-        MINIO_BUCKET_NAME (str): [minio] Target bucket - default: 3d-files
+        STORAGE_BACKEND (str): Storage system to use (file/db/minio/tiered) - default: file
+        FILE_SENDFILE (str): [file/tiered] Let the server send files zero-copy (true/false) - default: true
+        FILE_VOLUMES (str): [file/tiered] Comma-separated volume roots files are spread over, each optionally
+            weighted as "<root>:<weight>", e.g. "/mnt/nvme0/3d:1,/mnt/nvme1/3d:2" - default: /tmp/3d_objects/
+        FILE_IO_WORKERS (int): [file/tiered] Threads running blocking filesystem calls, per volume - default: 16
+        FILE_IO_QUEUE (int): [file/tiered] Filesystem calls allowed to wait for a thread before callers block,
+            per volume - default: 256
+        FILE_FANOUT_LEVELS (int): [file/tiered] Hashed directory levels files are spread over, 0 flat - default: 2
+        FILE_FANOUT_WIDTH (int): [file/tiered] Hex digits naming the directories of each level (1-4) - default: 2
+        DEDUP (str): [file/minio] Store identical content once, shared by all its items (true/false) - default: false
+        DB_LAYOUT (str): [db] Content layout for new uploads (blob/chunks) - default: blob
+        MINIO_ENDPOINT (str): [minio/tiered] Server URL - default: minio:9000
+        MINIO_ACCESS_KEY (str): [minio/tiered] Access key - default: minio
+        MINIO_SECRET_KEY (str): [minio/tiered] Secret key - default: minio123
+        MINIO_BUCKET_NAME (str): [minio/tiered] Target bucket - default: 3d-files
+        MINIO_MAX_WORKERS (int): [minio/tiered] Threads running blocking client calls - default: 32
+        MINIO_POOL_SIZE (int): [minio/tiered] HTTP connections kept open to MinIO - default: 64
+        MINIO_PART_SIZE (int): [minio/tiered] Single-PUT limit and multipart part size in bytes, buffered in
+            memory per upload - default: 8 MiB
+        MINIO_PRESIGN_TTL (int): [minio/tiered] Redirect downloads to presigned URLs valid this long (s), 0 proxies - default: 0
+        MINIO_PUBLIC_ENDPOINT (str): [minio/tiered] MinIO host as reachable by clients - default: MINIO_ENDPOINT
+        MINIO_REGION (str): [minio/tiered] Region signed into presigned URLs - default: us-east-1
+        TIER_INGEST (str): [tiered] Tier storing new uploads (file/minio) - default: file
+        TIER_HOT_MAX_BYTES (int): [tiered] Bytes of originals kept on the file tier - default: 10 GiB
+        TIER_PROMOTE_HITS (float): [tiered] Decayed reads moving an item to the file tier - default: 5
+        TIER_DEMOTE_HITS (float): [tiered] Decayed reads below which an item moves to MinIO - default: 1
+        TIER_HALF_LIFE (int): [tiered] Seconds in which read counters halve - default: 3600
+        TIER_MIN_RESIDENCY (int): [tiered] Seconds an item read or uploaded stays on the file tier - default: 3600
+        TIER_INTERVAL (int): [tiered] Seconds between promotion/demotion passes - default: 60
+        TIER_FLUSH_INTERVAL (int): [tiered] Seconds between writes of the read counters - default: 10
+        TIER_RATE_BYTES (int): [tiered] Bytes moved between tiers per second, 0 unthrottled - default: 50 MiB
+        TIER_MAX_MOVES (int): [tiered] Items moved per pass - default: 100
+        TIER_GRACE (int): [tiered] Seconds the old copy of a moved item is kept for reads in flight - default: 300
+        DISK_CACHE_DIR (str): [db/minio] Local directory for a persistent read-through cache, empty disables it
+        DISK_CACHE_MAX_BYTES (int): [db/minio] Disk cache budget in bytes - default: 10 GiB
+        METADATA_INDEX (str): Resolve downloads from an in-memory metadata index (true/false) - default: true
+        COALESCE_REQUESTS (str): Share lookups/streams between concurrent downloads (true/false) - default: true
+        COALESCE_WINDOW (int): Chunks buffered per reader of a shared stream - default: 4
+        CACHE_MAX_BYTES (int): In-memory object cache budget in bytes, 0 disables it - default: 0
+        CACHE_MAX_OBJECT_BYTES (int): Largest object admitted to the cache - default: CACHE_MAX_BYTES / 4
 
     Returns:
         StorageInterface: Concrete storage implementation instance
@@ -25,15 +76,224 @@ def get_storage_backend():
         RuntimeError: If required environment variables are missing
     """
     backend = os.getenv("STORAGE_BACKEND", "file")
+    dedup = os.getenv("DEDUP", "false").lower() == "true"
     if backend == "file":
-        return FileStorage()
+        storage = _file_storage(dedup)
     elif backend == "db":
-        return DBStorage()
+        storage = DBStorage(layout=os.getenv("DB_LAYOUT", "blob"))
     elif backend == "minio":
-        endpoint = os.getenv("MINIO_ENDPOINT", "minio:9000")
-        access_key = os.getenv("MINIO_ACCESS_KEY", "minio")
-        secret_key = os.getenv("MINIO_SECRET_KEY", "minio123")
-        bucket_name = os.getenv("MINIO_BUCKET_NAME", "3d-files")
-        return MinioStorage(endpoint, access_key, secret_key, bucket_name)
+        storage = _minio_storage(dedup)
+    elif backend == "tiered":
+        # Moved content is owned by one item, so the tiers store uploads without deduplication
+        storage = TieredStorage(
+            _file_storage(dedup=False),
+            _minio_storage(dedup=False),
+            DBStorage(),
+            ingest=os.getenv("TIER_INGEST", "file"),
+            hot_max_bytes=int(os.getenv("TIER_HOT_MAX_BYTES", str(10 * 1024 ** 3))),
+            promote_hits=float(os.getenv("TIER_PROMOTE_HITS", "5")),
+            demote_hits=float(os.getenv("TIER_DEMOTE_HITS", "1")),
+            half_life=float(os.getenv("TIER_HALF_LIFE", "3600")),
+            min_residency=float(os.getenv("TIER_MIN_RESIDENCY", "3600")),
+            interval=float(os.getenv("TIER_INTERVAL", "60")),
+            flush_interval=float(os.getenv("TIER_FLUSH_INTERVAL", "10")),
+            rate_bytes=int(os.getenv("TIER_RATE_BYTES", str(50 * 1024 ** 2))),
+            max_moves=int(os.getenv("TIER_MAX_MOVES", "100")),
+            grace=float(os.getenv("TIER_GRACE", "300"))
+        )
     else:
         raise ValueError(f"Unknown storage backend: {backend}")
+
+    disk_cache_dir = os.getenv("DISK_CACHE_DIR", "")
+    if disk_cache_dir and backend in ("db", "minio"):
+        disk_cache_max_bytes = int(os.getenv("DISK_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+        storage = DiskCachedStorage(storage, DiskCache(disk_cache_dir, disk_cache_max_bytes))
+
+    if os.getenv("METADATA_INDEX", "true").lower() == "true":
+        storage = IndexedStorage(storage, MetadataIndex())
+
+    if os.getenv("COALESCE_REQUESTS", "true").lower() == "true":
+        storage = CoalescingStorage(storage, window=int(os.getenv("COALESCE_WINDOW", "4")))
+
+    cache_max_bytes = int(os.getenv("CACHE_MAX_BYTES", "0"))
+    if cache_max_bytes > 0:
+        cache_max_object_bytes = int(os.getenv("CACHE_MAX_OBJECT_BYTES", str(cache_max_bytes // 4)))
+        storage = CachedStorage(storage, ObjectCache(cache_max_bytes, cache_max_object_bytes))
+
+    return storage
+
+
+def _file_storage(dedup: bool) -> FileStorage:
+    """Builds the file backend from the FILE_* variables (see get_storage_backend)."""
+    return FileStorage(
+        sendfile=os.getenv("FILE_SENDFILE", "true").lower() == "true",
+        io_pools=lambda root: IOPool(
+            max_workers=int(os.getenv("FILE_IO_WORKERS", "16")),
+            max_queue=int(os.getenv("FILE_IO_QUEUE", "256")),
+            name="file-io"
+        ),
+        dedup=dedup,
+        fanout_levels=int(os.getenv("FILE_FANOUT_LEVELS", "2")),
+        fanout_width=int(os.getenv("FILE_FANOUT_WIDTH", "2")),
+        volumes=get_file_volumes()
+    )
+
+
+def get_file_volumes() -> Optional[Dict[str, float]]:
+    """Parses FILE_VOLUMES (see get_storage_backend) into the weight of each volume root.
+
+    Returns:
+        Dict[str, float] | None: Weight of each root, None if no volumes are configured
+
+    Raises:
+        ValueError: For malformed weights or duplicate roots
+    """
+    volumes = {}
+    for entry in os.getenv("FILE_VOLUMES", "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        root, sep, weight = entry.rpartition(":")
+        if not sep:
+            root, weight = entry, "1"
+        root = os.path.normpath(root)
+        if root in volumes:
+            raise ValueError(f"FILE_VOLUMES lists {root} twice")
+        volumes[root] = float(weight)
+    return volumes or None
+
+
+def _minio_storage(dedup: bool) -> MinioStorage:
+    """Builds the MinIO backend from the MINIO_* variables (see get_storage_backend)."""
+    return MinioStorage(
+        os.getenv("MINIO_ENDPOINT", "minio:9000"),
+        os.getenv("MINIO_ACCESS_KEY", "minio"),
+        os.getenv("MINIO_SECRET_KEY", "minio123"),
+        os.getenv("MINIO_BUCKET_NAME", "3d-files"),
+        max_workers=int(os.getenv("MINIO_MAX_WORKERS", "32")),
+        pool_size=int(os.getenv("MINIO_POOL_SIZE", "64")),
+        part_size=int(os.getenv("MINIO_PART_SIZE", str(8 * 1024 ** 2))),
+        presign_ttl=int(os.getenv("MINIO_PRESIGN_TTL", "0")),
+        public_endpoint=os.getenv("MINIO_PUBLIC_ENDPOINT") or None,
+        region=os.getenv("MINIO_REGION", "us-east-1"),
+        dedup=dedup
+    )
+
+
+def get_precompressor(storage):
+    """Factory function for the builder of precompressed download variants.
+
+    Environment Variables:
+        PRECOMPRESS_ENCODINGS (str): Comma-separated content codings to offer (br, zstd, gzip), empty disables
+        PRECOMPRESS_AT_INGEST (str): Build variants right after upload instead of on first request (true/false) - default: true
+        PRECOMPRESS_WORKERS (int): Threads compressing variants - default: 2
+
+    Args:
+        storage: Storage backend holding originals and variants
+
+    Returns:
+        Precompressor: Variant builder (offering no encodings if disabled)
+    """
+    encodings = [encoding.strip() for encoding in os.getenv("PRECOMPRESS_ENCODINGS", "").split(",") if encoding.strip()]
+    return Precompressor(
+        storage,
+        encodings,
+        at_ingest=os.getenv("PRECOMPRESS_AT_INGEST", "true").lower() == "true",
+        workers=int(os.getenv("PRECOMPRESS_WORKERS", "2"))
+    )
+
+
+def get_glb_converter(storage):
+    """Factory function for the builder of binary GLB variants of glTF uploads.
+
+    Environment Variables:
+        GLB_CONVERSION (str): Convert .gltf uploads to GLB variants (true/false) - default: false
+        GLB_AT_INGEST (str): Convert right after upload instead of on first request (true/false) - default: true
+        GLB_WORKERS (int): Threads converting files - default: 2
+        GLB_MAX_BYTES (int): Largest .gltf file converted (held in memory) - default: 512 MiB
+
+    Args:
+        storage: Storage backend holding originals and variants
+
+    Returns:
+        GlbConverter: Variant builder (building nothing if disabled)
+    """
+    return GlbConverter(
+        storage,
+        enabled=os.getenv("GLB_CONVERSION", "false").lower() == "true",
+        at_ingest=os.getenv("GLB_AT_INGEST", "true").lower() == "true",
+        workers=int(os.getenv("GLB_WORKERS", "2")),
+        max_bytes=int(os.getenv("GLB_MAX_BYTES", str(512 * 1024 ** 2)))
+    )
+
+
+def get_gltf_indexer(storage, glb_converter):
+    """Factory function for the indexer of the byte layout of glTF/GLB uploads.
+
+    Environment Variables:
+        GLTF_INDEX_AT_INGEST (str): Index right after upload instead of on first request (true/false) - default: true
+
+    Args:
+        storage: Storage backend holding originals and variants
+        glb_converter: Builder of the GLB variants .gltf uploads are indexed through
+
+    Returns:
+        GltfIndexer: Indexer of .glb uploads (and of .gltf uploads if GLB conversion is enabled)
+    """
+    return GltfIndexer(
+        storage,
+        glb_converter,
+        at_ingest=os.getenv("GLTF_INDEX_AT_INGEST", "true").lower() == "true"
+    )
+
+
+def get_gltf_compactor(storage):
+    """Factory function for the builder of compact (quantized, stripped) GLB variants.
+
+    Environment Variables:
+        GLTF_COMPACTION (str): Optimise .gltf/.glb uploads into compact variants (true/false) - default: false
+        GLTF_COMPACTION_AT_INGEST (str): Optimise right after upload instead of on first request (true/false) - default: true
+        GLTF_COMPACTION_WORKERS (int): Threads optimising models - default: 2
+        GLTF_COMPACTION_MAX_BYTES (int): Largest model optimised (held in memory) - default: 512 MiB
+
+    Args:
+        storage: Storage backend holding originals and variants
+
+    Returns:
+        GltfCompactor: Variant builder (building nothing if disabled)
+    """
+    return GltfCompactor(
+        storage,
+        enabled=os.getenv("GLTF_COMPACTION", "false").lower() == "true",
+        at_ingest=os.getenv("GLTF_COMPACTION_AT_INGEST", "true").lower() == "true",
+        workers=int(os.getenv("GLTF_COMPACTION_WORKERS", "2")),
+        max_bytes=int(os.getenv("GLTF_COMPACTION_MAX_BYTES", str(512 * 1024 ** 2)))
+    )
+
+
+def get_lod_generator(storage):
+    """Factory function for the builder of level-of-detail variants.
+
+    Environment Variables:
+        LOD_GRIDS (str): Comma-separated vertex clustering grid resolutions of LOD 1, 2, ... (finest first),
+            e.g. "64,32,16" - default: empty (disabled)
+        LOD_AT_INGEST (str): Generate all levels right after upload instead of on first request (true/false) - default: true
+        LOD_WORKERS (int): Threads simplifying models - default: 2
+        LOD_MAX_BYTES (int): Largest model simplified (held in memory) - default: 512 MiB
+
+    Args:
+        storage: Storage backend holding originals and variants
+
+    Returns:
+        LodGenerator: Variant builder (building nothing if no levels are configured)
+    """
+    grids = [int(grid) for grid in os.getenv("LOD_GRIDS", "").split(",") if grid.strip()]
+    if any(grid < 1 for grid in grids):
+        raise ValueError("LOD_GRIDS must be positive integers")
+    return LodGenerator(
+        storage,
+        grids,
+        at_ingest=os.getenv("LOD_AT_INGEST", "true").lower() == "true",
+        workers=int(os.getenv("LOD_WORKERS", "2")),
+        max_bytes=int(os.getenv("LOD_MAX_BYTES", str(512 * 1024 ** 2)))
+    )
@@ -1,20 +1,23 @@
-import os
 from contextlib import asynccontextmanager
 
 from app.models import init_db
 
 from fastapi import FastAPI
 
-from app.routes import item_routes
+from app.routes import item_routes, storage_routes
+from app.services.item_service import ItemService
 
 
 @asynccontextmanager
 async def lifespan(fast_api: FastAPI):
-    if os.getenv("STORAGE_BACKEND") == "db":
-        await init_db()
+    # Every backend keeps metadata (items, blobs, variants, access counters) in the database
+    await init_db()
+    await ItemService.startup()
     yield
+    await ItemService.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
 
 app.include_router(item_routes.router)
+app.include_router(storage_routes.router)
@@ -1,9 +1,13 @@
 import enum
 import os
+from typing import List
 
-from sqlalchemy import Column, Integer, String, inspect, LargeBinary, Enum
+from sqlalchemy import (
+    Column, Integer, String, inspect, LargeBinary, Enum, BigInteger, text, select, lambda_stmt, ForeignKey, DDL, event,
+    UniqueConstraint, JSON, Float
+)
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import declarative_base, deferred
 
 # Database-Connection Settings and Session setup
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -15,6 +19,9 @@ engine = create_async_engine(
     pool_recycle=300
 )
 
+# Advisory lock serialising schema creation and migration across worker processes (PostgreSQL)
+SCHEMA_LOCK = 0x736368656d61
+
 SessionLocal = async_sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -44,14 +51,19 @@ class Item(Base):
         id (int): Auto-incremented primary key identifier
         name (str): Human-readable display name for the file
         filename (str): Original filename with extension
-        storage_type (StorageTypeEnum): Storage backend used for this file
+        storage_type (StorageTypeEnum): Storage backend (tier) currently holding this file
         path_or_key (str | None):
             - Filesystem path (for 'file' storage_type)
             - Object storage key (for 'minio' storage_type)
-            - Null for 'db' storage_type
+            - Location of a shared Blob for deduplicated 'file'/'minio' content
+            - 'item_chunks' for 'db' storage_type with chunked content (see ItemChunk)
+            - Null for 'db' storage_type with the content in the BLOB column
         content (bytes | None):
             - Raw file content (only populated for 'db' storage_type)
             - Null for 'file' and 'minio' storage_types
+            - Deferred: never loaded with the row, only read explicitly
+        size_bytes (int | None): Content size in bytes, measured during upload
+        content_hash (str | None): Hex SHA-256 digest of the content, computed during upload
     """
     __tablename__ = "items"
 
@@ -60,11 +72,225 @@ class Item(Base):
     filename = Column(String, nullable=False)
     storage_type = Column(Enum(StorageTypeEnum), nullable=False)
     path_or_key = Column(String, nullable=True)  # für file/minio
-    content = Column(LargeBinary, nullable=True)  # nur für db
+    content = deferred(Column(LargeBinary, nullable=True))  # nur für db
+    size_bytes = Column(BigInteger, nullable=True)
+    content_hash = Column(String(64), nullable=True)
+
+
+class Blob(Base):
+    """Reference-counted, content-addressed payload shared by items with identical content.
+
+    Attributes:
+        content_hash (str): Hex SHA-256 digest of the content (primary key)
+        location (str): Filesystem path or object key of the stored payload
+        size (int): Content size in bytes
+        refcount (int): Number of Item records referencing the payload
+    """
+    __tablename__ = "blobs"
+
+    content_hash = Column(String(64), primary_key=True)
+    location = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    refcount = Column(Integer, nullable=False)
+
+
+class ItemVariant(Base):
+    """Derived representation of an item's content (e.g. a precompressed copy).
+
+    Variants are stored by the backend of their item, the same way it stores
+    originals, and are deleted with the item.
+
+    Attributes:
+        id (int): Auto-incremented primary key identifier
+        item_id (int): Item the variant was derived from
+        name (str): Variant identifier, unique per item (e.g. 'gzip', 'br')
+        filename (str): Filename offered for the download of the variant
+        encoding (str | None): HTTP content coding of the variant, if any
+        path_or_key (str | None): Filesystem path or object key (Null for 'db' storage_type)
+        storage_type (StorageTypeEnum | None): Storage tier holding the content (Null: that of the item)
+        content (bytes | None): Raw variant content (only populated for 'db' storage_type)
+        size_bytes (int): Variant size in bytes
+        content_hash (str): Hex SHA-256 digest of the variant content
+        report (dict | None): Build details, e.g. bytes saved by an optimisation
+    """
+    __tablename__ = "item_variants"
+    __table_args__ = (UniqueConstraint("item_id", "name"),)
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(32), nullable=False)
+    filename = Column(String, nullable=False)
+    encoding = Column(String(16), nullable=True)
+    path_or_key = Column(String, nullable=True)
+    storage_type = Column(Enum(StorageTypeEnum), nullable=True)
+    content = deferred(Column(LargeBinary, nullable=True))
+    size_bytes = Column(BigInteger, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    report = Column(JSON, nullable=True)
+
+
+class ItemAccess(Base):
+    """Decaying read counter of an item, deciding its storage tier (see TieredStorage).
+
+    Reads are counted in memory and added in batches. Counters decay lazily
+    (see AccessCounter.decayed); the tiering pass drops those that decayed
+    to almost zero.
+
+    Attributes:
+        item_id (int): Counted Item record (primary key); deleted with it
+        hits (float): Reads, decayed with the configured half-life up to ``accessed_at``
+        accessed_at (int): Unix time of the last flushed read
+    """
+    __tablename__ = "item_accesses"
+
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    hits = Column(Float, nullable=False)
+    accessed_at = Column(BigInteger, nullable=False)
+
+
+class RetiredObject(Base):
+    """Old copy of an item moved to another storage tier, removed once its grace period is over (see TieredStorage).
+
+    Kept in the database rather than in the moving process, so copies are
+    still removed after that process stopped or crashed.
+
+    Attributes:
+        id (int): Auto-incremented primary key identifier
+        storage_type (str): Tier holding the copy ('file' or 'minio')
+        location (str): Filesystem path or object key of the copy
+        due_at (int): Unix time from which the copy is removed, unless an item refers to it again
+    """
+    __tablename__ = "retired_objects"
+
+    id = Column(Integer, primary_key=True)
+    storage_type = Column(String(16), nullable=False)
+    location = Column(String, nullable=False)
+    due_at = Column(BigInteger, nullable=False, index=True)
+
+
+class GltfIndex(Base):
+    """Byte layout of a glTF/GLB item, so its parts can be served without parsing it again.
+
+    Offsets refer to the GLB file the index was built from: the original for
+    .glb uploads, the 'glb' variant for .gltf uploads.
+
+    Attributes:
+        item_id (int): Indexed Item record (primary key); deleted with it
+        variant (str | None): Variant the offsets refer to (Null for the original)
+        size_bytes (int): Size of the indexed file
+        json_offset (int): Position of the JSON chunk payload
+        json_length (int): Length of the JSON chunk payload
+        buffers (list): [offset, length] of each buffer, Null for buffers outside the file
+        buffer_views (list): [offset, length] of each buffer view, Null for views of such buffers
+    """
+    __tablename__ = "gltf_indexes"
+
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    variant = Column(String(32), nullable=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    json_offset = Column(BigInteger, nullable=False)
+    json_length = Column(BigInteger, nullable=False)
+    buffers = Column(JSON, nullable=False)
+    buffer_views = Column(JSON, nullable=False)
+
+
+class ItemChunk(Base):
+    """Fixed-size slice of an item's content for the chunked 'db' storage layout.
+
+    Attributes:
+        item_id (int): Owning Item record; chunks are deleted with it
+        seq (int): Position of the chunk within the content, starting at 0
+        data (bytes): Chunk payload; all chunks but the last have the same size
+    """
+    __tablename__ = "item_chunks"
+
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+
+
+# 3D payloads are mostly compressed already: store content out of line without
+# TOAST compression, which also lets substr() fetch only the TOAST slices it needs
+# (with compressed values, every ranged read decompresses from the start of the value)
+EXTERNAL_STORAGE_COLUMNS = [
+    (Item.__table__, "content"),
+    (ItemVariant.__table__, "content"),
+    (ItemChunk.__table__, "data"),
+]
+for _table, _column in EXTERNAL_STORAGE_COLUMNS:
+    event.listen(
+        _table,
+        "after_create",
+        DDL(f"ALTER TABLE {_table.name} ALTER COLUMN {_column} SET STORAGE EXTERNAL").execute_if(dialect="postgresql")
+    )
+
+
+def _set_external_storage(sync_conn):
+    """Switches the content columns of tables created before they were stored uncompressed.
+
+    Only affects values written afterwards; existing values keep their compressed form.
+    Columns already stored externally are left alone, as the ALTER takes an
+    ACCESS EXCLUSIVE lock on the table.
+    """
+    if sync_conn.dialect.name != "postgresql":
+        return
+    for table, column in EXTERNAL_STORAGE_COLUMNS:
+        storage = sync_conn.execute(
+            text("SELECT attstorage FROM pg_attribute WHERE attrelid = CAST(:table AS regclass) AND attname = :column"),
+            {"table": table.name, "column": column}
+        ).scalar()
+        if storage != "e":
+            sync_conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column} SET STORAGE EXTERNAL"))
+
+
+def _add_missing_columns(sync_conn):
+    """Adds nullable columns introduced after a table was first created."""
+    inspector = inspect(sync_conn)
+    for table in (Item.__table__, ItemVariant.__table__):
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=sync_conn.dialect)
+                sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                print(f"Spalte {column.name} hinzugefügt.")
+
+
+async def get_item_meta(db: AsyncSession, item_id: int):
+    """Fetches the columns needed to serve an item, without the BLOB, in one query.
+
+    The statement is built as a lambda statement, so its compiled form is cached
+    and only the id parameter changes between calls.
+
+    Returns:
+        Row | None: Row with id, filename, storage_type, path_or_key, size_bytes
+            and content_hash, or None if the item does not exist
+    """
+    stmt = lambda_stmt(lambda: select(
+        Item.id, Item.filename, Item.storage_type, Item.path_or_key, Item.size_bytes, Item.content_hash
+    ).where(Item.id == item_id))
+    return (await db.execute(stmt)).first()
+
+
+async def get_items_meta(db: AsyncSession, item_ids: List[int]) -> list:
+    """Fetches the columns of :func:`get_item_meta` for several items in one query.
+
+    Returns:
+        list: Rows of the items that exist, in no particular order
+    """
+    if not item_ids:
+        return []
+    return (await db.execute(select(
+        Item.id, Item.filename, Item.storage_type, Item.path_or_key, Item.size_bytes, Item.content_hash
+    ).where(Item.id.in_(item_ids)))).all()
 
 
 async def init_db():
     async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Workers start concurrently: one creates or migrates the schema, the others wait and find it done
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK})
         table_exists = await conn.run_sync(
             lambda sync_conn: inspect(sync_conn).has_table("items")
         )
@@ -73,6 +299,10 @@ async def init_db():
             await conn.run_sync(Base.metadata.create_all)
             print("Datenbank-Schema erfolgreich erstellt.")
         else:
+            await conn.run_sync(_add_missing_columns)
+            # Creates tables introduced after the schema was first created
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_set_external_storage)
             print("Schema existiert bereits.")
 
 
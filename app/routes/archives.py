@@ -0,0 +1,238 @@
+import asyncio
+import os
+import struct
+import time
+import uuid
+import zlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from app.routes.ranges import RangeReader
+from app.storage_backends.base_interface import StoredObject
+
+# Files read ahead of the one being sent, and chunks buffered per file; together
+# they bound the memory of a bulk download regardless of the number of files
+PREFETCH_FILES = 4
+PREFETCH_CHUNKS = 4
+
+# Sizes and offsets from this value on need ZIP64 records
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_VERSION = 20
+ZIP64_VERSION = 45
+# Bit 3: CRC-32 and sizes follow the data in a data descriptor; bit 11: UTF-8 names
+ZIP_FLAGS = 0x0808
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+ZIP64_END_OF_CENTRAL_DIRECTORY = struct.Struct("<IQHHIIQQQQ")
+ZIP64_LOCATOR = struct.Struct("<IIQI")
+
+
+async def prefetched(
+        objects: List[StoredObject],
+        read: RangeReader,
+        window: int = PREFETCH_FILES,
+        depth: int = PREFETCH_CHUNKS
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Streams the content of several files in order, reading ahead of the one being sent.
+
+    Reads of up to ``window`` files run at the same time, each buffering at
+    most ``depth`` chunks, so slow backend reads overlap while memory stays
+    bounded by ``window * depth`` chunks.
+
+    Args:
+        objects: Handles of the files, in output order
+        read: Callable streaming ``length`` bytes of a file starting at ``offset``
+        window: Files read at the same time
+        depth: Chunks buffered per file
+
+    Yields:
+        Tuple of the position of the file in ``objects`` and its next chunk;
+        None as chunk after the last chunk of each file
+    """
+    end = object()
+    queues: Dict[int, asyncio.Queue] = {}
+    tasks: Dict[int, asyncio.Task] = {}
+
+    async def fill(position: int) -> None:
+        obj = objects[position]
+        try:
+            async for chunk in read(obj, 0, obj.size):
+                await queues[position].put(chunk)
+            await queues[position].put(end)
+        except Exception as e:
+            await queues[position].put(e)
+
+    try:
+        for position in range(len(objects)):
+            for ahead in range(position, min(position + window, len(objects))):
+                if ahead not in tasks:
+                    queues[ahead] = asyncio.Queue(depth)
+                    tasks[ahead] = asyncio.ensure_future(fill(ahead))
+            while True:
+                chunk = await queues[position].get()
+                if chunk is end:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield position, chunk
+            yield position, None
+            del queues[position], tasks[position]
+    finally:
+        # The client went away or a read failed: stop reading ahead
+        for task in tasks.values():
+            task.cancel()
+
+
+def archive_name(obj: StoredObject) -> str:
+    """Returns the path of a file within a bulk download: ``<item id>/<filename>``."""
+    return f"{obj.item_id}/{os.path.basename(obj.filename)}"
+
+
+def content_disposition(filename: str) -> str:
+    """Returns an ``attachment`` Content-Disposition value for a stored file name (RFC 6266).
+
+    CR and LF are dropped, so a name cannot end the header; ``filename`` holds
+    an ASCII fallback with quotes and backslashes escaped, ``filename*`` the
+    percent-encoded UTF-8 name.
+    """
+    name = os.path.basename(filename).replace("\r", "").replace("\n", "")
+    fallback = name.encode("ascii", "replace").decode("ascii").replace("\\", "\\\\").replace('"', '\\"')
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+
+def _dos_timestamp(timestamp: float) -> Tuple[int, int]:
+    t = time.localtime(timestamp)
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), \
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def zip_archive(
+        objects: List[StoredObject],
+        read: RangeReader,
+        window: int = PREFETCH_FILES
+) -> Tuple[int, AsyncIterator[bytes]]:
+    """Streams files as an uncompressed (stored) zip archive.
+
+    Files are not recompressed: 3D payloads mostly are compressed already, and
+    stored entries let the archive size be computed upfront. CRC-32 checksums
+    are computed while streaming and sent in data descriptors after each file.
+    ZIP64 records are used where sizes, offsets or the number of files need them.
+
+    Args:
+        objects: Handles of the files, in archive order
+        read: Callable streaming ``length`` bytes of a file starting at ``offset``
+        window: Files read ahead (see :func:`prefetched`)
+
+    Returns:
+        Tuple of the archive size in bytes and an async iterator over its content
+    """
+    clock, date = _dos_timestamp(time.time())
+    names = [archive_name(obj).encode("utf-8") for obj in objects]
+    offsets, zip64 = [], []
+    offset = 0
+    for obj, name in zip(objects, names):
+        large = obj.size >= ZIP64_LIMIT or offset >= ZIP64_LIMIT
+        offsets.append(offset)
+        zip64.append(large)
+        offset += LOCAL_HEADER.size + len(name) + (20 if large else 0) + obj.size + (24 if large else 16)
+    directory_offset = offset
+    directory_size = sum(
+        CENTRAL_HEADER.size + len(name) + (28 if large else 0) for name, large in zip(names, zip64)
+    )
+    end_records = END_OF_CENTRAL_DIRECTORY.size
+    zip64_end = len(objects) >= 0xFFFF or directory_offset >= ZIP64_LIMIT or directory_size >= ZIP64_LIMIT
+    if zip64_end:
+        end_records += ZIP64_END_OF_CENTRAL_DIRECTORY.size + ZIP64_LOCATOR.size
+
+    def local_header(position: int) -> bytes:
+        name, large = names[position], zip64[position]
+        header = LOCAL_HEADER.pack(
+            0x04034B50, ZIP64_VERSION if large else ZIP_VERSION, ZIP_FLAGS, 0, clock, date, 0,
+            ZIP64_LIMIT if large else 0, ZIP64_LIMIT if large else 0, len(name), 20 if large else 0
+        ) + name
+        return header + struct.pack("<HHQQ", 0x0001, 16, 0, 0) if large else header
+
+    def central_header(position: int, crc: int) -> bytes:
+        name, large, size = names[position], zip64[position], objects[position].size
+        header = CENTRAL_HEADER.pack(
+            0x02014B50, ZIP64_VERSION if large else ZIP_VERSION, ZIP64_VERSION if large else ZIP_VERSION,
+            ZIP_FLAGS, 0, clock, date, crc, ZIP64_LIMIT if large else size, ZIP64_LIMIT if large else size,
+            len(name), 28 if large else 0, 0, 0, 0, 0o644 << 16, ZIP64_LIMIT if large else offsets[position]
+        ) + name
+        return header + struct.pack("<HHQQQ", 0x0001, 24, size, size, offsets[position]) if large else header
+
+    async def body() -> AsyncIterator[bytes]:
+        crcs: List[int] = []
+        crc, started = 0, -1
+        async for position, chunk in prefetched(objects, read, window):
+            if position != started:
+                started = position
+                yield local_header(position)
+            if chunk is None:
+                size = objects[position].size
+                crcs.append(crc)
+                yield struct.pack("<IIQQ" if zip64[position] else "<IIII", 0x08074B50, crc, size, size)
+                crc = 0
+            else:
+                crc = zlib.crc32(chunk, crc)
+                yield chunk
+        for position, crc in enumerate(crcs):
+            yield central_header(position, crc)
+        if zip64_end:
+            yield ZIP64_END_OF_CENTRAL_DIRECTORY.pack(
+                0x06064B50, 44, ZIP64_VERSION, ZIP64_VERSION, 0, 0,
+                len(objects), len(objects), directory_size, directory_offset
+            )
+            yield ZIP64_LOCATOR.pack(0x07064B50, 0, directory_offset + directory_size, 1)
+        yield END_OF_CENTRAL_DIRECTORY.pack(
+            0x06054B50, 0, 0, min(len(objects), 0xFFFF), min(len(objects), 0xFFFF),
+            min(directory_size, ZIP64_LIMIT), min(directory_offset, ZIP64_LIMIT), 0
+        )
+
+    return directory_offset + directory_size + end_records, body()
+
+
+def multipart_mixed(
+        objects: List[StoredObject],
+        read: RangeReader,
+        window: int = PREFETCH_FILES
+) -> Tuple[str, int, AsyncIterator[bytes]]:
+    """Streams files as the parts of a multipart/mixed body.
+
+    Each part carries the file name, size and item id in its headers, so
+    clients can split the body without buffering it.
+
+    Args:
+        objects: Handles of the files, in body order
+        read: Callable streaming ``length`` bytes of a file starting at ``offset``
+        window: Files read ahead (see :func:`prefetched`)
+
+    Returns:
+        Tuple of the response content type, the body length in bytes and an
+        async iterator over the body
+    """
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (f"--{boundary}\r\n"
+         f"Content-Type: application/octet-stream\r\n"
+         f"Content-Disposition: {content_disposition(obj.filename)}\r\n"
+         f"Content-Length: {obj.size}\r\n"
+         f"X-Item-Id: {obj.item_id}\r\n\r\n").encode("utf-8")
+        for obj in objects
+    ]
+    closing = f"--{boundary}--\r\n".encode("latin-1")
+    content_length = sum(
+        len(part_header) + obj.size + 2 for part_header, obj in zip(part_headers, objects)
+    ) + len(closing)
+
+    async def body() -> AsyncIterator[bytes]:
+        started = -1
+        async for position, chunk in prefetched(objects, read, window):
+            if position != started:
+                started = position
+                yield part_headers[position]
+            yield b"\r\n" if chunk is None else chunk
+        yield closing
+
+    return f"multipart/mixed; boundary={boundary}", content_length, body()
@@ -0,0 +1,55 @@
+from typing import Optional
+
+from app.storage_backends.base_interface import StoredObject
+
+# Content of an item id never changes, so clients may keep it and revalidate by ETag
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def entity_tag(obj: StoredObject) -> Optional[str]:
+    """Returns the strong ETag of a stored file, derived from its SHA-256 content hash.
+
+    Args:
+        obj: Handle of the file to serve
+
+    Returns:
+        str | None: Quoted entity tag, or None for files stored without a hash
+    """
+    return f'"{obj.content_hash}"' if obj.content_hash else None
+
+
+def not_modified(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Evaluates an ``If-None-Match`` header (weak comparison, RFC 9110 13.1.2).
+
+    Args:
+        if_none_match: Raw header value, e.g. ``"abc", W/"def"`` or ``*``
+        etag: Current entity tag of the file
+
+    Returns:
+        bool: True if the client's copy is current and a 304 may be sent
+    """
+    if not if_none_match or etag is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+
+def range_applies(if_range: Optional[str], etag: Optional[str]) -> bool:
+    """Evaluates an ``If-Range`` header (strong comparison, RFC 9110 13.1.5).
+
+    Ranges are only served if the client's partial copy has the current entity
+    tag; otherwise the whole file is sent. Date validators are not supported
+    and therefore never match.
+
+    Args:
+        if_range: Raw header value, if any
+        etag: Current entity tag of the file
+
+    Returns:
+        bool: Whether a ``Range`` header of the request should be honoured
+    """
+    if if_range is None:
+        return True
+    return etag is not None and if_range.strip() == etag
@@ -1,11 +1,16 @@
-import io
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, File, UploadFile, Form, Header, HTTPException, Query
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from starlette.responses import StreamingResponse
 
 from app.models import get_db
+from app.routes.archives import content_disposition, multipart_mixed, zip_archive
+from app.routes.conditional import CACHE_CONTROL, entity_tag, not_modified, range_applies
+from app.routes.negotiation import accepted_encodings, prefers_media_type
+from app.routes.ranges import build_download_response
+from app.routes.responses import SendfileResponse
+from app.services.gltf_conversion import GLB_MEDIA_TYPE, GLTF_MEDIA_TYPE
 from app.services.item_service import ItemService
 
 router = APIRouter()
@@ -36,34 +41,385 @@ async def create_item(
     return await ItemService.create_item(db, name, description, file)
 
 
+@router.post("/items/batch")
+async def create_items(
+        description: str = Form(...),
+        files: List[UploadFile] = File(...),
+        names: Optional[List[str]] = Form(None),
+        db: Session = Depends(get_db)
+):
+    """
+    Upload several items at once.
+
+    The files are written to the storage backend concurrently and all items are recorded in one
+    database transaction, instead of one request and transaction per file. The outcome is
+    reported per file; files that fail are cleaned up without affecting the others.
+
+    Parameters:
+        - description: The description of the items (as a form field).
+        - files: The files to be uploaded (repeated multipart field).
+        - names: Optional item names, one per file in the same order (default: the filenames).
+        - db: Database session (injected).
+
+    Returns:
+        - The number of created and failed items, and per file its name, status code and either
+          the created item's details or the error detail, in upload order.
+
+    Raises:
+        - 400 HTTPException for a missing description or a names/files count mismatch.
+        - 413 HTTPException for too many files in one batch.
+    """
+    return await ItemService.create_items(db, description, files, names)
+
+
+@router.get("/items/content/{content_hash}")
+async def find_content(content_hash: str, db: Session = Depends(get_db)):
+    """
+    Check for stored content by hash.
+
+    With deduplication enabled, clients can check whether a file is already stored
+    before uploading it, and create items from it via POST on the same path.
+
+    Parameters:
+        - content_hash: The lowercase hex SHA-256 digest of the file.
+        - db: Database session (injected).
+
+    Returns:
+        - The content hash and size in bytes of the stored content.
+
+    Raises:
+        - 400 HTTPException if the hash is malformed.
+        - 404 HTTPException if the content is not stored.
+    """
+    return await ItemService.find_content(db, content_hash)
+
+
+@router.post("/items/content/{content_hash}")
+async def create_item_from_content(
+        content_hash: str,
+        name: str = Form(...),
+        description: str = Form(...),
+        db: Session = Depends(get_db)
+):
+    """
+    Create an item from stored content.
+
+    The new item shares the already stored content with the same hash, so no file is uploaded.
+
+    Parameters:
+        - content_hash: The lowercase hex SHA-256 digest of the file.
+        - name: The name of the item (as a form field).
+        - description: The description of the item (as a form field).
+        - db: Database session (injected).
+
+    Returns:
+        - The newly created item's details, including its ID.
+
+    Raises:
+        - 400 HTTPException if the hash is malformed.
+        - 404 HTTPException if the content is not stored.
+    """
+    return await ItemService.create_item_from_content(db, name, description, content_hash)
+
+
+@router.get("/items/bulk")
+async def download_items(
+        ids: List[int] = Query(..., description="Item IDs to download (repeated query parameter)"),
+        format: str = Query("zip", description="Container to stream the files in: zip or multipart")
+):
+    """
+    Download the files of several items in one response.
+
+    The files are streamed as an uncompressed zip archive (entries named ``<item id>/<filename>``)
+    or as a multipart/mixed body. Their metadata is resolved in one query, and the backend reads of
+    the next few files overlap with sending the current one, with memory bounded regardless of how
+    many items are requested.
+
+    Parameters:
+        - ids: The IDs of the items, in the order to stream them.
+        - format: zip (default) or multipart.
+
+    Returns:
+        - StreamingResponse: The archive or multipart body, with its Content-Length.
+
+    Raises:
+        - 400 HTTPException for an unknown format or no IDs.
+        - 404 HTTPException listing the items that are not found.
+        - 413 HTTPException for too many items.
+    """
+    if format not in ("zip", "multipart"):
+        raise HTTPException(status_code=400, detail="Format must be zip or multipart")
+    objects = await ItemService.download_items(ids)
+    if format == "zip":
+        content_length, body = zip_archive(objects, ItemService.stream_item)
+        media_type = "application/zip"
+        headers = {"Content-Disposition": "attachment; filename=items.zip"}
+    else:
+        media_type, content_length, body = multipart_mixed(objects, ItemService.stream_item)
+        headers = {}
+    headers["Content-Length"] = str(content_length)
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
 @router.get("/items/{item_id}/download", response_class=FileResponse)
-async def download_item(item_id: int, db: Session = Depends(get_db)):
+async def download_item(
+        item_id: int,
+        format: Optional[str] = Query(None, description="Representation to serve: original, glb or compact"),
+        lod: int = Query(0, ge=0, description="Level of detail: 0 for the full model, 1 (finest) and up for LODs"),
+        range_header: Optional[str] = Header(None, alias="Range"),
+        if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+        if_range: Optional[str] = Header(None, alias="If-Range"),
+        accept_encoding: Optional[str] = Header(None, alias="Accept-Encoding"),
+        accept: Optional[str] = Header(None, alias="Accept")
+):
     """
     Download item file by ID.
 
     This endpoint allows users to download the file associated with an item using its ID.
+    Single and multiple byte ranges (HTTP Range header) are answered with 206 Partial Content,
+    reading only the requested bytes from storage. Files on local disk are handed to the
+    server (sendfile) instead of being streamed through Python. In presigned mode, MinIO
+    downloads are answered with a redirect to a short-lived URL on the object store.
+
+    Responses carry a strong ETag (the SHA-256 of the content) and may be cached for a year.
+    A matching If-None-Match is answered with 304 Not Modified without reading from storage.
+
+    If precompression is enabled, full downloads are served from a stored gzip/br/zstd
+    variant the client accepts (Content-Encoding), without compressing per request.
+    Range requests always refer to the original content.
+
+    If GLB conversion is enabled, glTF files are also available as binary GLB, selected with
+    format=glb or served to clients whose Accept header prefers model/gltf-binary. If compaction
+    is enabled, format=compact serves the quantized and stripped GLB variant. If LOD generation
+    is enabled, lod=1 (finest) and higher serve decimated GLB variants, so clients can render a
+    coarse model first and upgrade later.
 
     Parameters:
         - item_id: The unique ID of the item.
-        - db: Database session (injected).
+        - format: Optional representation ("original", "glb" or "compact"); negotiated via Accept if omitted.
+        - lod: Optional level of detail; 0 (default) serves the full model.
+        - range_header: Optional HTTP Range header (e.g. "bytes=0-1023").
+        - if_none_match: Optional ETags of a cached copy; a match yields 304.
+        - if_range: Optional ETag the requested ranges are valid for; otherwise the whole file is sent.
+        - accept_encoding: Optional content codings the client accepts for precompressed variants.
+        - accept: Optional media types the client accepts; model/gltf-binary selects the GLB variant.
 
     Returns:
-        - The file associated with the item as a file response.
+        - The file associated with the item (or the requested ranges of it) as a streaming response,
+          a 304 response for a current cached copy, or a 307 redirect to a presigned URL.
 
     Raises:
-        - 404 HTTPException if the item is not found or the file does not exist on the server.
+        - 400 HTTPException for an unknown format, or a format other than glb combined with lod.
+        - 404 HTTPException if the item is not found or the file does not exist on the server,
+          or if format=glb/compact or an LOD is requested for an item without such variant.
+        - 416 HTTPException if none of the requested ranges can be satisfied.
     """
+    if format not in (None, "original", "glb", "compact"):
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
+    if lod and format not in (None, "glb"):
+        raise HTTPException(status_code=400, detail="LOD levels are only available as glb")
+
+    obj = await ItemService.download_item(item_id)
+    media_type = "application/octet-stream"
+    vary = []
+
+    if format is None and ItemService.glb_enabled():
+        vary.append("Accept")
+    representation = None
+    if lod:
+        representation = await ItemService.lod_variant(obj, lod, wait=True)
+        if representation is None:
+            raise HTTPException(status_code=404, detail=f"No LOD {lod} of item {item_id}")
+    elif format == "glb" or (vary and prefers_media_type(accept, GLB_MEDIA_TYPE, GLTF_MEDIA_TYPE)):
+        representation = await ItemService.glb_variant(obj, wait=format == "glb")
+    elif format == "compact":
+        representation = await ItemService.compact_variant(obj, wait=True)
+    if representation is not None:
+        obj = representation
+        media_type = GLB_MEDIA_TYPE
+    elif format in ("glb", "compact"):
+        raise HTTPException(status_code=404, detail=f"No {format} variant of item {item_id}")
+
+    encoding = None
+    offered = ItemService.content_encodings()
+    if offered:
+        vary.append("Accept-Encoding")
+        encodings = accepted_encodings(accept_encoding, offered) if range_header is None else []
+        variant = await ItemService.encoded_variant(obj, encodings) if encodings and obj.variant is None else None
+        if variant is not None:
+            obj = variant
+            encoding = variant.encoding
+
+    headers = {"Content-Disposition": content_disposition(obj.filename)}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
 
-    file_data, file_name = await ItemService.download_item(db, item_id)
+    etag = entity_tag(obj)
+    if etag is not None:
+        validators = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if vary:
+            validators["Vary"] = ", ".join(vary)
+        if not_modified(if_none_match, etag):
+            return Response(status_code=304, headers=validators)
+        headers.update(validators)
+    elif vary:
+        headers["Vary"] = ", ".join(vary)
+    if not range_applies(if_range, etag):
+        range_header = None
 
-    stream = io.BytesIO(file_data)
-    return StreamingResponse(
-        stream,
-        media_type="application/octet-stream",
-        headers={"Content-Disposition": f"attachment; filename={file_name}"}
+    local_path = ItemService.local_path(obj)
+    if local_path is not None:
+        return SendfileResponse(local_path, obj.size, range_header, headers=headers, media_type=media_type)
+
+    redirect_url = ItemService.redirect_url(obj)
+    if redirect_url is not None:
+        return RedirectResponse(redirect_url, status_code=307)
+
+    return build_download_response(obj, range_header, ItemService.stream_item, headers=headers, media_type=media_type)
+
+
+def _part_response(source, part: str, offset: int, length: int, if_none_match: Optional[str], media_type: str):
+    """Streams one part of an indexed GLB file, with an ETag of its own derived from the file's."""
+    headers = {"Content-Length": str(length)}
+    etag = f'"{source.content_hash}.{part}"' if source.content_hash else None
+    if etag is not None:
+        headers.update({"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        if not_modified(if_none_match, etag):
+            del headers["Content-Length"]
+            return Response(status_code=304, headers=headers)
+    return StreamingResponse(ItemService.stream_item(source, offset, length), media_type=media_type, headers=headers)
+
+
+@router.get("/items/{item_id}/gltf-index")
+async def get_gltf_index(item_id: int):
+    """
+    Get the byte layout of a glTF/GLB item.
+
+    Models are parsed once (on upload or first use) and the offsets persisted. .glb uploads are
+    indexed as stored; .gltf uploads through their GLB variant (GLB conversion must be enabled).
+    Clients may fetch the listed byte ranges in parallel from the download endpoint (with the
+    given format) or use the sub-resource endpoints.
+
+    Parameters:
+        - item_id: The unique ID of the item.
+
+    Returns:
+        - The indexed format ("original" or "glb"), its size, the JSON chunk position and the
+          [offset, length] of each buffer and buffer view (null if not stored in the file).
+
+    Raises:
+        - 404 HTTPException if the item is not found or is not an indexable glTF/GLB model.
+    """
+    _, index = await ItemService.gltf_index(item_id)
+    return {
+        "format": index["variant"] or "original",
+        "size_bytes": index["size_bytes"],
+        "json": [index["json_offset"], index["json_length"]],
+        "buffers": index["buffers"],
+        "buffer_views": index["buffer_views"],
+    }
+
+
+@router.get("/items/{item_id}/gltf-json")
+async def get_gltf_json(item_id: int, if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
+    """
+    Get the JSON scene graph of a glTF/GLB item.
+
+    Serves the JSON chunk of the indexed GLB file as a byte range, without the binary data.
+
+    Parameters:
+        - item_id: The unique ID of the item.
+        - if_none_match: Optional ETags of a cached copy; a match yields 304.
+
+    Returns:
+        - The glTF JSON as a streaming response.
+
+    Raises:
+        - 404 HTTPException if the item is not found or is not an indexable glTF/GLB model.
+    """
+    source, index = await ItemService.gltf_index(item_id)
+    return _part_response(
+        source, "json", index["json_offset"], index["json_length"], if_none_match, "application/json"
     )
 
 
+@router.get("/items/{item_id}/buffers/{number}")
+async def get_gltf_buffer(
+        item_id: int,
+        number: int,
+        if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    """
+    Get one buffer of a glTF/GLB item.
+
+    Parameters:
+        - item_id: The unique ID of the item.
+        - number: Index of the buffer in the glTF JSON.
+        - if_none_match: Optional ETags of a cached copy; a match yields 304.
+
+    Returns:
+        - The buffer content as a streaming response.
+
+    Raises:
+        - 404 HTTPException if the item is not an indexable glTF/GLB model, or the buffer does
+          not exist or is not stored in the file (external uri).
+    """
+    source, index = await ItemService.gltf_index(item_id)
+    span = index["buffers"][number] if 0 <= number < len(index["buffers"]) else None
+    if span is None:
+        raise HTTPException(status_code=404, detail=f"Buffer {number} of item {item_id} not found")
+    return _part_response(source, f"buffer{number}", span[0], span[1], if_none_match, "application/octet-stream")
+
+
+@router.get("/items/{item_id}/buffer-views/{number}")
+async def get_gltf_buffer_view(
+        item_id: int,
+        number: int,
+        if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    """
+    Get one buffer view of a glTF/GLB item (e.g. the vertex data of a single accessor).
+
+    Parameters:
+        - item_id: The unique ID of the item.
+        - number: Index of the buffer view in the glTF JSON.
+        - if_none_match: Optional ETags of a cached copy; a match yields 304.
+
+    Returns:
+        - The buffer view content as a streaming response.
+
+    Raises:
+        - 404 HTTPException if the item is not an indexable glTF/GLB model, or the buffer view
+          does not exist or is not stored in the file.
+    """
+    source, index = await ItemService.gltf_index(item_id)
+    span = index["buffer_views"][number] if 0 <= number < len(index["buffer_views"]) else None
+    if span is None:
+        raise HTTPException(status_code=404, detail=f"Buffer view {number} of item {item_id} not found")
+    return _part_response(source, f"view{number}", span[0], span[1], if_none_match, "application/octet-stream")
+
+
+@router.get("/items/{item_id}/variants")
+async def list_variants(item_id: int, db: Session = Depends(get_db)):
+    """
+    List the stored variants of an item.
+
+    Variants are derived representations (precompressed, GLB, compact, LODs) built from the uploaded file.
+    Optimised variants carry a report of what was changed and how many bytes were saved.
+
+    Parameters:
+        - item_id: The unique ID of the item.
+        - db: Database session (injected).
+
+    Returns:
+        - The variants with name, filename, content coding, size, content hash and build report.
+
+    Raises:
+        - 404 HTTPException if the item is not found.
+    """
+    return await ItemService.list_variants(db, item_id)
+
+
 @router.delete("/items/{item_id}", status_code=204)
 async def delete_item(item_id: int, db: Session = Depends(get_db)):
     """
@@ -0,0 +1,60 @@
+from typing import Dict, List, Optional
+
+
+def _weights(header: str) -> Dict[str, float]:
+    """Parses a comma-separated list of tokens with optional ``q`` weights (RFC 9110 12.4.2)."""
+    weights = {}
+    for element in header.split(","):
+        token, *params = (part.strip() for part in element.split(";"))
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token.lower()] = q
+    return weights
+
+
+def accepted_encodings(accept_encoding: Optional[str], offered: List[str]) -> List[str]:
+    """Selects the offered content codings acceptable per an ``Accept-Encoding`` header.
+
+    Args:
+        accept_encoding: Raw header value, e.g. ``gzip, br;q=0.9, *;q=0.1``
+        offered: Codings available on the server, in server preference order
+
+    Returns:
+        List[str]: Acceptable codings ordered by client weight, ties broken by
+            server preference; empty if the client accepts none (or sent no header)
+    """
+    if not accept_encoding or not offered:
+        return []
+    weights = _weights(accept_encoding)
+    wildcard = weights.get("*", 0.0)
+    ranked = [(weights.get(coding, wildcard), coding) for coding in offered]
+    return [coding for q, coding in sorted(ranked, key=lambda entry: -entry[0]) if q > 0]
+
+
+def prefers_media_type(accept: Optional[str], preferred: str, alternative: str) -> bool:
+    """Checks whether an ``Accept`` header explicitly favours one media type over another.
+
+    Wildcards are ignored: clients sending ``*/*`` have not asked for a
+    particular representation and keep getting the original.
+
+    Args:
+        accept: Raw header value, e.g. ``model/gltf-binary, model/gltf+json;q=0.8``
+        preferred: Media type to check for, e.g. ``model/gltf-binary``
+        alternative: Media type of the original representation
+
+    Returns:
+        bool: True if ``preferred`` is listed with a weight of at least that of ``alternative``
+    """
+    if not accept:
+        return False
+    weights = _weights(accept)
+    q = weights.get(preferred, 0.0)
+    return q > 0 and q >= weights.get(alternative, 0.0)
@@ -0,0 +1,161 @@
+import uuid
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.responses import StreamingResponse
+
+from app.storage_backends.base_interface import StoredObject
+
+# Requests asking for more (coalesced) ranges than this are served in full
+MAX_RANGES = 100
+
+ByteRange = Tuple[int, int]
+RangeReader = Callable[[StoredObject, int, int], AsyncIterator[bytes]]
+
+
+def parse_range_header(range_header: str, size: int) -> List[ByteRange]:
+    """Parses an HTTP ``Range`` header into sorted, coalesced byte ranges.
+
+    Args:
+        range_header: Raw header value, e.g. ``bytes=0-99,200-``
+        size: Total size of the representation in bytes
+
+    Returns:
+        List[ByteRange]: Inclusive ``(start, end)`` pairs; empty if the header is
+            malformed, uses another unit or asks for too many ranges, in which
+            case the full content should be served
+
+    Raises:
+        HTTPException: 416 if none of the requested ranges overlaps the content
+    """
+    unit, _, specs = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return []
+
+    ranges = []
+    for spec in specs.split(","):
+        first, dash, last = spec.strip().partition("-")
+        first, last = first.strip(), last.strip()
+        if not dash or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+            return []
+
+        if not first:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix == 0 or size == 0:
+                continue
+            ranges.append((max(0, size - suffix), size - 1))
+            continue
+
+        start = int(first)
+        if last and int(last) < start:
+            return []
+        if start >= size:
+            continue
+        end = min(int(last), size - 1) if last else size - 1
+        ranges.append((start, end))
+
+    if not ranges:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+
+    return merged if len(merged) <= MAX_RANGES else []
+
+
+def multipart_byteranges(
+        ranges: List[ByteRange],
+        size: int,
+        media_type: str
+) -> Tuple[str, List[bytes], bytes, int]:
+    """Lays out a multipart/byteranges body for the given ranges.
+
+    Each part consists of its header, the range payload and a trailing CRLF;
+    the body ends with the closing boundary.
+
+    Args:
+        ranges: Inclusive ``(start, end)`` pairs as returned by parse_range_header
+        size: Total size of the representation in bytes
+        media_type: Content type of the file itself
+
+    Returns:
+        Tuple of the response content type, the per-part header bytes, the closing
+        boundary bytes and the total body length
+    """
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (f"--{boundary}\r\n"
+         f"Content-Type: {media_type}\r\n"
+         f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode("latin-1")
+        for start, end in ranges
+    ]
+    closing = f"--{boundary}--\r\n".encode("latin-1")
+    content_length = sum(
+        len(part_header) + (end - start + 1) + 2 for part_header, (start, end) in zip(part_headers, ranges)
+    ) + len(closing)
+    return f"multipart/byteranges; boundary={boundary}", part_headers, closing, content_length
+
+
+def build_download_response(
+        obj: StoredObject,
+        range_header: Optional[str],
+        read: RangeReader,
+        headers: Dict[str, str],
+        media_type: str = "application/octet-stream"
+) -> StreamingResponse:
+    """Builds a full (200), single-range (206) or multipart/byteranges (206) response.
+
+    Args:
+        obj: Handle of the file to serve
+        range_header: Raw ``Range`` header of the request, if any
+        read: Callable streaming ``length`` bytes of ``obj`` starting at ``offset``
+        headers: Additional response headers (e.g. Content-Disposition)
+        media_type: Content type of the file itself
+
+    Returns:
+        StreamingResponse: Response streaming only the requested bytes from storage
+
+    Raises:
+        HTTPException: 416 for unsatisfiable ranges
+    """
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    ranges = parse_range_header(range_header, obj.size) if range_header else []
+
+    if not ranges:
+        headers["Content-Length"] = str(obj.size)
+        return StreamingResponse(read(obj, 0, obj.size), media_type=media_type, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{obj.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            read(obj, start, end - start + 1),
+            status_code=206,
+            media_type=media_type,
+            headers=headers
+        )
+
+    content_type, part_headers, closing, content_length = multipart_byteranges(ranges, obj.size, media_type)
+
+    async def multipart():
+        for part_header, (start, end) in zip(part_headers, ranges):
+            yield part_header
+            async for chunk in read(obj, start, end - start + 1):
+                yield chunk
+            yield b"\r\n"
+        yield closing
+
+    headers["Content-Length"] = str(content_length)
+    return StreamingResponse(multipart(), status_code=206, media_type=content_type, headers=headers)
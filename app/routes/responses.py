@@ -0,0 +1,122 @@
+import os
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.routes.ranges import parse_range_header, multipart_byteranges
+from app.storage_backends.streaming import CHUNK_SIZE
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+PATHSEND_EXTENSION = "http.response.pathsend"
+
+
+class SendfileResponse(Response):
+    """Serves (ranges of) a local file without copying the payload through Python.
+
+    Transfer strategy, depending on what the ASGI server advertises in
+    ``scope["extensions"]``:
+
+    - ``http.response.zerocopysend``: the server calls ``os.sendfile`` on the
+      descriptor for every requested range (kernel zero-copy)
+    - ``http.response.pathsend``: the server sends the file by path (full body only)
+    - otherwise: positional reads (``os.pread``) in the thread pool
+
+    Granian, which the file service runs on (see docker-compose.yml),
+    advertises ``pathsend``; uvicorn advertises neither extension, so with it
+    every download takes the ``pread`` path. Ranges are always sent with
+    ``zerocopysend`` or ``pread``.
+
+    Range headers are validated when the response is created, so an unsatisfiable
+    range still results in a regular 416 error response; the file is opened
+    before the response starts, so a file removed in the meantime results in a 404.
+    """
+
+    chunk_size = CHUNK_SIZE
+
+    def __init__(
+            self,
+            path: str,
+            size: int,
+            range_header: Optional[str] = None,
+            headers: Optional[Dict[str, str]] = None,
+            media_type: str = "application/octet-stream"
+    ):
+        self.path = path
+        self.size = size
+        self.ranges = parse_range_header(range_header, size) if range_header else []
+        self.media_type = media_type
+        self.background = None
+        self.status_code = 206 if self.ranges else 200
+        self.init_headers({**(headers or {}), "Accept-Ranges": "bytes"})
+
+        if len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            self.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            self.headers["Content-Length"] = str(end - start + 1)
+            self.parts = None
+        elif self.ranges:
+            content_type, part_headers, closing, content_length = multipart_byteranges(
+                self.ranges, size, media_type
+            )
+            self.headers["Content-Type"] = content_type
+            self.headers["Content-Length"] = str(content_length)
+            self.parts = (part_headers, closing)
+        else:
+            self.headers["Content-Length"] = str(size)
+            self.parts = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        zerocopy = ZEROCOPY_EXTENSION in extensions
+
+        # Opened before the response starts, so a file removed since the item was resolved is a 404
+        try:
+            f = await run_in_threadpool(open, self.path, "rb")
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"File missing at stored path: {self.path}")
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+            if not self.ranges and not zerocopy and PATHSEND_EXTENSION in extensions:
+                await send({"type": PATHSEND_EXTENSION, "path": self.path})
+                return
+
+            if not self.ranges:
+                await self._send_range(send, f, 0, self.size, zerocopy, more_body=False)
+            elif self.parts is None:
+                start, end = self.ranges[0]
+                await self._send_range(send, f, start, end - start + 1, zerocopy, more_body=False)
+            else:
+                part_headers, closing = self.parts
+                for part_header, (start, end) in zip(part_headers, self.ranges):
+                    await send({"type": "http.response.body", "body": part_header, "more_body": True})
+                    await self._send_range(send, f, start, end - start + 1, zerocopy, more_body=True)
+                    await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+                await send({"type": "http.response.body", "body": closing, "more_body": False})
+        finally:
+            f.close()
+
+    async def _send_range(self, send: Send, f, offset: int, count: int, zerocopy: bool, more_body: bool) -> None:
+        if zerocopy:
+            await send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": f,
+                "offset": offset,
+                "count": count,
+                "more_body": more_body
+            })
+            return
+
+        fd = f.fileno()
+        end = offset + count
+        while offset < end:
+            chunk = await run_in_threadpool(os.pread, fd, min(self.chunk_size, end - offset), offset)
+            if not chunk:
+                raise RuntimeError(f"File at path {self.path} is shorter than expected.")
+            offset += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body or offset < end})
+        if count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": more_body})
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+
+from app.services.item_service import ItemService
+
+router = APIRouter()
+
+
+@router.get("/storage/stats")
+async def storage_stats():
+    """
+    Storage runtime statistics.
+
+    This endpoint exposes counters of the configured storage backend, such as object cache
+    hits, misses and evictions, to help size caches and pools.
+
+    Returns:
+        - A dictionary of counters, grouped by component.
+    """
+    return ItemService.storage_stats()
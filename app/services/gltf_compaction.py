@@ -0,0 +1,418 @@
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from pygltflib import GLTF2, Accessor, BufferView, Buffer, Node
+
+from app.services.gltf_conversion import load_gltf, pack_glb, pad
+from app.services.variant_builder import Derived, VariantBuilder
+from app.storage_backends.base_interface import StorageInterface, StoredObject
+from app.storage_backends.streaming import IngestStream
+
+# Name of the optimised variant
+COMPACT_VARIANT = "compact"
+QUANTIZATION_EXTENSION = "KHR_mesh_quantization"
+# Extensions storing geometry in their own encoding, which this pipeline cannot rewrite
+UNSUPPORTED_EXTENSIONS = {"KHR_draco_mesh_compression", "EXT_meshopt_compression"}
+# Extensions known not to refer to accessors or buffer views, which repack_gltf renumbers;
+# models using any other extension (e.g. EXT_mesh_gpu_instancing) are not rewritten
+SAFE_EXTENSIONS = {
+    QUANTIZATION_EXTENSION,
+    "KHR_lights_punctual",
+    "KHR_materials_anisotropy",
+    "KHR_materials_clearcoat",
+    "KHR_materials_dispersion",
+    "KHR_materials_emissive_strength",
+    "KHR_materials_ior",
+    "KHR_materials_iridescence",
+    "KHR_materials_pbrSpecularGlossiness",
+    "KHR_materials_sheen",
+    "KHR_materials_specular",
+    "KHR_materials_transmission",
+    "KHR_materials_unlit",
+    "KHR_materials_variants",
+    "KHR_materials_volume",
+    "KHR_texture_basisu",
+    "KHR_texture_transform",
+    "KHR_xmp_json_ld",
+    "EXT_texture_avif",
+    "EXT_texture_webp",
+}
+
+BYTE, UNSIGNED_BYTE, SHORT, UNSIGNED_SHORT, UNSIGNED_INT, FLOAT = 5120, 5121, 5122, 5123, 5125, 5126
+COMPONENT_DTYPES = {
+    BYTE: np.dtype("<i1"),
+    UNSIGNED_BYTE: np.dtype("<u1"),
+    SHORT: np.dtype("<i2"),
+    UNSIGNED_SHORT: np.dtype("<u2"),
+    UNSIGNED_INT: np.dtype("<u4"),
+    FLOAT: np.dtype("<f4"),
+}
+TYPE_COMPONENTS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER = 34962, 34963
+# Largest magnitude of quantized positions (signed 16 bit)
+POSITION_RANGE = 32767
+
+
+def _align4(size: int) -> int:
+    return size + (-size % 4)
+
+
+def read_accessor(gltf: GLTF2, buffers: List[bytes], index: int) -> np.ndarray:
+    """Returns the elements of an accessor as a ``(count, components)`` array view.
+
+    Args:
+        gltf: Parsed model
+        buffers: Payload of each buffer of the model
+        index: Accessor index
+
+    Raises:
+        ValueError: For sparse accessors or accessors without buffer view
+    """
+    accessor = gltf.accessors[index]
+    if accessor.sparse is not None or accessor.bufferView is None:
+        raise ValueError(f"Accessor {index} is sparse or has no buffer view")
+    view = gltf.bufferViews[accessor.bufferView]
+    dtype = COMPONENT_DTYPES[accessor.componentType]
+    components = TYPE_COMPONENTS[accessor.type]
+    return np.ndarray(
+        shape=(accessor.count, components),
+        dtype=dtype,
+        buffer=buffers[view.buffer],
+        offset=(view.byteOffset or 0) + (accessor.byteOffset or 0),
+        strides=(view.byteStride or dtype.itemsize * components, dtype.itemsize)
+    )
+
+
+def attribute_accessors(attributes) -> Dict[str, int]:
+    """Returns the attribute semantics of a primitive (or morph target) with their accessors."""
+    if isinstance(attributes, dict):
+        return {name: index for name, index in attributes.items() if index is not None}
+    return {name: index for name, index in vars(attributes).items() if index is not None}
+
+
+class _Packer:
+    """Collects the buffer views of the rewritten model in one tightly packed buffer."""
+
+    def __init__(self):
+        self.blob = bytearray()
+        self.views: List[BufferView] = []
+
+    def add(self, data: bytes, stride: Optional[int] = None, target: Optional[int] = None) -> int:
+        pad(self.blob)
+        self.views.append(BufferView(
+            buffer=0, byteOffset=len(self.blob), byteLength=len(data), byteStride=stride, target=target
+        ))
+        self.blob += data
+        return len(self.views) - 1
+
+    def add_elements(self, elements: np.ndarray, vertex: bool, target: Optional[int]) -> int:
+        """Adds accessor elements; vertex attributes get 4-byte aligned rows as the spec requires."""
+        elements = np.ascontiguousarray(elements)
+        row = elements.dtype.itemsize * elements.shape[1]
+        if not vertex or row % 4 == 0:
+            return self.add(elements.tobytes(), row if vertex else None, target)
+        stride = _align4(row)
+        rows = np.zeros((elements.shape[0], stride), dtype=np.uint8)
+        rows[:, :row] = elements.view(np.uint8).reshape(elements.shape[0], row)
+        return self.add(rows.tobytes(), stride, target)
+
+
+def check_extensions(gltf: GLTF2) -> None:
+    """Rejects models whose extensions this pipeline cannot rewrite safely.
+
+    Raises:
+        ValueError: For geometry compression extensions and for extensions
+            not in SAFE_EXTENSIONS
+    """
+    used = set(gltf.extensionsUsed or []) | set(gltf.extensionsRequired or [])
+    if UNSUPPORTED_EXTENSIONS & used:
+        raise ValueError("Models using geometry compression extensions are not rewritten")
+    unknown = used - SAFE_EXTENSIONS
+    if unknown:
+        raise ValueError(f"Models using {', '.join(sorted(unknown))} are not rewritten")
+
+
+def repack_gltf(
+        gltf: GLTF2,
+        buffers: List[bytes],
+        rewritten: Dict[int, Tuple[np.ndarray, int, bool]]
+) -> Tuple[List[bytes], dict]:
+    """Packs a model as GLB, keeping only the accessors and buffer views still referenced.
+
+    Every referenced accessor gets its own tightly packed buffer view in the
+    single BIN chunk; accessors listed in ``rewritten`` are replaced by new
+    elements (and may have been appended to the model without buffer view).
+    References from extensions are not followed, so models must have passed
+    :func:`check_extensions`.
+
+    Args:
+        gltf: Model to pack; its accessors, buffer views and buffers are rewritten
+        buffers: Payload of each buffer of the model
+        rewritten: New elements, component type and normalization per accessor index
+
+    Returns:
+        Tuple of the GLB chunks in file order and the number of removed
+        accessors, buffer views and buffers
+    """
+    # Accessors still referenced, and their role (vertex attribute, index or other data)
+    used: Dict[int, Optional[int]] = {}
+    for mesh in gltf.meshes:
+        for primitive in mesh.primitives:
+            for index in attribute_accessors(primitive.attributes).values():
+                used[index] = ARRAY_BUFFER
+            for target in primitive.targets or []:
+                for index in attribute_accessors(target).values():
+                    used[index] = ARRAY_BUFFER
+            if primitive.indices is not None:
+                used[primitive.indices] = ELEMENT_ARRAY_BUFFER
+    for skin in gltf.skins:
+        if skin.inverseBindMatrices is not None:
+            used.setdefault(skin.inverseBindMatrices, None)
+    for animation in gltf.animations:
+        for sampler in animation.samplers:
+            used.setdefault(sampler.input, None)
+            used.setdefault(sampler.output, None)
+
+    referenced_views = {gltf.accessors[index].bufferView for index in used}
+    referenced_views |= {image.bufferView for image in gltf.images if image.bufferView is not None}
+    referenced_views.discard(None)
+    removed = {}
+    removed["removed_accessors"] = len(gltf.accessors) - len(used)
+    removed["removed_buffer_views"] = len(gltf.bufferViews) - len(referenced_views)
+    removed["removed_buffers"] = len(gltf.buffers) - len({gltf.bufferViews[view].buffer for view in referenced_views})
+
+    packer = _Packer()
+    accessors: List[Accessor] = []
+    accessor_map: Dict[int, int] = {}
+    for index in sorted(used):
+        accessor = gltf.accessors[index]
+        target = used[index]
+        if index in rewritten:
+            elements, component_type, normalized = rewritten[index]
+            accessor.componentType = component_type
+            accessor.count = len(elements)
+            accessor.normalized = normalized or None
+            if accessor.min and accessor.max and not normalized:
+                accessor.min = elements.min(axis=0).tolist()
+                accessor.max = elements.max(axis=0).tolist()
+            elif normalized:
+                accessor.min = accessor.max = None
+        else:
+            elements = read_accessor(gltf, buffers, index)
+        accessor.bufferView = packer.add_elements(elements, target == ARRAY_BUFFER, target)
+        accessor.byteOffset = None
+        accessor_map[index] = len(accessors)
+        accessors.append(accessor)
+
+    for image in gltf.images:
+        if image.bufferView is not None:
+            view = gltf.bufferViews[image.bufferView]
+            start = view.byteOffset or 0
+            image.bufferView = packer.add(buffers[view.buffer][start:start + view.byteLength])
+
+    for mesh in gltf.meshes:
+        for primitive in mesh.primitives:
+            attributes = primitive.attributes
+            for semantic, index in attribute_accessors(attributes).items():
+                if isinstance(attributes, dict):
+                    attributes[semantic] = accessor_map[index]
+                else:
+                    setattr(attributes, semantic, accessor_map[index])
+            for target in primitive.targets or []:
+                for semantic, index in attribute_accessors(target).items():
+                    if isinstance(target, dict):
+                        target[semantic] = accessor_map[index]
+                    else:
+                        setattr(target, semantic, accessor_map[index])
+            if primitive.indices is not None:
+                primitive.indices = accessor_map[primitive.indices]
+    for skin in gltf.skins:
+        if skin.inverseBindMatrices is not None:
+            skin.inverseBindMatrices = accessor_map[skin.inverseBindMatrices]
+    for animation in gltf.animations:
+        for sampler in animation.samplers:
+            sampler.input = accessor_map[sampler.input]
+            sampler.output = accessor_map[sampler.output]
+
+    gltf.accessors = accessors
+    gltf.bufferViews = packer.views
+    gltf.buffers = [Buffer(byteLength=len(packer.blob))] if packer.blob else []
+    return pack_glb(gltf, [bytes(packer.blob)]), removed
+
+
+def compact_gltf(data: bytes) -> Tuple[List[bytes], dict]:
+    """Quantizes, narrows and strips a glTF/GLB model and packs it as GLB.
+
+    Steps, vectorised with NumPy:
+
+    - Positions of meshes that are not skinned or morphed are quantized to
+      16-bit integers (KHR_mesh_quantization); the dequantization transform
+      goes to a new child node carrying the mesh
+    - Normals and tangents become normalized 8-bit, texture coordinates in
+      [0, 1] normalized 16-bit values
+    - 32-bit indices with fewer than 65535 vertices become 16-bit
+    - Accessors, buffer views and buffers nothing refers to are dropped;
+      everything else is repacked without interleaving gaps
+
+    Args:
+        data: Content of a .gltf file with embedded buffers or of a .glb file
+
+    Returns:
+        Tuple of the GLB chunks in file order and a report of what was changed
+
+    Raises:
+        ValueError: For invalid files, external buffers, sparse accessors or
+            extensions that are not known to be safe (see check_extensions)
+    """
+    gltf, buffers = load_gltf(data)
+    check_extensions(gltf)
+
+    report = {
+        "quantized_positions": 0,
+        "quantized_normals": 0,
+        "quantized_tangents": 0,
+        "quantized_texcoords": 0,
+        "narrowed_indices": 0,
+        "removed_accessors": 0,
+        "removed_buffer_views": 0,
+        "removed_buffers": 0,
+    }
+
+    # Which meshes use which position accessors, to quantize each position accessor on one grid
+    position_users: Dict[int, Set[int]] = {}
+    for mesh_index, mesh in enumerate(gltf.meshes):
+        for primitive in mesh.primitives:
+            position = attribute_accessors(primitive.attributes).get("POSITION")
+            if position is not None:
+                position_users.setdefault(position, set()).add(mesh_index)
+    skinned = {node.mesh for node in gltf.nodes if node.mesh is not None and node.skin is not None}
+
+    rewritten: Dict[int, Tuple[np.ndarray, int, bool]] = {}
+    dequantize: Dict[int, Tuple[np.ndarray, float]] = {}
+    for mesh_index, mesh in enumerate(gltf.meshes):
+        positions = [attribute_accessors(p.attributes).get("POSITION") for p in mesh.primitives]
+        positions = [index for index in positions if index is not None]
+        if (
+                mesh_index in skinned
+                or any(p.targets for p in mesh.primitives)
+                or not positions
+                or any(position_users[index] != {mesh_index} for index in positions)
+                or any(gltf.accessors[index].componentType != FLOAT or gltf.accessors[index].type != "VEC3"
+                       for index in positions)
+        ):
+            continue
+        arrays = {index: read_accessor(gltf, buffers, index).astype(np.float64) for index in set(positions)}
+        stacked = np.concatenate(list(arrays.values()))
+        if not len(stacked):
+            continue
+        low, high = stacked.min(axis=0), stacked.max(axis=0)
+        center = (low + high) / 2
+        scale = float(np.max(high - low)) / 2 / POSITION_RANGE or 1.0
+        for index, array in arrays.items():
+            quantized = np.round((array - center) / scale).astype(np.int16)
+            rewritten[index] = (quantized, SHORT, False)
+            report["quantized_positions"] += 1
+        dequantize[mesh_index] = (center, scale)
+
+    for mesh in gltf.meshes:
+        for primitive in mesh.primitives:
+            for semantic, index in attribute_accessors(primitive.attributes).items():
+                accessor = gltf.accessors[index]
+                if index in rewritten or accessor.componentType != FLOAT:
+                    continue
+                if semantic == "NORMAL" or semantic == "TANGENT":
+                    values = read_accessor(gltf, buffers, index)
+                    rewritten[index] = (np.round(np.clip(values, -1, 1) * 127).astype(np.int8), BYTE, True)
+                    report["quantized_normals" if semantic == "NORMAL" else "quantized_tangents"] += 1
+                elif semantic.startswith("TEXCOORD_"):
+                    values = read_accessor(gltf, buffers, index)
+                    if values.size and (values.min() < 0 or values.max() > 1):
+                        # Wrapped coordinates would need KHR_texture_transform
+                        continue
+                    rewritten[index] = (np.round(values * 65535).astype(np.uint16), UNSIGNED_SHORT, True)
+                    report["quantized_texcoords"] += 1
+            index = primitive.indices
+            if index is not None and index not in rewritten and gltf.accessors[index].componentType == UNSIGNED_INT:
+                values = read_accessor(gltf, buffers, index)
+                if not values.size or values.max() < 65535:
+                    rewritten[index] = (values.astype(np.uint16), UNSIGNED_SHORT, False)
+                    report["narrowed_indices"] += 1
+
+    # The mesh moves to a child node whose transform maps the integer grid back to model units
+    for node in list(gltf.nodes):
+        if node.mesh in dequantize:
+            center, scale = dequantize[node.mesh]
+            gltf.nodes.append(Node(mesh=node.mesh, translation=center.tolist(), scale=[scale] * 3))
+            node.mesh = None
+            node.children = (node.children or []) + [len(gltf.nodes) - 1]
+
+    if report["quantized_positions"] or report["quantized_normals"] or report["quantized_tangents"] \
+            or report["quantized_texcoords"]:
+        for extensions in ("extensionsUsed", "extensionsRequired"):
+            names = getattr(gltf, extensions) or []
+            if QUANTIZATION_EXTENSION not in names:
+                setattr(gltf, extensions, names + [QUANTIZATION_EXTENSION])
+
+    chunks, removed = repack_gltf(gltf, buffers, rewritten)
+    report.update(removed)
+    return chunks, report
+
+
+class GltfCompactor(VariantBuilder):
+    """Builds compact GLB variants of uploaded glTF/GLB models.
+
+    Runs :func:`compact_gltf` on the worker threads and records a report of
+    what was changed and how many bytes were saved with the variant.
+    """
+
+    def __init__(
+            self,
+            storage: StorageInterface,
+            enabled: bool = True,
+            at_ingest: bool = True,
+            workers: int = 2,
+            max_bytes: int = 512 * 1024 ** 2
+    ):
+        """Configures the pipeline.
+
+        Args:
+            storage: Backend storing originals and variants
+            enabled: Whether compact variants are built at all
+            at_ingest: Optimise right after an upload instead of on first request
+            workers: Threads optimising concurrently
+            max_bytes: Largest original processed; the pipeline holds it in memory
+        """
+        super().__init__(storage, [COMPACT_VARIANT] if enabled else [], at_ingest, workers, name="compact")
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.variants)
+
+    def accepts(self, obj: StoredObject) -> bool:
+        """Only .gltf and .glb files within the size limit are processed."""
+        return obj.filename.lower().endswith((".gltf", ".glb")) and obj.size <= self.max_bytes
+
+    async def variant(self, obj: StoredObject, wait: bool = False) -> Optional[StoredObject]:
+        """Resolves the compact variant of an original.
+
+        Args:
+            obj: Handle of the original
+            wait: Wait for the pipeline if it has not run yet
+
+        Returns:
+            StoredObject | None: Handle of the compact variant, or None if not (yet) available
+        """
+        if not self.enabled:
+            return None
+        return await self.lookup(obj, COMPACT_VARIANT, wait)
+
+    async def _derive(self, obj: StoredObject, variant: str) -> Derived:
+        data = b"".join([chunk async for chunk in self.storage.iter_chunks(obj)])
+        chunks, report = await self.pool.run("compact", compact_gltf, data)
+        stream = IngestStream.from_chunks(chunks)
+        report["original_bytes"] = obj.size
+        report["compact_bytes"] = stream.length
+        report["saved_bytes"] = obj.size - stream.length
+        return Derived(stream, os.path.splitext(obj.filename)[0] + ".compact.glb", report=report)
@@ -0,0 +1,170 @@
+import base64
+import os
+import struct
+from typing import List, Optional, Tuple
+
+from pygltflib import BIN, GLTF2, JSON, MAGIC, Buffer
+
+from app.services.variant_builder import Derived, VariantBuilder
+from app.storage_backends.base_interface import StorageInterface, StoredObject
+from app.storage_backends.streaming import IngestStream
+
+# Name of the binary glTF variant and its media type
+GLB_VARIANT = "glb"
+GLB_MEDIA_TYPE = "model/gltf-binary"
+# Media type of the JSON glTF originals
+GLTF_MEDIA_TYPE = "model/gltf+json"
+
+GLB_VERSION = 2
+# Chunks of a GLB container are 4-byte aligned
+GLB_ALIGNMENT = 4
+
+
+def _decode_buffer(buffer: Buffer) -> bytes:
+    """Returns the payload of an embedded (base64 data URI) buffer."""
+    if not buffer.uri or not buffer.uri.startswith("data:"):
+        raise ValueError("Only buffers embedded as data URIs or in a GLB can be processed")
+    _, _, encoded = buffer.uri.partition(",")
+    return base64.b64decode(encoded)
+
+
+def pad(data: bytearray, filler: bytes = b"\0") -> None:
+    """Pads ``data`` in place to the GLB chunk alignment."""
+    data += filler * (-len(data) % GLB_ALIGNMENT)
+
+
+def load_gltf(data: bytes) -> Tuple[GLTF2, List[bytes]]:
+    """Parses a glTF JSON file with embedded buffers or a GLB container.
+
+    Args:
+        data: File content
+
+    Returns:
+        Tuple of the parsed model and the payload of each of its buffers
+
+    Raises:
+        ValueError: If the file is not valid glTF or references external buffers
+    """
+    if data[:4] == MAGIC:
+        gltf = GLTF2.load_from_bytes(data)
+        if gltf is None:
+            raise ValueError("GLB container without JSON chunk")
+        buffers = [
+            (gltf.binary_blob() or b"") if buffer.uri is None else _decode_buffer(buffer)
+            for buffer in gltf.buffers
+        ]
+    else:
+        gltf = GLTF2.from_json(data.decode("utf-8"), infer_missing=True)
+        buffers = [_decode_buffer(buffer) for buffer in gltf.buffers]
+    return gltf, buffers
+
+
+def pack_glb(gltf: GLTF2, buffers: List[bytes]) -> List[bytes]:
+    """Serializes a model into a GLB container, packing all buffers into its BIN chunk.
+
+    Each buffer is 4-byte aligned in the BIN chunk and buffer views are
+    rebased onto it. Unlike the repacking of pygltflib, buffers not referenced
+    by any view are kept. Other parts of the model (images, extensions) are
+    left untouched.
+
+    Args:
+        gltf: Model to serialize; its buffers and buffer views are rewritten
+        buffers: Payload of each buffer of the model
+
+    Returns:
+        List[bytes]: GLB header, JSON chunk and BIN chunk, in file order
+    """
+    blob = bytearray()
+    offsets = []
+    for buffer, payload in zip(gltf.buffers, buffers):
+        offsets.append(len(blob))
+        blob += payload[:buffer.byteLength]
+        pad(blob)
+    for view in gltf.bufferViews:
+        view.byteOffset = (view.byteOffset or 0) + offsets[view.buffer]
+        view.buffer = 0
+    gltf.buffers = [Buffer(byteLength=len(blob))] if blob else []
+
+    json_chunk = bytearray(gltf.gltf_to_json(separators=(",", ":"), indent=None).encode("utf-8"))
+    pad(json_chunk, b" ")
+
+    chunks = [struct.pack("<I4s", len(json_chunk), JSON.encode()), bytes(json_chunk)]
+    if blob:
+        chunks += [struct.pack("<I4s", len(blob), BIN.encode()), bytes(blob)]
+    length = 12 + sum(len(chunk) for chunk in chunks)
+    return [MAGIC + struct.pack("<II", GLB_VERSION, length)] + chunks
+
+
+def gltf_to_glb(data: bytes) -> List[bytes]:
+    """Converts a glTF JSON file with embedded buffers into a binary GLB container.
+
+    All buffers are decoded once and packed into the single BIN chunk (see
+    :func:`pack_glb`).
+
+    Args:
+        data: UTF-8 encoded glTF JSON
+
+    Returns:
+        List[bytes]: GLB header, JSON chunk and BIN chunk, in file order
+
+    Raises:
+        ValueError: If the file is not valid glTF or references external buffers
+    """
+    return pack_glb(*load_gltf(data))
+
+
+class GlbConverter(VariantBuilder):
+    """Builds binary GLB variants of uploaded ``.gltf`` files.
+
+    Embedded buffers are stored base64-encoded in glTF JSON, inflating them by
+    a third and making clients decode them. The GLB variant holds the same
+    model with raw binary buffers. Parsing and packing run on the worker
+    threads, off the event loop; the original stays available.
+    """
+
+    def __init__(
+            self,
+            storage: StorageInterface,
+            enabled: bool = True,
+            at_ingest: bool = True,
+            workers: int = 2,
+            max_bytes: int = 512 * 1024 ** 2
+    ):
+        """Configures the conversion.
+
+        Args:
+            storage: Backend storing originals and variants
+            enabled: Whether GLB variants are built at all
+            at_ingest: Convert right after an upload instead of on first request
+            workers: Threads converting concurrently
+            max_bytes: Largest original converted; conversion holds it in memory
+        """
+        super().__init__(storage, [GLB_VARIANT] if enabled else [], at_ingest, workers, name="glb")
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.variants)
+
+    def accepts(self, obj: StoredObject) -> bool:
+        """Only glTF JSON files within the size limit are converted."""
+        return obj.filename.lower().endswith(".gltf") and obj.size <= self.max_bytes
+
+    async def variant(self, obj: StoredObject, wait: bool = False) -> Optional[StoredObject]:
+        """Resolves the GLB variant of an original.
+
+        Args:
+            obj: Handle of the original
+            wait: Wait for the conversion if it has not been done yet
+
+        Returns:
+            StoredObject | None: Handle of the GLB variant, or None if not (yet) available
+        """
+        if not self.enabled:
+            return None
+        return await self.lookup(obj, GLB_VARIANT, wait)
+
+    async def _derive(self, obj: StoredObject, variant: str) -> Derived:
+        data = b"".join([chunk async for chunk in self.storage.iter_chunks(obj)])
+        chunks = await self.pool.run("convert", gltf_to_glb, data)
+        return Derived(IngestStream.from_chunks(chunks), os.path.splitext(obj.filename)[0] + ".glb")
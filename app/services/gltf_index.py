@@ -0,0 +1,263 @@
+import asyncio
+import json
+import struct
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from pygltflib import BIN, JSON, MAGIC
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import GltfIndex, SessionLocal
+from app.services.gltf_conversion import GlbConverter
+from app.services.variant_builder import RETRY_FAILED_AFTER
+from app.storage_backends.base_interface import StorageInterface, StoredObject
+from app.storage_backends.io_pool import IOPool
+
+# GLB file header (magic, version, length) and chunk header (length, type)
+GLB_HEADER = struct.Struct("<4sII")
+CHUNK_HEADER = struct.Struct("<I4s")
+JSON_OFFSET = GLB_HEADER.size + CHUNK_HEADER.size
+# Indexes (and failed builds) remembered per process
+KNOWN_INDEXES = 10000
+
+
+def json_chunk_length(header: bytes) -> int:
+    """Returns the length of the JSON chunk from the first 20 bytes of a GLB file.
+
+    Raises:
+        ValueError: If the bytes do not start a GLB file with a JSON chunk
+    """
+    if len(header) < JSON_OFFSET or header[:4] != MAGIC:
+        raise ValueError("Not a GLB file")
+    length, chunk_type = CHUNK_HEADER.unpack_from(header, GLB_HEADER.size)
+    if chunk_type != JSON.encode():
+        raise ValueError("GLB file does not start with a JSON chunk")
+    return length
+
+
+def index_glb(prefix: bytes, size: int) -> dict:
+    """Computes the byte layout of a GLB file from its header, JSON chunk and BIN chunk header.
+
+    Args:
+        prefix: First ``20 + json length + 8`` bytes of the file (fewer if it has no BIN chunk)
+        size: Size of the whole file
+
+    Returns:
+        dict: size_bytes, json_offset and json_length, and the [offset, length]
+            of each buffer and buffer view (None where not stored in the file)
+
+    Raises:
+        ValueError: For files that are not GLB or whose JSON chunk is invalid or truncated
+    """
+    json_length = json_chunk_length(prefix)
+    json_end = JSON_OFFSET + json_length
+    if json_end > min(len(prefix), size):
+        raise ValueError("GLB JSON chunk is truncated")
+    document = json.loads(prefix[JSON_OFFSET:json_end])
+
+    bin_range = None
+    if json_end + CHUNK_HEADER.size <= min(len(prefix), size):
+        bin_length, chunk_type = CHUNK_HEADER.unpack_from(prefix, json_end)
+        bin_offset = json_end + CHUNK_HEADER.size
+        if chunk_type == BIN.encode() and bin_offset + bin_length <= size:
+            bin_range = [bin_offset, bin_length]
+
+    buffers = []
+    for number, buffer in enumerate(document.get("buffers", [])):
+        # Only the first buffer may live in the BIN chunk, and only if it has no uri
+        embedded = number == 0 and "uri" not in buffer and bin_range is not None
+        buffers.append([bin_range[0], buffer["byteLength"]] if embedded and buffer["byteLength"] <= bin_range[1]
+                       else None)
+
+    buffer_views = []
+    for view in document.get("bufferViews", []):
+        buffer = buffers[view["buffer"]] if view["buffer"] < len(buffers) else None
+        start = view.get("byteOffset", 0)
+        inside = buffer is not None and start + view["byteLength"] <= buffer[1]
+        buffer_views.append([buffer[0] + start, view["byteLength"]] if inside else None)
+
+    return {
+        "size_bytes": size,
+        "json_offset": JSON_OFFSET,
+        "json_length": json_length,
+        "buffers": buffers,
+        "buffer_views": buffer_views,
+    }
+
+
+class GltfIndexer:
+    """Builds, persists and resolves the byte layout of glTF/GLB items (see GltfIndex).
+
+    Each model is indexed once, reading only its GLB header and JSON chunk
+    from storage: .glb originals directly, .gltf originals through their GLB
+    variant (so GLB conversion must be enabled for them). Afterwards the JSON
+    chunk, buffers and buffer views can be served as plain byte ranges of
+    the stored file, from any backend. Failed builds are not retried for
+    RETRY_FAILED_AFTER seconds.
+    """
+
+    def __init__(self, storage: StorageInterface, glb_converter: GlbConverter, at_ingest: bool = True):
+        """Configures the indexer.
+
+        Args:
+            storage: Backend storing originals and variants
+            glb_converter: Builder of the GLB variants of .gltf originals
+            at_ingest: Index right after an upload instead of on first request
+        """
+        self.storage = storage
+        self.glb_converter = glb_converter
+        self.at_ingest = at_ingest
+        self.pool = IOPool(max_workers=1, max_queue=8, name="gltf-index")
+        self._known: "OrderedDict[int, dict]" = OrderedDict()
+        # Time of the last failed build of each item
+        self._failed: "OrderedDict[int, float]" = OrderedDict()
+        self._building: Dict[int, asyncio.Task] = {}
+        self.indexed = 0
+        self.failed = 0
+
+    def accepts(self, obj: StoredObject) -> bool:
+        """Whether an original can be indexed: .glb files, and .gltf files converted to GLB."""
+        name = obj.filename.lower()
+        return name.endswith(".glb") or (
+            name.endswith(".gltf") and self.glb_converter.enabled and self.glb_converter.accepts(obj)
+        )
+
+    def ingested(self, obj: StoredObject) -> None:
+        """Schedules indexing of a new upload if it is indexed at ingest."""
+        if self.at_ingest and self.accepts(obj):
+            self._schedule(obj)
+
+    async def lookup(self, obj: StoredObject) -> Tuple[Optional[StoredObject], Optional[dict]]:
+        """Resolves the index of an original, building it if it does not exist yet.
+
+        Args:
+            obj: Handle of the original
+
+        Returns:
+            Tuple of the handle of the indexed file (the original or its GLB
+            variant) and the index, or (None, None) if the item cannot be indexed
+        """
+        if obj.item_id in self._known:
+            index = self._known[obj.item_id]
+        elif self._failed_recently(obj.item_id):
+            return None, None
+        else:
+            task = self._building.get(obj.item_id)
+            if task is None:
+                async with SessionLocal() as db:
+                    index = await self._find(db, obj.item_id)
+                if index is not None:
+                    self._remember(self._known, obj.item_id, index)
+                elif not self.accepts(obj):
+                    return None, None
+                else:
+                    task = self._schedule(obj)
+            if task is not None:
+                # Shielded, so a cancelled request does not abort the shared build
+                index = await asyncio.shield(task)
+        if index is None:
+            return None, None
+        if index["variant"] is None:
+            return obj, index
+        return await self.glb_converter.variant(obj, wait=True), index
+
+    def forget(self, item_id: int) -> None:
+        """Drops the remembered index of a deleted item."""
+        self._known.pop(item_id, None)
+        self._failed.pop(item_id, None)
+
+    @staticmethod
+    async def drop(db: AsyncSession, item_id: int) -> None:
+        """Deletes the persisted index of a deleted item, and commits."""
+        await db.execute(delete(GltfIndex).where(GltfIndex.item_id == item_id))
+        await db.commit()
+
+    def _failed_recently(self, item_id: int) -> bool:
+        failed_at = self._failed.get(item_id)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at < RETRY_FAILED_AFTER:
+            return True
+        del self._failed[item_id]
+        return False
+
+    @staticmethod
+    def _remember(entries: OrderedDict, item_id: int, value) -> None:
+        entries[item_id] = value
+        entries.move_to_end(item_id)
+        if len(entries) > KNOWN_INDEXES:
+            entries.popitem(last=False)
+
+    def _schedule(self, obj: StoredObject) -> asyncio.Task:
+        if obj.item_id not in self._building:
+            self._building[obj.item_id] = asyncio.ensure_future(self._build(obj))
+        return self._building[obj.item_id]
+
+    async def _build(self, obj: StoredObject) -> Optional[dict]:
+        try:
+            source = obj
+            if not obj.filename.lower().endswith(".glb"):
+                source = await self.glb_converter.variant(obj, wait=True)
+                if source is None:
+                    raise ValueError("no GLB variant")
+            header = await self._read(source, 0, JSON_OFFSET)
+            prefix_length = min(JSON_OFFSET + json_chunk_length(header) + CHUNK_HEADER.size, source.size)
+            prefix = await self._read(source, 0, prefix_length)
+            index = {"variant": source.variant, **await self.pool.run("index", index_glb, prefix, source.size)}
+            async with SessionLocal() as db:
+                index = await self._store(db, obj.item_id, index)
+            self._remember(self._known, obj.item_id, index)
+            self.indexed += 1
+            return index
+        except Exception as e:
+            # Not retried for a while; files that cannot be parsed would fail again
+            self._remember(self._failed, obj.item_id, time.monotonic())
+            self.failed += 1
+            print(f"Indexing glTF item {obj.item_id} failed: {str(e)}")
+            return None
+        finally:
+            self._building.pop(obj.item_id, None)
+
+    async def _read(self, obj: StoredObject, offset: int, length: int) -> bytes:
+        return b"".join([chunk async for chunk in self.storage.iter_chunks(obj, offset, length)])
+
+    @staticmethod
+    async def _find(db: AsyncSession, item_id: int) -> Optional[dict]:
+        row = (await db.execute(
+            select(
+                GltfIndex.variant, GltfIndex.size_bytes, GltfIndex.json_offset, GltfIndex.json_length,
+                GltfIndex.buffers, GltfIndex.buffer_views
+            ).where(GltfIndex.item_id == item_id)
+        )).first()
+        return None if row is None else dict(row._mapping)
+
+    async def _store(self, db: AsyncSession, item_id: int, index: dict) -> dict:
+        try:
+            db.add(GltfIndex(item_id=item_id, **index))
+            await db.commit()
+        except IntegrityError:
+            # Indexed concurrently (e.g. by another worker)
+            await db.rollback()
+            existing = await self._find(db, item_id)
+            if existing is None:
+                raise
+            return existing
+        return index
+
+    async def shutdown(self) -> None:
+        """Cancels indexing still running and stops the worker thread."""
+        for task in list(self._building.values()):
+            task.cancel()
+        self.pool.shutdown()
+
+    def stats(self) -> dict:
+        """Returns indexing counters and the worker pool gauges."""
+        return {
+            "building": len(self._building),
+            "indexed": self.indexed,
+            "failed": self.failed,
+            "pool": self.pool.stats(),
+        }
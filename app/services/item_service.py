@@ -1,11 +1,34 @@
+import re
+from typing import List, Optional
+
 from fastapi import HTTPException, UploadFile
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import get_storage_backend
-from app.models import Item
+from app.config import (
+    get_glb_converter, get_gltf_compactor, get_gltf_indexer, get_lod_generator, get_precompressor,
+    get_storage_backend
+)
+from app.models import SessionLocal
+from app.storage_backends import variants
+from app.storage_backends.base_interface import StoredObject
+from app.storage_backends.metadata_index import ChangeListener, publish_change
+from app.storage_backends.streaming import IngestStream
 
 storage_backend = get_storage_backend()
+precompressor = get_precompressor(storage_backend)
+glb_converter = get_glb_converter(storage_backend)
+gltf_compactor = get_gltf_compactor(storage_backend)
+lod_generator = get_lod_generator(storage_backend)
+gltf_indexer = get_gltf_indexer(storage_backend, glb_converter)
+# Deletions announced by any worker process (see publish_change)
+variant_changes = ChangeListener(lambda op, item_id: ItemService._forget_variants(item_id) if op == "delete" else None)
+
+# Hex SHA-256 digest as used for content hashes
+CONTENT_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+# Most files accepted by one batch upload
+MAX_BATCH_FILES = 500
+# Most items served by one bulk download
+MAX_BULK_ITEMS = 1000
 
 
 class ItemService:
@@ -15,6 +38,31 @@ class ItemService:
     This class provides methods for creating, updating, retrieving, downloading, and deleting items.
     """
 
+    @staticmethod
+    async def startup():
+        """
+        Prepare the storage backend (e.g. load the metadata index) when the application starts,
+        and follow deletions by other worker processes to drop their remembered variants.
+        """
+        await storage_backend.startup()
+        try:
+            await variant_changes.start()
+        except Exception as e:
+            print(f"Change notifications unavailable: {str(e)}")
+
+    @staticmethod
+    async def shutdown():
+        """
+        Release resources held by the storage backend when the application stops.
+        """
+        await variant_changes.close()
+        await precompressor.shutdown()
+        await glb_converter.shutdown()
+        await gltf_compactor.shutdown()
+        await lod_generator.shutdown()
+        await gltf_indexer.shutdown()
+        await storage_backend.shutdown()
+
     @staticmethod
     async def create_item(db: AsyncSession, name: str, description: str, file: UploadFile):
         """
@@ -34,32 +82,346 @@ class ItemService:
         """
         if not name or not description:
             raise HTTPException(status_code=400, detail="Name and description are required fields.")
-        file_bytes = await file.read()
-        return await storage_backend.save_file(db, name, file_bytes)
+        # Hashing the spooled upload first lets deduplicating backends skip writing known content
+        stream = await IngestStream.from_received_upload(file)
+        return ItemService._ingested(await storage_backend.save_stream(db, name, stream))
 
     @staticmethod
-    async def download_item(db: AsyncSession, item_id: int):
+    async def create_items(
+            db: AsyncSession,
+            description: str,
+            files: List[UploadFile],
+            names: Optional[List[str]] = None
+    ):
         """
-        Retrieve the file associated with an item by its ID.
+        Create items from several uploaded files at once.
+
+        The backend stores the files of the batch concurrently (where it can) and records all items
+        in one transaction. Files that cannot be stored are reported individually; what was written
+        for them is removed again.
 
         Parameters:
             - db: Database session.
+            - description: The description of the items.
+            - files: The files to be uploaded.
+            - names: Optional names of the items, one per file (default: the uploaded filenames).
+
+        Returns:
+            - The number of created and failed items, and per file its name, status code and either
+              the created item or the error detail, in upload order.
+
+        Raises:
+            - HTTPException with status code 400 if the description is missing, no files are given,
+              or the number of names does not match the number of files.
+            - HTTPException with status code 413 if more than MAX_BATCH_FILES files are uploaded.
+        """
+        if not description:
+            raise HTTPException(status_code=400, detail="Description is a required field.")
+        if not files:
+            raise HTTPException(status_code=400, detail="At least one file is required.")
+        if len(files) > MAX_BATCH_FILES:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} files per batch.")
+        if names and len(names) != len(files):
+            raise HTTPException(status_code=400, detail="Provide exactly one name per file.")
+        names = names or [file.filename for file in files]
+        if not all(names):
+            raise HTTPException(status_code=400, detail="Every file needs a name.")
+
+        uploads = [(name, await IngestStream.from_received_upload(file)) for name, file in zip(names, files)]
+        results = []
+        for name, outcome in zip(names, await storage_backend.save_batch(db, uploads)):
+            if isinstance(outcome, HTTPException):
+                results.append({"name": name, "status": outcome.status_code, "detail": outcome.detail})
+            else:
+                results.append({"name": name, "status": 200, "item": ItemService._ingested(outcome)})
+        created = sum(1 for result in results if result["status"] == 200)
+        return {"created": created, "failed": len(results) - created, "results": results}
+
+    @staticmethod
+    def _ingested(item):
+        """Hands a new item to the background stages that derive variants from it."""
+        if item.size_bytes is not None:
+            obj = StoredObject.of_item(item)
+            precompressor.ingested(obj)
+            glb_converter.ingested(obj)
+            gltf_compactor.ingested(obj)
+            lod_generator.ingested(obj)
+            gltf_indexer.ingested(obj)
+        return item
+
+    @staticmethod
+    async def find_content(db: AsyncSession, content_hash: str):
+        """
+        Check whether content is already stored, so a client can skip uploading it.
+
+        Parameters:
+            - db: Database session.
+            - content_hash: Hex SHA-256 digest of the content.
+
+        Returns:
+            - The content hash and its size in bytes.
+
+        Raises:
+            - HTTPException with status code 400 if the hash is malformed.
+            - HTTPException with status code 404 if the content is not stored (or deduplication is disabled).
+        """
+        size = await storage_backend.content_size(db, ItemService._content_hash(content_hash))
+        if size is None:
+            raise HTTPException(status_code=404, detail="Content not found")
+        return {"content_hash": content_hash, "size_bytes": size}
+
+    @staticmethod
+    async def create_item_from_content(db: AsyncSession, name: str, description: str, content_hash: str):
+        """
+        Create a new item sharing already stored content, without uploading it again.
+
+        Parameters:
+            - db: Database session.
+            - name: The name of the item.
+            - description: The description of the item.
+            - content_hash: Hex SHA-256 digest of the content.
+
+        Returns:
+            - The newly created item, including its ID.
+
+        Raises:
+            - HTTPException with status code 400 if a field is missing or the hash is malformed.
+            - HTTPException with status code 404 if the content is not stored (or deduplication is disabled).
+        """
+        if not name or not description:
+            raise HTTPException(status_code=400, detail="Name and description are required fields.")
+        item = await storage_backend.link_content(db, name, ItemService._content_hash(content_hash))
+        if item is None:
+            raise HTTPException(status_code=404, detail="Content not found")
+        return ItemService._ingested(item)
+
+    @staticmethod
+    def _content_hash(content_hash: str) -> str:
+        if not CONTENT_HASH_PATTERN.fullmatch(content_hash):
+            raise HTTPException(status_code=400, detail="Content hash must be a lowercase hex SHA-256 digest.")
+        return content_hash
+
+    @staticmethod
+    async def download_item(item_id: int):
+        """
+        Resolve the file associated with an item by its ID for streaming.
+
+        The session is opened here rather than injected, as it only checks out a pooled
+        connection if no in-memory layer (metadata index, caches) can resolve the item.
+        The download is recorded with the backend (see StorageInterface.record_access).
+
+        Parameters:
             - item_id: The unique ID of the item whose file to retrieve.
 
         Returns:
-            - The file associated with the item as a file response.
+            - The StoredObject handle (filename, size) to pass to stream_item.
 
         Raises:
             - HTTPException with status code 404 if the item or the file is not found.
         """
-        stmt = select(Item).where(Item.id == item_id)
-        result = await db.execute(stmt)
-        item = result.scalars().first()
+        async with SessionLocal() as db:
+            obj = await storage_backend.open_file(db, item_id)
+        storage_backend.record_access(obj)
+        return obj
 
-        if item is None:
-            raise HTTPException(status_code=404, detail="Item not found")
+    @staticmethod
+    async def download_items(item_ids: List[int]):
+        """
+        Resolve the files of several items at once for a bulk download.
+
+        Items unknown to the in-memory layers are resolved with a single metadata query.
+
+        Parameters:
+            - item_ids: The IDs of the items; repeated IDs are served once.
+
+        Returns:
+            - The StoredObject handles of the files, in request order.
+
+        Raises:
+            - HTTPException with status code 400 if no IDs are given.
+            - HTTPException with status code 413 if more than MAX_BULK_ITEMS items are requested.
+            - HTTPException with status code 404 listing the items or files that are not found.
+        """
+        item_ids = list(dict.fromkeys(item_ids))
+        if not item_ids:
+            raise HTTPException(status_code=400, detail="At least one item ID is required.")
+        if len(item_ids) > MAX_BULK_ITEMS:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per download.")
+        async with SessionLocal() as db:
+            objects = await storage_backend.open_files(db, item_ids)
+        missing = [item_id for item_id in item_ids if item_id not in objects]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Items not found: {', '.join(map(str, missing))}")
+        for obj in objects.values():
+            storage_backend.record_access(obj)
+        return [objects[item_id] for item_id in item_ids]
+
+    @staticmethod
+    def content_encodings() -> List[str]:
+        """
+        List the content codings downloads may be served in, in server preference order.
+
+        Returns:
+            - The configured precompression encodings (empty if disabled).
+        """
+        return precompressor.encodings
+
+    @staticmethod
+    async def encoded_variant(obj: StoredObject, accepted: List[str]):
+        """
+        Resolve a precompressed variant of a resolved item file.
+
+        Parameters:
+            - obj: Handle returned by download_item.
+            - accepted: Content codings acceptable to the client, most preferred first.
+
+        Returns:
+            - The StoredObject handle of the variant to serve, or None to serve the original.
+        """
+        return await precompressor.variant(obj, accepted)
+
+    @staticmethod
+    def glb_enabled() -> bool:
+        """
+        Tell whether binary GLB variants of glTF files are offered.
+
+        Returns:
+            - True if GLB conversion is enabled.
+        """
+        return glb_converter.enabled
 
-        return await storage_backend.load_file(db, item.id), item.filename
+    @staticmethod
+    async def glb_variant(obj: StoredObject, wait: bool = False):
+        """
+        Resolve the binary GLB variant of a resolved glTF item file.
+
+        Parameters:
+            - obj: Handle returned by download_item.
+            - wait: Wait for the conversion if it has not run yet (e.g. when explicitly requested).
+
+        Returns:
+            - The StoredObject handle of the GLB variant, or None if there is none (yet).
+        """
+        return await glb_converter.variant(obj, wait)
+
+    @staticmethod
+    async def compact_variant(obj: StoredObject, wait: bool = False):
+        """
+        Resolve the compact (quantized, stripped) GLB variant of a resolved glTF/GLB item file.
+
+        Parameters:
+            - obj: Handle returned by download_item.
+            - wait: Wait for the optimisation if it has not run yet.
+
+        Returns:
+            - The StoredObject handle of the compact variant, or None if there is none (yet).
+        """
+        return await gltf_compactor.variant(obj, wait)
+
+    @staticmethod
+    async def lod_variant(obj: StoredObject, level: int, wait: bool = False):
+        """
+        Resolve a level-of-detail variant of a resolved glTF/GLB item file.
+
+        Parameters:
+            - obj: Handle returned by download_item.
+            - level: LOD level, 1 being the finest generated level.
+            - wait: Wait for the level to be generated if it has not been yet.
+
+        Returns:
+            - The StoredObject handle of the LOD variant, or None if there is none (yet).
+        """
+        return await lod_generator.variant(obj, level, wait)
+
+    @staticmethod
+    async def gltf_index(item_id: int):
+        """
+        Resolve the byte layout of a glTF/GLB item, indexing it on first use.
+
+        Parameters:
+            - item_id: The unique ID of the item.
+
+        Returns:
+            - The StoredObject handle of the indexed GLB file (the original or its GLB variant)
+              and the index with the [offset, length] of its JSON chunk, buffers and buffer views.
+
+        Raises:
+            - HTTPException with status code 404 if the item is not found or cannot be indexed.
+        """
+        obj = await ItemService.download_item(item_id)
+        source, index = await gltf_indexer.lookup(obj)
+        if source is None:
+            raise HTTPException(status_code=404, detail=f"Item {item_id} is not an indexable glTF/GLB model")
+        return source, index
+
+    @staticmethod
+    async def list_variants(db: AsyncSession, item_id: int):
+        """
+        List the stored variants of an item, with their build reports (e.g. bytes saved).
+
+        Parameters:
+            - db: Database session.
+            - item_id: The unique ID of the item.
+
+        Returns:
+            - A list of variants with name, filename, encoding, size, content hash and report.
+
+        Raises:
+            - HTTPException with status code 404 if the item is not found.
+        """
+        await storage_backend.open_file(db, item_id)
+        return [
+            {
+                "name": row.name,
+                "filename": row.filename,
+                "encoding": row.encoding,
+                "size_bytes": row.size_bytes,
+                "content_hash": row.content_hash,
+                "report": row.report,
+            }
+            for row in await variants.list_all(db, item_id)
+        ]
+
+    @staticmethod
+    def stream_item(obj: StoredObject, offset: int = 0, length: Optional[int] = None):
+        """
+        Stream a byte range of a resolved item file from the storage backend.
+
+        Parameters:
+            - obj: Handle returned by download_item.
+            - offset: Position of the first byte to stream.
+            - length: Number of bytes to stream (None for the rest of the file).
+
+        Returns:
+            - An async iterator yielding the requested bytes chunk by chunk.
+        """
+        return storage_backend.iter_chunks(obj, offset, length)
+
+    @staticmethod
+    def local_path(obj: StoredObject):
+        """
+        Return the local filesystem path of a resolved item file, if the backend serves from local disk.
+
+        Parameters:
+            - obj: Handle returned by download_item.
+
+        Returns:
+            - The path to hand to a sendfile response, or None if the file must be streamed.
+        """
+        return storage_backend.local_path(obj)
+
+    @staticmethod
+    def redirect_url(obj: StoredObject):
+        """
+        Return a short-lived URL the client can download a resolved item file from directly, if enabled.
+
+        Parameters:
+            - obj: Handle returned by download_item.
+
+        Returns:
+            - The URL to redirect the client to, or None if the file must be served by the API.
+        """
+        return storage_backend.redirect_url(obj)
 
     @staticmethod
     async def delete_item(db: AsyncSession, item_id: int):
@@ -78,5 +440,35 @@ class ItemService:
         """
 
         await storage_backend.delete_file(db, item_id)
+        ItemService._forget_variants(item_id)
+        await gltf_indexer.drop(db, item_id)
+        # Lets the metadata indexes and variant builders of all worker processes forget the item
+        await publish_change("delete", item_id)
 
         return {"message": "Item deleted successfully"}
+
+    @staticmethod
+    def _forget_variants(item_id: int):
+        """Drops the variants of a deleted item remembered by the builders of this process."""
+        precompressor.forget(item_id)
+        glb_converter.forget(item_id)
+        gltf_compactor.forget(item_id)
+        lod_generator.forget(item_id)
+        gltf_indexer.forget(item_id)
+
+    @staticmethod
+    def storage_stats():
+        """
+        Collect runtime counters of the configured storage backend (e.g. cache hits and misses).
+
+        Returns:
+            - A dictionary of counters, grouped by component.
+        """
+        return {
+            **storage_backend.stats(),
+            "precompression": precompressor.stats(),
+            "glb_conversion": glb_converter.stats(),
+            "gltf_compaction": gltf_compactor.stats(),
+            "lod_generation": lod_generator.stats(),
+            "gltf_index": gltf_indexer.stats(),
+        }
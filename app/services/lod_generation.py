@@ -0,0 +1,234 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pygltflib import Accessor
+
+from app.services.gltf_compaction import (
+    FLOAT, UNSIGNED_INT, UNSIGNED_SHORT, attribute_accessors, check_extensions, read_accessor, repack_gltf
+)
+from app.services.gltf_conversion import load_gltf
+from app.services.variant_builder import Derived, VariantBuilder
+from app.storage_backends.base_interface import StorageInterface, StoredObject
+from app.storage_backends.streaming import IngestStream
+
+# LOD variants are named lod1 (finest) .. lodN (coarsest); level 0 is the original
+LOD_PREFIX = "lod"
+TRIANGLES = 4
+
+
+def lod_variant(level: int) -> str:
+    """Returns the variant name of an LOD level (1 = finest generated level)."""
+    return f"{LOD_PREFIX}{level}"
+
+
+def _clusters(positions: np.ndarray, grid: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Assigns vertices to the cells of a uniform grid over their bounding box.
+
+    Returns:
+        Tuple of the cluster of each vertex and the first vertex of each cluster
+    """
+    low = positions.min(axis=0)
+    cell = float(np.max(positions.max(axis=0) - low)) / grid or 1.0
+    cells = np.clip(np.floor((positions - low) / cell).astype(np.int64), 0, grid - 1)
+    keys = cells[:, 0] + grid * (cells[:, 1] + grid * cells[:, 2])
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return inverse.ravel(), first
+
+
+def _triangles(indices: np.ndarray, clusters: np.ndarray) -> np.ndarray:
+    """Maps triangles onto clusters, dropping collapsed and duplicate ones (keeping order and winding)."""
+    triangles = clusters[indices.reshape(-1, 3)]
+    triangles = triangles[
+        (triangles[:, 0] != triangles[:, 1])
+        & (triangles[:, 1] != triangles[:, 2])
+        & (triangles[:, 0] != triangles[:, 2])
+    ]
+    if not len(triangles):
+        return triangles.ravel()
+    _, first = np.unique(np.sort(triangles, axis=1), axis=0, return_index=True)
+    return triangles[np.sort(first)].ravel()
+
+
+def _drop_empty_primitives(gltf, rewritten: Dict[int, Tuple[np.ndarray, int, bool]]) -> int:
+    """Removes primitives whose triangles all collapsed, then meshes left without primitives.
+
+    glTF requires accessors and buffer views to hold at least one element or
+    byte, and meshes at least one primitive. Nodes of removed meshes keep
+    their transform and children, but lose the mesh and its skin and weights.
+
+    Returns:
+        int: Number of removed primitives
+    """
+    removed = 0
+    for mesh in gltf.meshes:
+        kept = [p for p in mesh.primitives if p.indices not in rewritten or len(rewritten[p.indices][0])]
+        removed += len(mesh.primitives) - len(kept)
+        mesh.primitives = kept
+
+    mesh_map: Dict[int, int] = {}
+    for index, mesh in enumerate(gltf.meshes):
+        if mesh.primitives:
+            mesh_map[index] = len(mesh_map)
+    for node in gltf.nodes:
+        if node.mesh is not None:
+            node.mesh = mesh_map.get(node.mesh)
+            if node.mesh is None:
+                node.skin = None
+                node.weights = None
+    gltf.meshes = [mesh for mesh in gltf.meshes if mesh.primitives]
+    return removed
+
+
+def simplify_gltf(data: bytes, grid: int) -> Tuple[List[bytes], dict]:
+    """Decimates the triangle meshes of a glTF/GLB model by vertex clustering and packs it as GLB.
+
+    Vertices sharing a cell of a ``grid``³ grid over the bounding box of
+    their vertex set are merged into one, placed at their mean position and
+    keeping the other attributes (normals, texture coordinates, skin weights)
+    of the first merged vertex. Triangles that collapse or become duplicates
+    are dropped, and so are primitives left without triangles and meshes left
+    without primitives. Primitives sharing vertex attributes are simplified
+    together; non-triangle primitives, morph targets and quantized positions
+    are left as they are.
+
+    Args:
+        data: Content of a .gltf file with embedded buffers or of a .glb file
+        grid: Cells per axis; smaller grids give coarser models
+
+    Returns:
+        Tuple of the GLB chunks in file order and a report with vertex and
+        triangle counts before and after and the number of removed primitives
+
+    Raises:
+        ValueError: For invalid files, external buffers, sparse accessors or
+            extensions that are not known to be safe (see check_extensions)
+    """
+    gltf, buffers = load_gltf(data)
+    check_extensions(gltf)
+    report = {
+        "grid": grid, "vertices": 0, "lod_vertices": 0, "triangles": 0, "lod_triangles": 0, "removed_primitives": 0
+    }
+
+    # Primitives grouped by their vertex attributes, which are simplified together
+    groups: Dict[Tuple[Tuple[str, int], ...], list] = {}
+    attribute_users: Dict[int, set] = {}
+    index_users: Dict[int, set] = {}
+    for mesh in gltf.meshes:
+        for primitive in mesh.primitives:
+            attributes = tuple(sorted(attribute_accessors(primitive.attributes).items()))
+            groups.setdefault(attributes, []).append(primitive)
+            for _, index in attributes:
+                attribute_users.setdefault(index, set()).add(attributes)
+            if primitive.indices is not None:
+                index_users.setdefault(primitive.indices, set()).add(attributes)
+
+    rewritten: Dict[int, Tuple[np.ndarray, int, bool]] = {}
+    for attributes, primitives in groups.items():
+        semantics = dict(attributes)
+        position = semantics.get("POSITION")
+        if (
+                position is None
+                or gltf.accessors[position].componentType != FLOAT
+                or gltf.accessors[position].type != "VEC3"
+                or any((p.mode if p.mode is not None else TRIANGLES) != TRIANGLES or p.targets for p in primitives)
+                or any(attribute_users[index] != {attributes} for _, index in attributes)
+                or any(p.indices is not None and index_users[p.indices] != {attributes} for p in primitives)
+        ):
+            continue
+        positions = read_accessor(gltf, buffers, position).astype(np.float64)
+        if not len(positions):
+            continue
+        clusters, first = _clusters(positions, grid)
+        counts = np.bincount(clusters)
+        merged = np.stack([np.bincount(clusters, positions[:, axis]) for axis in range(3)], axis=1)
+        rewritten[position] = ((merged / counts[:, None]).astype(np.float32), FLOAT, False)
+        for _, index in attributes:
+            if index != position:
+                accessor = gltf.accessors[index]
+                rewritten[index] = (read_accessor(gltf, buffers, index)[first], accessor.componentType,
+                                    bool(accessor.normalized))
+        report["vertices"] += len(positions)
+        report["lod_vertices"] += len(first)
+
+        index_type, index_dtype = (UNSIGNED_SHORT, np.uint16) if len(first) < 65535 else (UNSIGNED_INT, np.uint32)
+        for primitive in primitives:
+            if primitive.indices is None:
+                indices = np.arange(len(positions))
+                gltf.accessors.append(Accessor(componentType=index_type, count=0, type="SCALAR"))
+                primitive.indices = len(gltf.accessors) - 1
+            elif primitive.indices in rewritten:
+                continue
+            else:
+                indices = read_accessor(gltf, buffers, primitive.indices).ravel()
+            triangles = _triangles(indices[:len(indices) - len(indices) % 3], clusters)
+            rewritten[primitive.indices] = (triangles.astype(index_dtype)[:, None], index_type, False)
+            report["triangles"] += len(indices) // 3
+            report["lod_triangles"] += len(triangles) // 3
+
+    report["removed_primitives"] = _drop_empty_primitives(gltf, rewritten)
+    chunks, _ = repack_gltf(gltf, buffers, rewritten)
+    return chunks, report
+
+
+class LodGenerator(VariantBuilder):
+    """Builds decimated level-of-detail GLB variants of uploaded glTF/GLB models.
+
+    Level ``n`` is the model simplified by :func:`simplify_gltf` on the
+    ``n``-th configured grid, so clients can render a coarse model first and
+    fetch finer levels (and finally the original) later. Each level is stored
+    as its own variant, with vertex and triangle counts as report.
+    """
+
+    def __init__(
+            self,
+            storage: StorageInterface,
+            grids: List[int],
+            at_ingest: bool = True,
+            workers: int = 2,
+            max_bytes: int = 512 * 1024 ** 2
+    ):
+        """Configures the levels to build.
+
+        Args:
+            storage: Backend storing originals and variants
+            grids: Grid resolution of each level, finest first; empty disables LODs
+            at_ingest: Build all levels right after an upload instead of on first request
+            workers: Threads simplifying concurrently
+            max_bytes: Largest original processed; simplification holds it in memory
+        """
+        super().__init__(
+            storage, [lod_variant(level) for level in range(1, len(grids) + 1)], at_ingest, workers, name="lod"
+        )
+        self.grids = dict(zip(self.variants, grids))
+        self.max_bytes = max_bytes
+
+    @property
+    def levels(self) -> int:
+        """Number of generated levels."""
+        return len(self.variants)
+
+    def accepts(self, obj: StoredObject) -> bool:
+        """Only .gltf and .glb files within the size limit are simplified."""
+        return obj.filename.lower().endswith((".gltf", ".glb")) and obj.size <= self.max_bytes
+
+    async def variant(self, obj: StoredObject, level: int, wait: bool = False) -> Optional[StoredObject]:
+        """Resolves an LOD variant of an original.
+
+        Args:
+            obj: Handle of the original
+            level: LOD level, 1 (finest) to :attr:`levels` (coarsest)
+            wait: Wait for the level to be built if it has not been yet
+
+        Returns:
+            StoredObject | None: Handle of the LOD variant, or None if not (yet) available
+        """
+        if not 1 <= level <= self.levels:
+            return None
+        return await self.lookup(obj, lod_variant(level), wait)
+
+    async def _derive(self, obj: StoredObject, variant: str) -> Derived:
+        data = b"".join([chunk async for chunk in self.storage.iter_chunks(obj)])
+        chunks, report = await self.pool.run("simplify", simplify_gltf, data, self.grids[variant])
+        stream = IngestStream.from_chunks(chunks)
+        return Derived(stream, f"{os.path.splitext(obj.filename)[0]}.{variant}.glb", report=report)
@@ -0,0 +1,110 @@
+import zlib
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional
+
+from app.services.variant_builder import Derived, VariantBuilder
+from app.storage_backends.base_interface import StorageInterface, StoredObject
+from app.storage_backends.streaming import IngestStream
+
+try:
+    import brotli
+except ImportError:  # optional dependency, 'br' is unavailable without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, 'zstd' is unavailable without it
+    zstandard = None
+
+
+class _Compressor:
+    """Uniform incremental interface over the codec libraries."""
+
+    def __init__(self, compress, flush):
+        self.compress = compress
+        self.flush = flush
+
+
+def _gzip() -> _Compressor:
+    # wbits=31 writes a gzip container; maximum level, as each variant is compressed once
+    codec = zlib.compressobj(9, zlib.DEFLATED, 31)
+    return _Compressor(codec.compress, codec.flush)
+
+
+def _brotli() -> _Compressor:
+    codec = brotli.Compressor(quality=11)
+    return _Compressor(codec.process, codec.finish)
+
+
+def _zstd() -> _Compressor:
+    codec = zstandard.ZstdCompressor(level=19).compressobj()
+    return _Compressor(codec.compress, codec.flush)
+
+
+# Supported content codings in order of preference (best ratio first)
+CODECS = OrderedDict(
+    (encoding, factory) for encoding, factory in (
+        ("br", _brotli if brotli is not None else None),
+        ("zstd", _zstd if zstandard is not None else None),
+        ("gzip", _gzip),
+    ) if factory is not None
+)
+
+
+class Precompressor(VariantBuilder):
+    """Builds and resolves precompressed variants of items (gzip, br, zstd).
+
+    Each encoding of an item is compressed once, streamed from the original,
+    and stored as a variant named after the encoding, so downloads serve it
+    without compressing per request. Until it is built, the original is served.
+    """
+
+    def __init__(
+            self,
+            storage: StorageInterface,
+            encodings: List[str],
+            at_ingest: bool = True,
+            workers: int = 2
+    ):
+        """Configures the encodings to build.
+
+        Args:
+            storage: Backend storing originals and variants
+            encodings: Content codings to offer; unsupported ones are ignored
+            at_ingest: Build all variants right after an upload instead of on first request
+            workers: Threads compressing concurrently
+        """
+        offered = [encoding for encoding in CODECS if encoding in encodings]
+        super().__init__(storage, offered, at_ingest, workers, name="precompress")
+
+    @property
+    def encodings(self) -> List[str]:
+        """Offered content codings, in server preference order."""
+        return self.variants
+
+    async def variant(self, obj: StoredObject, accepted: List[str]) -> Optional[StoredObject]:
+        """Returns the first accepted variant that is built and smaller than the original.
+
+        Args:
+            obj: Handle of the original
+            accepted: Content codings acceptable to the client, most preferred first
+
+        Returns:
+            StoredObject | None: Handle of the variant to serve, or None to serve the original
+        """
+        for encoding in accepted:
+            found = await self.lookup(obj, encoding)
+            if found is not None and found.size < obj.size:
+                return found
+        return None
+
+    async def _derive(self, obj: StoredObject, variant: str) -> Derived:
+        return Derived(IngestStream(self._compress(self.storage.iter_chunks(obj), variant)), encoding=variant)
+
+    async def _compress(self, source: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+        codec = CODECS[encoding]()
+        async for chunk in source:
+            compressed = await self.pool.run(encoding, codec.compress, chunk)
+            if compressed:
+                yield compressed
+        yield await self.pool.run(encoding, codec.flush)
@@ -0,0 +1,201 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.models import SessionLocal
+from app.storage_backends import variants as variant_records
+from app.storage_backends.base_interface import StorageInterface, StoredObject
+from app.storage_backends.io_pool import IOPool
+from app.storage_backends.streaming import IngestStream
+
+# Variant handles (and failed builds) remembered per process; variants never change once built
+KNOWN_VARIANTS = 10000
+# Seconds after which a failed build is attempted again
+RETRY_FAILED_AFTER = 600
+
+
+class Derived:
+    """Content and metadata of a variant, as produced by :meth:`VariantBuilder._derive`.
+
+    Attributes:
+        stream (IngestStream): Variant content
+        filename (str | None): Download filename (None keeps that of the original)
+        encoding (str | None): HTTP content coding of the variant, if any
+        report (dict | None): Build details recorded with the variant
+    """
+    __slots__ = ("stream", "filename", "encoding", "report")
+
+    def __init__(
+            self,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None,
+            report: Optional[dict] = None
+    ):
+        self.stream = stream
+        self.filename = filename
+        self.encoding = encoding
+        self.report = report
+
+
+class VariantBuilder(ABC):
+    """Base class of background stages deriving ItemVariants from uploaded originals.
+
+    Each variant of an item is built once, stored by the configured backend
+    and resolved from there afterwards. Builds are scheduled right after an
+    upload (if enabled) or when a download first asks for the variant, and run
+    as background tasks whose CPU-bound work goes to a small dedicated thread
+    pool. Subclasses implement :meth:`_derive`.
+
+    Handles of built variants are remembered per process until the item is
+    deleted (ItemService forwards deletions announced by any process to
+    :meth:`forget`). Failed builds are not retried for RETRY_FAILED_AFTER seconds.
+    """
+
+    def __init__(
+            self,
+            storage: StorageInterface,
+            variants: List[str],
+            at_ingest: bool = True,
+            workers: int = 2,
+            name: str = "variants"
+    ):
+        """Configures the variants to build.
+
+        Args:
+            storage: Backend storing originals and variants
+            variants: Names of the variants this stage builds
+            at_ingest: Build variants right after an upload instead of on first request
+            workers: Threads running the CPU-bound part of builds
+            name: Thread name prefix
+        """
+        self.storage = storage
+        self.variants = variants
+        self.at_ingest = at_ingest
+        self.pool = IOPool(max_workers=workers, max_queue=workers * 4, name=name)
+        self._known: "OrderedDict[Tuple[int, str], StoredObject]" = OrderedDict()
+        # Time of the last failed build of each variant
+        self._failed: "OrderedDict[Tuple[int, str], float]" = OrderedDict()
+        self._building: Dict[Tuple[int, str], asyncio.Task] = {}
+        self.built = 0
+        self.failed = 0
+
+    def accepts(self, obj: StoredObject) -> bool:
+        """Whether variants can be derived from an original (all originals by default)."""
+        return True
+
+    def ingested(self, obj: StoredObject) -> None:
+        """Schedules all variants of a new upload if they are built at ingest."""
+        if self.at_ingest:
+            for variant in self.variants:
+                self._schedule(obj, variant)
+
+    async def lookup(self, obj: StoredObject, variant: str, wait: bool = False) -> Optional[StoredObject]:
+        """Resolves a variant of an original, scheduling its build if it does not exist yet.
+
+        Args:
+            obj: Handle of the original
+            variant: Variant name
+            wait: Wait for a missing variant to be built instead of returning None
+
+        Returns:
+            StoredObject | None: Handle of the variant, or None if it is not (yet) available
+        """
+        key = (obj.item_id, variant)
+        found = self._known.get(key)
+        if found is not None or self._failed_recently(key):
+            return found
+        task = self._building.get(key)
+        if task is None:
+            async with SessionLocal() as db:
+                found = await self.storage.open_variant(db, obj.item_id, variant)
+            if found is not None:
+                self._remember(self._known, key, found)
+                return found
+            task = self._schedule(obj, variant)
+        if task is None or not wait:
+            return None
+        # Shielded, so a cancelled download does not abort the shared build
+        return await asyncio.shield(task)
+
+    def forget(self, item_id: int) -> None:
+        """Drops remembered variants of a deleted item."""
+        for variant in self.variants:
+            self._known.pop((item_id, variant), None)
+            self._failed.pop((item_id, variant), None)
+
+    def _failed_recently(self, key: Tuple[int, str]) -> bool:
+        failed_at = self._failed.get(key)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at < RETRY_FAILED_AFTER:
+            return True
+        del self._failed[key]
+        return False
+
+    @staticmethod
+    def _remember(entries: OrderedDict, key: Tuple[int, str], value) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > KNOWN_VARIANTS:
+            entries.popitem(last=False)
+
+    def _schedule(self, obj: StoredObject, variant: str) -> Optional[asyncio.Task]:
+        key = (obj.item_id, variant)
+        if variant not in self.variants or obj.variant is not None or not self.accepts(obj):
+            return None
+        if key not in self._building:
+            self._building[key] = asyncio.ensure_future(self._build(key, obj, variant))
+        return self._building[key]
+
+    async def _build(self, key: Tuple[int, str], obj: StoredObject, variant: str) -> Optional[StoredObject]:
+        try:
+            derived = await self._derive(obj, variant)
+            async with SessionLocal() as db:
+                stored = await self.storage.save_variant(
+                    db, obj, variant, derived.stream, derived.filename, derived.encoding
+                )
+                if derived.report is not None:
+                    await variant_records.annotate(db, obj.item_id, variant, derived.report)
+            self._remember(self._known, key, stored)
+            self.built += 1
+            return stored
+        except Exception as e:
+            # Not retried for a while; originals that cannot be processed would fail again
+            self._remember(self._failed, key, time.monotonic())
+            self.failed += 1
+            print(f"Building variant {variant} of item {obj.item_id} failed: {str(e)}")
+            return None
+        finally:
+            self._building.pop(key, None)
+
+    @abstractmethod
+    async def _derive(self, obj: StoredObject, variant: str) -> Derived:
+        """Produces the content of a variant.
+
+        Args:
+            obj: Handle of the original
+            variant: Variant name
+
+        Returns:
+            Derived: Content stream and metadata of the variant
+        """
+        pass
+
+    async def shutdown(self) -> None:
+        """Cancels builds still running and stops the worker threads."""
+        for task in list(self._building.values()):
+            task.cancel()
+        self.pool.shutdown()
+
+    def stats(self) -> dict:
+        """Returns offered variants, build counters and the worker pool gauges."""
+        return {
+            "variants": self.variants,
+            "building": len(self._building),
+            "built": self.built,
+            "failed": self.failed,
+            "pool": self.pool.stats(),
+        }
@@ -0,0 +1,109 @@
+import math
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models import Item, ItemAccess, SessionLocal, engine
+
+# Items written per upsert statement (bounded by the bind parameter limits of the drivers)
+FLUSH_BATCH = 1000
+# Counters decayed below this value are dropped
+MIN_HITS = 0.01
+
+
+class AccessCounter:
+    """Counts item reads in memory and adds them to ItemAccess in batches.
+
+    Counting a read is a dict update; a flush writes the reads of all items
+    counted since the previous flush with one upsert per FLUSH_BATCH items.
+    The database write rate therefore depends on the flush interval and the
+    number of distinct items read, not on the request rate. Counters flushed
+    by several worker processes add up.
+
+    Counters decay lazily: a stored value holds the hits as of its
+    ``accessed_at`` and is decayed to the current time when it is read (see
+    decayed) or when new reads are added to it, so rows of items that are no
+    longer read are not rewritten.
+    """
+
+    def __init__(self, half_life: float = 3600.0):
+        """Sets up an empty counter.
+
+        Args:
+            half_life: Seconds after which an unread item's counter has halved
+        """
+        self.half_life = half_life
+        self._pending: Dict[int, int] = {}
+        self.counted = 0
+        self.flushed = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def decayed(self, now: Optional[float] = None):
+        """Returns the SQL expression of the ItemAccess counters decayed to ``now`` (default: the current time)."""
+        now = int(time.time()) if now is None else now
+        return ItemAccess.hits * func.exp((ItemAccess.accessed_at - now) * (math.log(2) / self.half_life))
+
+    def hit(self, item_id: int) -> None:
+        """Counts a read of an item."""
+        self._pending[item_id] = self._pending.get(item_id, 0) + 1
+        self.counted += 1
+
+    async def flush(self) -> int:
+        """Adds the reads counted since the last flush to the stored counters.
+
+        Returns:
+            int: Number of items whose counters were updated
+        """
+        pending, self._pending = self._pending, {}
+        ids = list(pending)
+        updated = 0
+        now = int(time.time())
+        for start in range(0, len(ids), FLUSH_BATCH):
+            batch = ids[start:start + FLUSH_BATCH]
+            try:
+                async with SessionLocal() as db:
+                    # Reads of items deleted in the meantime would violate the foreign key
+                    existing = (await db.execute(select(Item.id).where(Item.id.in_(batch)))).scalars().all()
+                    if existing:
+                        insert = (postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert)(
+                            ItemAccess
+                        )
+                        await db.execute(
+                            insert.on_conflict_do_update(
+                                index_elements=[ItemAccess.item_id],
+                                set_={
+                                    "hits": self.decayed(now) + insert.excluded.hits,
+                                    "accessed_at": insert.excluded.accessed_at,
+                                }
+                            ),
+                            [{"item_id": item_id, "hits": float(pending[item_id]), "accessed_at": now}
+                             for item_id in existing]
+                        )
+                        await db.commit()
+                updated += len(existing)
+            except Exception as e:
+                # Counters are a hint: a lost batch only delays promotions
+                self.failed += 1
+                print(f"Flushing access counters failed: {str(e)}")
+        self.flushed += updated
+        return updated
+
+    async def prune(self) -> None:
+        """Drops the counters that decayed below MIN_HITS."""
+        async with SessionLocal() as db:
+            await db.execute(delete(ItemAccess).where(self.decayed() < MIN_HITS))
+            await db.commit()
+
+    def stats(self) -> dict:
+        """Returns counted and flushed reads and the items waiting for the next flush."""
+        return {
+            "counted": self.counted,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed,
+            "pending": len(self._pending),
+        }
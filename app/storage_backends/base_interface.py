@@ -1,6 +1,56 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+
 from sqlalchemy.orm import Session
 from app.models import Item
+from .streaming import IngestStream, CHUNK_SIZE
+
+
+class StoredObject:
+    """Lightweight handle describing a persisted file that can be streamed.
+
+    Attributes:
+        item_id (int): Primary key of the Item record
+        filename (str): Original filename used for the download response
+        location (str | None): Filesystem path or object key (None for 'db' storage)
+        size (int): Total content size in bytes
+        content_hash (str | None): Hex SHA-256 digest of the content, if recorded
+        variant (str | None): Name of the ItemVariant this handle refers to, None for the original
+        encoding (str | None): HTTP content coding of a variant, if any
+        storage_type (str | None): Storage tier holding the content ('file', 'db', 'minio'), if known
+    """
+    __slots__ = ("item_id", "filename", "location", "size", "content_hash", "variant", "encoding", "storage_type")
+
+    def __init__(
+            self,
+            item_id: int,
+            filename: str,
+            location: Optional[str],
+            size: int,
+            content_hash: Optional[str] = None,
+            variant: Optional[str] = None,
+            encoding: Optional[str] = None,
+            storage_type: Optional[str] = None
+    ):
+        self.item_id = item_id
+        self.filename = filename
+        self.location = location
+        self.size = size
+        self.content_hash = content_hash
+        self.variant = variant
+        self.encoding = encoding
+        # Rows carry StorageTypeEnum members; handles keep the plain value
+        self.storage_type = getattr(storage_type, "value", storage_type)
+
+    @classmethod
+    def of_item(cls, item: Item) -> "StoredObject":
+        """Builds the handle of a freshly stored Item record."""
+        return cls(
+            item.id, item.filename, item.path_or_key, item.size_bytes, item.content_hash,
+            storage_type=item.storage_type
+        )
 
 
 class StorageInterface(ABC):
@@ -10,10 +60,17 @@ class StorageInterface(ABC):
     maintaining database consistency through SQLAlchemy sessions.
     """
 
-    @abstractmethod
+    async def startup(self) -> None:
+        """Prepares the backend when the application starts (no-op by default)."""
+
+    async def shutdown(self) -> None:
+        """Releases resources acquired in :meth:`startup` (no-op by default)."""
+
     async def save_file(self, db: Session, name: str, data: bytes) -> Item:
         """Persists file data to storage and creates corresponding database record.
 
+        Convenience wrapper around :meth:`save_stream` for payloads already in memory.
+
         Args:
             db: SQLAlchemy database session for transaction management
             name: Human-readable identifier for the stored file
@@ -26,8 +83,56 @@ class StorageInterface(ABC):
             ValueError: If input validation fails (e.g., empty data)
             StorageException: For implementation-specific storage errors
         """
+        return await self.save_stream(db, name, IngestStream.from_bytes(data))
+
+    @abstractmethod
+    async def save_stream(self, db: Session, name: str, stream: IngestStream) -> Item:
+        """Persists a chunked upload to storage and creates its database record.
+
+        Implementations must consume ``stream`` incrementally, keeping at most a
+        bounded number of chunks in memory, and record ``stream.size`` and
+        ``stream.content_hash`` on the created Item once it is exhausted.
+
+        Args:
+            db: SQLAlchemy database session for transaction management
+            name: Human-readable identifier for the stored file
+            stream: Upload content as an async chunk stream
+
+        Returns:
+            Item: SQLAlchemy model instance representing the stored file metadata
+
+        Raises:
+            StorageException: For implementation-specific storage errors
+        """
         pass
 
+    async def save_batch(
+            self,
+            db: Session,
+            uploads: List[Tuple[str, IngestStream]]
+    ) -> List[Union[Item, HTTPException]]:
+        """Persists several uploads, reporting the outcome per upload.
+
+        The default stores them one after the other with :meth:`save_stream`,
+        a transaction each. Backends override it to store the content of a
+        batch concurrently and record it in one transaction.
+
+        Args:
+            db: SQLAlchemy database session for transaction management
+            uploads: Name and content stream of each upload
+
+        Returns:
+            List of the created Item, or the HTTPException that made the
+            upload fail, for each upload in input order
+        """
+        results = []
+        for name, stream in uploads:
+            try:
+                results.append(await self.save_stream(db, name, stream))
+            except HTTPException as e:
+                results.append(e)
+        return results
+
     @abstractmethod
     async def load_file(self, db: Session, item_id: int) -> bytes:
         """Retrieves file content from storage using associated database ID.
@@ -58,3 +163,184 @@ class StorageInterface(ABC):
             StorageException: For implementation-specific deletion errors
         """
         pass
+
+    @abstractmethod
+    async def open_file(self, db: Session, item_id: int) -> StoredObject:
+        """Resolves an Item to a streamable handle without reading its content.
+
+        Args:
+            db: SQLAlchemy database session for the metadata lookup
+            item_id: Primary key identifier of the Item record
+
+        Returns:
+            StoredObject: Handle carrying the storage location and total size
+
+        Raises:
+            ItemNotFoundError: If no Item exists with the specified ID
+            StorageException: For implementation-specific retrieval errors
+        """
+        pass
+
+    async def open_files(self, db: Session, item_ids: List[int]) -> Dict[int, StoredObject]:
+        """Resolves several Items to streamable handles.
+
+        The default resolves them one by one with :meth:`open_file`; backends
+        override it to fetch the metadata of all items with one query.
+
+        Args:
+            db: SQLAlchemy database session for the metadata lookup
+            item_ids: Primary key identifiers of the Item records
+
+        Returns:
+            Dict[int, StoredObject]: Handles by item id; items that do not
+                exist (or whose content is missing) are left out
+        """
+        found = {}
+        for item_id in item_ids:
+            try:
+                found[item_id] = await self.open_file(db, item_id)
+            except HTTPException as e:
+                if e.status_code != 404:
+                    raise
+        return found
+
+    @abstractmethod
+    def iter_chunks(
+            self,
+            obj: StoredObject,
+            offset: int = 0,
+            length: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Streams file content in chunks of at most ``chunk_size`` bytes.
+
+        Only the requested byte range is read from the underlying storage.
+        Implementations must not hold more than one chunk in memory at a time and
+        must not depend on the request-scoped database session, as iteration
+        happens after the route handler has returned.
+
+        Args:
+            obj: Handle returned by :meth:`open_file`
+            offset: Position of the first byte to stream
+            length: Number of bytes to stream (None for everything after ``offset``)
+            chunk_size: Maximum number of bytes per yielded chunk
+
+        Yields:
+            bytes: Consecutive slices of the requested range
+        """
+        pass
+
+    @abstractmethod
+    async def save_variant(
+            self,
+            db: Session,
+            obj: StoredObject,
+            variant: str,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None
+    ) -> StoredObject:
+        """Stores a derived representation of an item (see ItemVariant) next to its original.
+
+        Args:
+            db: SQLAlchemy database session for transaction management
+            obj: Handle of the original, as returned by :meth:`open_file`
+            variant: Variant name, unique per item (e.g. 'gzip')
+            stream: Variant content as an async chunk stream
+            filename: Download filename of the variant (default: that of the original)
+            encoding: HTTP content coding of the variant, if any
+
+        Returns:
+            StoredObject: Handle of the variant, streamable like the original
+
+        Raises:
+            StorageException: For implementation-specific storage errors
+        """
+        pass
+
+    @abstractmethod
+    async def open_variant(self, db: Session, item_id: int, variant: str) -> Optional[StoredObject]:
+        """Resolves a stored variant of an item to a streamable handle.
+
+        Args:
+            db: SQLAlchemy database session for the metadata lookup
+            item_id: Primary key identifier of the Item record
+            variant: Variant name
+
+        Returns:
+            StoredObject | None: Handle of the variant, or None if it has not been built
+        """
+        pass
+
+    async def content_size(self, db: Session, content_hash: str) -> Optional[int]:
+        """Returns the size of stored content with this hash, if it can be shared by new items.
+
+        Backends deduplicating content override this (and :meth:`link_content`)
+        so clients can check for known content before uploading it.
+
+        Args:
+            db: SQLAlchemy database session for the lookup
+            content_hash: Hex SHA-256 digest of the content
+
+        Returns:
+            int | None: Content size in bytes, or None if unknown or not deduplicated
+        """
+        return None
+
+    async def link_content(self, db: Session, name: str, content_hash: str) -> Optional[Item]:
+        """Creates an item sharing already stored content, without an upload.
+
+        Args:
+            db: SQLAlchemy database session for transaction management
+            name: Human-readable identifier for the new item
+            content_hash: Hex SHA-256 digest of the content
+
+        Returns:
+            Item | None: Created record, or None if the content is unknown or not deduplicated
+        """
+        return None
+
+    def local_path(self, obj: StoredObject) -> Optional[str]:
+        """Returns a local filesystem path the server may send directly, if any.
+
+        Backends keeping files on local disk can override this to let the route
+        hand the file to the ASGI server (sendfile) instead of streaming it
+        through :meth:`iter_chunks`.
+
+        Args:
+            obj: Handle returned by :meth:`open_file`
+
+        Returns:
+            str | None: Path of the file on local disk, or None if it must be streamed
+        """
+        return None
+
+    def redirect_url(self, obj: StoredObject) -> Optional[str]:
+        """Returns a URL the client may fetch the content from directly, if any.
+
+        Backends able to hand out short-lived direct links (e.g. presigned
+        object storage URLs) can override this to take the API out of the data
+        path; the route then answers with a redirect.
+
+        Args:
+            obj: Handle returned by :meth:`open_file`
+
+        Returns:
+            str | None: URL to redirect the client to, or None if the content must be served
+        """
+        return None
+
+    def record_access(self, obj: StoredObject) -> None:
+        """Notes that a client downloaded an item (no-op by default).
+
+        Called once per download request by the service layer, above all
+        caching layers, so backends placing content by how often it is read
+        (see TieredStorage) see every read, including those served from a cache.
+
+        Args:
+            obj: Handle returned by :meth:`open_file`
+        """
+
+    def stats(self) -> dict:
+        """Returns implementation-specific runtime counters (empty by default)."""
+        return {}
@@ -0,0 +1,128 @@
+"""Batched ingest for backends storing content outside the database (see StorageInterface.save_batch).
+
+The payloads of a batch are written concurrently, then all uploads stored
+successfully are recorded in one transaction with a single batched INSERT.
+Uploads that fail are reported per file; payloads written for a batch whose
+transaction fails are removed again.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Item
+from . import content_refs
+from .streaming import IngestStream
+
+# Payloads of a batch written at the same time
+BATCH_WRITES = 16
+
+
+async def save_batch(
+        db: AsyncSession,
+        uploads: List[Tuple[str, IngestStream]],
+        storage_type: str,
+        location: Callable[[str], str],
+        blob_location: Optional[Callable[[str], str]],
+        write: Callable[[str, IngestStream], Awaitable[None]],
+        remove: Callable[[str], Awaitable[None]],
+        concurrency: int = BATCH_WRITES
+) -> List[Union[Item, HTTPException]]:
+    """Stores a batch of uploads and records them in one transaction.
+
+    Args:
+        db: Async database session of the batch transaction
+        uploads: Name and content stream of each upload
+        storage_type: Storage type recorded on the items
+        location: Maps an upload name to the path or key it is stored at
+        blob_location: Maps a content hash to the location of its shared
+            payload; None disables deduplication
+        write: Stores a stream at a location
+        remove: Removes a stored payload
+        concurrency: Payloads written at the same time
+
+    Returns:
+        List of the created Item, or the HTTPException that made the upload
+        fail, for each upload in input order
+    """
+    results: List[Union[Item, HTTPException, None]] = [None] * len(uploads)
+    locations: List[Optional[str]] = [None] * len(uploads)
+    # Whether the payload of an upload has to be written (not for references on stored blobs)
+    writes = [False] * len(uploads)
+    try:
+        # References run in the batch transaction, so they are taken one after the other
+        for i, (name, stream) in enumerate(uploads):
+            if blob_location is not None and stream.known_hash:
+                locations[i], writes[i] = await content_refs.acquire(
+                    db, stream.known_hash, stream.length, blob_location(stream.known_hash)
+                )
+            else:
+                locations[i], writes[i] = location(name), True
+    except Exception as e:
+        await db.rollback()
+        return [HTTPException(status_code=500, detail=f"Database error: {str(e)}") for _ in uploads]
+
+    targets = set()
+    for i, (name, _) in enumerate(uploads):
+        if writes[i]:
+            if locations[i] in targets:
+                results[i] = HTTPException(status_code=400, detail=f"Duplicate filename in batch: {name}")
+            targets.add(locations[i])
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def store(i: int) -> None:
+        async with slots:
+            await write(locations[i], uploads[i][1])
+
+    pending = [i for i in range(len(uploads)) if writes[i] and results[i] is None]
+    written, failed = [], set()
+    for i, outcome in zip(pending, await asyncio.gather(*(store(i) for i in pending), return_exceptions=True)):
+        if isinstance(outcome, Exception):
+            results[i] = HTTPException(status_code=500, detail=f"Storage error: {str(outcome)}")
+            failed.add(locations[i])
+        else:
+            written.append(locations[i])
+
+    items = {}
+    try:
+        for i, (name, stream) in enumerate(uploads):
+            shared = blob_location is not None and stream.known_hash
+            if results[i] is None and locations[i] in failed:
+                # Refers to a blob whose payload another upload of the batch failed to write
+                results[i] = HTTPException(status_code=500, detail="Storage error: shared payload not written")
+            if results[i] is not None:
+                if shared:
+                    await content_refs.release(db, stream.known_hash)
+                continue
+            items[i] = Item(
+                name=name,
+                filename=name,
+                path_or_key=locations[i],
+                storage_type=storage_type,
+                size_bytes=stream.length if shared else stream.size,
+                content_hash=stream.content_hash
+            )
+        db.add_all(items.values())
+        await db.flush()
+        ids = [item.id for item in items.values()]
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        for path in written:
+            try:
+                await remove(path)
+            except Exception as cleanup_error:
+                print(f"Removing {path} of a failed batch failed: {str(cleanup_error)}")
+        error = HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        return [error if result is None else result for result in results]
+
+    # One query reloads all records expired by the commit
+    if ids:
+        await db.execute(select(Item).where(Item.id.in_(ids)))
+    for i, item in items.items():
+        results[i] = item
+    return results
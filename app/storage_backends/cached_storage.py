@@ -0,0 +1,186 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Item
+from .base_interface import StorageInterface, StoredObject
+from .metadata_index import ChangeListener
+from .object_cache import ObjectCache
+from .streaming import IngestStream, CHUNK_SIZE
+
+
+class CachedStorage(StorageInterface):
+    """Read-through caching decorator for any StorageInterface implementation.
+
+    Keeps hot object payloads in process memory under a byte budget (see
+    ObjectCache), so repeated downloads of the same item skip both the metadata
+    lookup and the backend read. Entries are filled while a full download
+    streams through and invalidated on deletion, and on deletions and moves
+    published by any worker process (see ChangeListener). A generation counter
+    keeps fills from caching an item invalidated while they were streaming.
+
+    Features:
+    - Size-aware LRU eviction with TinyLFU admission
+    - Transparent wrapping of the configured backend
+    - Hit/miss/eviction counters via stats()
+    """
+
+    def __init__(self, backend: StorageInterface, cache: ObjectCache):
+        """Wraps a backend with an in-memory object cache.
+
+        Args:
+            backend: Storage implementation serving cache misses
+            cache: Object cache holding hot payloads
+        """
+        self.backend = backend
+        self.cache = cache
+        self.changes = ChangeListener(self._changed)
+        self._filling = set()
+        self._generation = 0
+
+    async def startup(self) -> None:
+        """Prepares the wrapped backend, then subscribes to change notifications."""
+        await self.backend.startup()
+        try:
+            await self.changes.start()
+        except Exception as e:
+            # Without notifications, changes made by other processes are only seen after eviction
+            print(f"Object cache change notifications unavailable: {str(e)}")
+
+    async def shutdown(self) -> None:
+        """Stops listening for change notifications and shuts the wrapped backend down."""
+        await self.changes.close()
+        await self.backend.shutdown()
+
+    def _changed(self, op: str, item_id: int) -> None:
+        # Updates move the content (e.g. to another tier): the cached handle's location is stale
+        if op in ("delete", "update"):
+            self._invalidate(item_id)
+
+    def _invalidate(self, item_id: int) -> None:
+        """Drops a cached entry and invalidates fills that are still streaming."""
+        self.cache.invalidate(item_id)
+        self._generation += 1
+
+    async def save_stream(self, db: AsyncSession, name: str, stream: IngestStream) -> Item:
+        """Delegates the upload to the wrapped backend."""
+        return await self.backend.save_stream(db, name, stream)
+
+    async def save_batch(
+            self,
+            db: AsyncSession,
+            uploads: List[Tuple[str, IngestStream]]
+    ) -> List[Union[Item, HTTPException]]:
+        """Delegates the batch to the wrapped backend."""
+        return await self.backend.save_batch(db, uploads)
+
+    async def save_variant(
+            self,
+            db: AsyncSession,
+            obj: StoredObject,
+            variant: str,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None
+    ) -> StoredObject:
+        """Delegates to the wrapped backend."""
+        return await self.backend.save_variant(db, obj, variant, stream, filename, encoding)
+
+    async def open_variant(self, db: AsyncSession, item_id: int, variant: str) -> Optional[StoredObject]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.open_variant(db, item_id, variant)
+
+    async def content_size(self, db: AsyncSession, content_hash: str) -> Optional[int]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.content_size(db, content_hash)
+
+    async def link_content(self, db: AsyncSession, name: str, content_hash: str) -> Optional[Item]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.link_content(db, name, content_hash)
+
+    async def load_file(self, db: AsyncSession, item_id: int) -> bytes:
+        """Returns cached content or loads it from the wrapped backend."""
+        entry = self.cache.get(item_id)
+        if entry is not None:
+            return entry[1]
+        return await self.backend.load_file(db, item_id)
+
+    async def open_file(self, db: AsyncSession, item_id: int) -> StoredObject:
+        """Returns the cached handle on a hit, otherwise resolves it via the wrapped backend."""
+        entry = self.cache.get(item_id)
+        if entry is not None:
+            return entry[0]
+        return await self.backend.open_file(db, item_id)
+
+    async def open_files(self, db: AsyncSession, item_ids: List[int]) -> Dict[int, StoredObject]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.open_files(db, item_ids)
+
+    async def iter_chunks(
+            self,
+            obj: StoredObject,
+            offset: int = 0,
+            length: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Serves the range from memory on a hit, otherwise streams and fills the cache.
+
+        Only complete reads of objects the cache would currently admit are
+        buffered, and only by one request per item at a time, so ranged, cold or
+        oversized downloads keep constant memory.
+        """
+        if obj.variant is not None:
+            # Variants are derived copies; the cache budget is kept for originals
+            async for chunk in self.backend.iter_chunks(obj, offset, length, chunk_size):
+                yield chunk
+            return
+
+        entry = self.cache.peek(obj.item_id)
+        if entry is not None:
+            view = memoryview(entry[1])
+            end = len(view) if length is None else min(len(view), offset + length)
+            for start in range(offset, end, chunk_size):
+                yield bytes(view[start:min(start + chunk_size, end)])
+            return
+
+        complete = offset == 0 and (length is None or length >= obj.size)
+        if not complete or obj.item_id in self._filling or not self.cache.admits(obj.item_id, obj.size):
+            async for chunk in self.backend.iter_chunks(obj, offset, length, chunk_size):
+                yield chunk
+            return
+
+        self._filling.add(obj.item_id)
+        generation = self._generation
+        try:
+            buffer = bytearray()
+            async for chunk in self.backend.iter_chunks(obj, offset, length, chunk_size):
+                buffer += chunk
+                yield chunk
+            if len(buffer) == obj.size and generation == self._generation:
+                self.cache.put(obj.item_id, obj, bytes(buffer))
+        finally:
+            self._filling.discard(obj.item_id)
+
+    def local_path(self, obj: StoredObject) -> Optional[str]:
+        """Defers to the wrapped backend; local files are better served by sendfile."""
+        return self.backend.local_path(obj)
+
+    def redirect_url(self, obj: StoredObject) -> Optional[str]:
+        """Defers to the wrapped backend."""
+        return self.backend.redirect_url(obj)
+
+    def record_access(self, obj: StoredObject) -> None:
+        """Delegates to the wrapped backend."""
+        self.backend.record_access(obj)
+
+    async def delete_file(self, db: AsyncSession, item_id: int) -> None:
+        """Invalidates the cached entry and deletes via the wrapped backend."""
+        self._invalidate(item_id)
+        await self.backend.delete_file(db, item_id)
+        # A fill that started during the deletion may have cached the item
+        self._invalidate(item_id)
+
+    def stats(self) -> dict:
+        """Returns cache counters merged with those of the wrapped backend."""
+        return {**self.backend.stats(), "object_cache": self.cache.stats()}
@@ -0,0 +1,167 @@
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Item, SessionLocal
+from .base_interface import StorageInterface, StoredObject
+from .single_flight import SingleFlight, StreamFlight, consume_flight
+from .streaming import IngestStream, CHUNK_SIZE
+
+
+class CoalescingStorage(StorageInterface):
+    """Request-coalescing decorator for any StorageInterface implementation.
+
+    Concurrent lookups of the same item share one metadata query, and concurrent
+    downloads of the same byte range share one backend stream (see StreamFlight),
+    so a burst of users requesting the same model costs the storage backend a
+    single fetch.
+
+    Features:
+    - Single-flight open_file per item
+    - Fan-out of one backend stream to all concurrent readers
+    - Bounded per-reader buffering; slow readers fall back to their own stream
+    """
+
+    def __init__(self, backend: StorageInterface, window: int = 4):
+        """Wraps a backend with request coalescing.
+
+        Args:
+            backend: Storage implementation performing the actual reads
+            window: Chunks buffered per reader before it is detached from a shared stream
+        """
+        self.backend = backend
+        self.window = window
+        self._lookups = SingleFlight()
+        self._streams: Dict[Hashable, StreamFlight] = {}
+        self.streams_started = 0
+        self.streams_joined = 0
+
+    async def startup(self) -> None:
+        """Delegates to the wrapped backend."""
+        await self.backend.startup()
+
+    async def shutdown(self) -> None:
+        """Delegates to the wrapped backend."""
+        await self.backend.shutdown()
+
+    async def save_stream(self, db: AsyncSession, name: str, stream: IngestStream) -> Item:
+        """Delegates the upload to the wrapped backend."""
+        return await self.backend.save_stream(db, name, stream)
+
+    async def save_batch(
+            self,
+            db: AsyncSession,
+            uploads: List[Tuple[str, IngestStream]]
+    ) -> List[Union[Item, HTTPException]]:
+        """Delegates the batch to the wrapped backend."""
+        return await self.backend.save_batch(db, uploads)
+
+    async def save_variant(
+            self,
+            db: AsyncSession,
+            obj: StoredObject,
+            variant: str,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None
+    ) -> StoredObject:
+        """Delegates to the wrapped backend."""
+        return await self.backend.save_variant(db, obj, variant, stream, filename, encoding)
+
+    async def open_variant(self, db: AsyncSession, item_id: int, variant: str) -> Optional[StoredObject]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.open_variant(db, item_id, variant)
+
+    async def content_size(self, db: AsyncSession, content_hash: str) -> Optional[int]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.content_size(db, content_hash)
+
+    async def link_content(self, db: AsyncSession, name: str, content_hash: str) -> Optional[Item]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.link_content(db, name, content_hash)
+
+    async def load_file(self, db: AsyncSession, item_id: int) -> bytes:
+        """Delegates to the wrapped backend."""
+        return await self.backend.load_file(db, item_id)
+
+    async def open_file(self, db: AsyncSession, item_id: int) -> StoredObject:
+        """Resolves the item once for all concurrent callers.
+
+        The shared lookup runs on its own session: it may outlive the request of
+        the caller that started it, whose session is closed when that request ends.
+        """
+        return await self._lookups.do(item_id, lambda: self._open_file(item_id))
+
+    async def _open_file(self, item_id: int) -> StoredObject:
+        async with SessionLocal() as db:
+            return await self.backend.open_file(db, item_id)
+
+    async def open_files(self, db: AsyncSession, item_ids: List[int]) -> Dict[int, StoredObject]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.open_files(db, item_ids)
+
+    async def iter_chunks(
+            self,
+            obj: StoredObject,
+            offset: int = 0,
+            length: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Joins an in-flight stream of the same range or starts a new shared one."""
+        key = (obj.item_id, obj.variant, obj.size, offset, length)
+        flight = self._streams.get(key)
+        queue = flight.subscribe() if flight is not None else None
+
+        if queue is None:
+            source = self.backend.iter_chunks(obj, offset, length, chunk_size)
+            flight = StreamFlight(source, self.window, lambda: self._forget(key, flight))
+            self._streams[key] = flight
+            queue = flight.subscribe()
+            self.streams_started += 1
+        else:
+            self.streams_joined += 1
+
+        def resume(delivered: int) -> AsyncIterator[bytes]:
+            remaining = None if length is None else length - delivered
+            return self.backend.iter_chunks(obj, offset + delivered, remaining, chunk_size)
+
+        chunks = consume_flight(flight, queue, resume)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            # Unsubscribes right away when the download is abandoned, not when the generator is collected
+            await chunks.aclose()
+
+    def _forget(self, key: Hashable, flight: StreamFlight) -> None:
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+
+    def local_path(self, obj: StoredObject) -> Optional[str]:
+        """Defers to the wrapped backend."""
+        return self.backend.local_path(obj)
+
+    def redirect_url(self, obj: StoredObject) -> Optional[str]:
+        """Defers to the wrapped backend."""
+        return self.backend.redirect_url(obj)
+
+    def record_access(self, obj: StoredObject) -> None:
+        """Delegates to the wrapped backend."""
+        self.backend.record_access(obj)
+
+    async def delete_file(self, db: AsyncSession, item_id: int) -> None:
+        """Delegates to the wrapped backend."""
+        await self.backend.delete_file(db, item_id)
+
+    def stats(self) -> dict:
+        """Returns coalescing counters merged with those of the wrapped backend."""
+        return {
+            **self.backend.stats(),
+            "coalescing": {
+                "lookups_executed": self._lookups.executions,
+                "lookups_shared": self._lookups.shared,
+                "streams_started": self.streams_started,
+                "streams_joined": self.streams_joined,
+            }
+        }
@@ -0,0 +1,115 @@
+"""Reference counting of content-addressed payloads (see Blob).
+
+All functions run inside the caller's transaction. Taking or dropping a
+reference locks the Blob row until the caller commits, so a payload is never
+removed while another transaction is about to reference it: callers deleting
+the last reference must remove the payload before they commit, and callers
+creating a new Blob must write the payload before they commit.
+"""
+
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Blob, Item
+
+
+async def acquire(db: AsyncSession, content_hash: str, size: int, location: str) -> Tuple[str, bool]:
+    """Takes a reference on the payload with ``content_hash``, registering it if unknown.
+
+    Args:
+        db: Async database session of the calling transaction
+        content_hash: Hex SHA-256 digest of the content
+        size: Content size in bytes
+        location: Where the payload is (to be) stored if it is new
+
+    Returns:
+        Tuple of the payload location and whether the Blob was created, in
+        which case the caller has to store the payload at that location
+    """
+    stmt = insert(Blob).values(
+        content_hash=content_hash, location=location, size=size, refcount=1
+    ).on_conflict_do_update(
+        index_elements=[Blob.content_hash], set_={"refcount": Blob.refcount + 1}
+    ).returning(Blob.location, Blob.refcount)
+    row = (await db.execute(stmt)).one()
+    return row.location, row.refcount == 1
+
+
+async def acquire_existing(db: AsyncSession, content_hash: str) -> Optional[Blob]:
+    """Takes a reference on an already stored payload.
+
+    Returns:
+        Row with location and size, or None if no payload with this hash exists
+    """
+    stmt = update(Blob).where(Blob.content_hash == content_hash).values(
+        refcount=Blob.refcount + 1
+    ).returning(Blob.location, Blob.size)
+    return (await db.execute(stmt)).first()
+
+
+async def release(db: AsyncSession, content_hash: str) -> Optional[str]:
+    """Drops a reference on a payload.
+
+    Returns:
+        str | None: Location of the payload if this was the last reference (the
+            Blob is deleted and the caller has to remove the payload), else None
+    """
+    stmt = update(Blob).where(Blob.content_hash == content_hash).values(
+        refcount=Blob.refcount - 1
+    ).returning(Blob.location, Blob.refcount)
+    row = (await db.execute(stmt)).first()
+    if row is None or row.refcount > 0:
+        return None
+    await db.execute(delete(Blob).where(Blob.content_hash == content_hash))
+    return row.location
+
+
+async def find(db: AsyncSession, content_hash: str) -> Optional[Blob]:
+    """Returns location and size of a stored payload, or None if the hash is unknown."""
+    return (await db.execute(
+        select(Blob.location, Blob.size).where(Blob.content_hash == content_hash)
+    )).first()
+
+
+async def link(db: AsyncSession, name: str, content_hash: str, storage_type: str) -> Optional[Item]:
+    """Creates an item referencing an already stored payload and commits it.
+
+    Args:
+        db: Async database session
+        name: Logical filename of the new item
+        content_hash: Hex SHA-256 digest of the content
+        storage_type: Storage type recorded on the item
+
+    Returns:
+        Item | None: Created record, or None if no payload with this hash exists
+
+    Raises:
+        HTTPException: 500 for database errors
+    """
+    try:
+        blob = await acquire_existing(db, content_hash)
+        if blob is None:
+            await db.rollback()
+            return None
+        item = Item(
+            name=name,
+            filename=name,
+            path_or_key=blob.location,
+            storage_type=storage_type,
+            size_bytes=blob.size,
+            content_hash=content_hash
+        )
+        db.add(item)
+        await db.commit()
+        await db.refresh(item)
+        return item
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}"
+        )
@@ -1,8 +1,17 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, func, text, update, insert, delete
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models import Item
-from .base_interface import StorageInterface
+from app.models import Item, ItemChunk, ItemVariant, SessionLocal, get_item_meta, get_items_meta
+from . import variants
+from .base_interface import StorageInterface, StoredObject
+from .streaming import IngestStream, CHUNK_SIZE
+
+# Size of the rows of the chunked layout; changing it requires re-ingesting chunked items
+CONTENT_CHUNK_SIZE = 1024 * 1024
+# path_or_key of items stored in the chunked layout
+CHUNKED_LOCATION = "item_chunks"
 
 
 class DBStorage(StorageInterface):
@@ -13,15 +22,39 @@ class DBStorage(StorageInterface):
     - Async I/O operations
     - Integrated metadata+content storage
     - Automatic rollback on failures
+
+    Layouts:
+    - ``blob``: content in the ``content`` column of the item row
+    - ``chunks``: content split into fixed-size rows of the ``item_chunks``
+      table, so metadata rows stay small and reads never detoast whole files
+
+    Items of both layouts can be read regardless of the configured one.
     """
 
-    async def save_file(self, db: AsyncSession, name: str, data: bytes) -> Item:
-        """Persists file content as BLOB with metadata in single transaction.
+    def __init__(self, layout: str = "blob"):
+        """Selects the layout used for new uploads.
+
+        Args:
+            layout: 'blob' or 'chunks'
+
+        Raises:
+            ValueError: For unknown layouts
+        """
+        if layout not in ("blob", "chunks"):
+            raise ValueError(f"Unknown database storage layout: {layout}")
+        self.layout = layout
+
+    async def save_stream(self, db: AsyncSession, name: str, stream: IngestStream) -> Item:
+        """Writes upload chunks incrementally, then stores them as BLOB in one transaction.
+
+        Chunks are appended to a transaction-scoped PostgreSQL large object with
+        ``lo_put`` and copied into the ``content`` column server-side, so the
+        application never holds more than one chunk of the upload.
 
         Args:
             db: Async database session for transaction isolation
             name: Logical filename for metadata tracking
-            data: Binary content to store as BLOB
+            stream: Upload content as async chunk stream
 
         Returns:
             Item: Created database record with generated ID
@@ -32,14 +65,25 @@ class DBStorage(StorageInterface):
         Note:
             Performs implicit size validation through database column constraints
         """
+        if self.layout == "chunks":
+            return await self._save_chunks(db, name, stream)
+
         try:
+            oid = await self._write_large_object(db, stream)
+
             item = Item(
                 name=name,
                 filename=name,
-                content=data,
-                storage_type='db'
+                storage_type='db',
+                size_bytes=stream.size,
+                content_hash=stream.content_hash
             )
             db.add(item)
+            await db.flush()
+            await db.execute(
+                update(Item).where(Item.id == item.id).values(content=func.lo_get(oid))
+            )
+            await db.execute(text("SELECT lo_unlink(:oid)"), {"oid": oid})
             await db.commit()
             await db.refresh(item)
             return item
@@ -50,6 +94,144 @@ class DBStorage(StorageInterface):
                 detail=f"Database storage failure: {str(e)}"
             )
 
+    @staticmethod
+    async def _write_large_object(db: AsyncSession, stream: IngestStream) -> int:
+        """Appends the stream to a new large object of the transaction and returns its oid."""
+        oid = (await db.execute(text("SELECT lo_create(0)"))).scalar()
+        async for chunk in stream:
+            await db.execute(
+                text("SELECT lo_put(:oid, :offset, :chunk)"),
+                {"oid": oid, "offset": stream.size - len(chunk), "chunk": chunk}
+            )
+        return oid
+
+    async def save_variant(
+            self,
+            db: AsyncSession,
+            obj: StoredObject,
+            variant: str,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None
+    ) -> StoredObject:
+        """Stores a variant as BLOB of its ``item_variants`` row, written like an upload.
+
+        Raises:
+            HTTPException: 500 for database errors
+        """
+        try:
+            oid = await self._write_large_object(db, stream)
+            handle = await variants.record(
+                db, obj, variant, stream, None, filename, encoding, content=func.lo_get(oid), storage_type='db'
+            )
+            # The large object only outlives a committed transaction
+            await db.execute(text("SELECT lo_unlink(:oid) FROM pg_largeobject_metadata WHERE oid = :oid"), {"oid": oid})
+            await db.commit()
+            return handle
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database storage failure: {str(e)}"
+            )
+
+    async def open_variant(self, db: AsyncSession, item_id: int, variant: str) -> Optional[StoredObject]:
+        """Resolves the size of a variant from its record, without transferring the content."""
+        return await variants.find(db, item_id, variant)
+
+    async def _save_chunks(self, db: AsyncSession, name: str, stream: IngestStream) -> Item:
+        """Writes upload chunks as ``item_chunks`` rows of CONTENT_CHUNK_SIZE bytes in one transaction.
+
+        Args:
+            db: Async database session for transaction isolation
+            name: Logical filename for metadata tracking
+            stream: Upload content as async chunk stream
+
+        Returns:
+            Item: Created database record with generated ID
+
+        Raises:
+            HTTPException: 500 for database errors
+        """
+        try:
+            item = Item(name=name, filename=name, storage_type='db', path_or_key=CHUNKED_LOCATION)
+            db.add(item)
+            await db.flush()
+            await self._write_chunks(db, item.id, stream)
+            item.size_bytes = stream.size
+            item.content_hash = stream.content_hash
+            await db.commit()
+            await db.refresh(item)
+            return item
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database storage failure: {str(e)}"
+            )
+
+    @staticmethod
+    async def _write_chunks(db: AsyncSession, item_id: int, stream: IngestStream) -> None:
+        """Inserts the stream as ``item_chunks`` rows of an item within the caller's transaction."""
+        seq = 0
+        buffer = bytearray()
+        async for chunk in stream:
+            buffer += chunk
+            while len(buffer) >= CONTENT_CHUNK_SIZE:
+                await db.execute(
+                    insert(ItemChunk).values(item_id=item_id, seq=seq, data=bytes(buffer[:CONTENT_CHUNK_SIZE]))
+                )
+                del buffer[:CONTENT_CHUNK_SIZE]
+                seq += 1
+        if buffer:
+            await db.execute(insert(ItemChunk).values(item_id=item_id, seq=seq, data=bytes(buffer)))
+
+    async def save_batch(
+            self,
+            db: AsyncSession,
+            uploads: List[Tuple[str, IngestStream]]
+    ) -> List[Union[Item, HTTPException]]:
+        """Stores a batch of uploads in one transaction, inserting all item rows with one batched INSERT.
+
+        Content goes through the single connection of the transaction, so uploads are
+        written one after the other; the batch is committed, or rolled back, as a whole.
+        """
+        try:
+            oids = []
+            if self.layout == "blob":
+                for _, stream in uploads:
+                    oids.append(await self._write_large_object(db, stream))
+            items = [
+                Item(
+                    name=name,
+                    filename=name,
+                    storage_type='db',
+                    path_or_key=CHUNKED_LOCATION if self.layout == "chunks" else None,
+                    size_bytes=stream.size if self.layout == "blob" else None,
+                    content_hash=stream.content_hash if self.layout == "blob" else None
+                )
+                for name, stream in uploads
+            ]
+            db.add_all(items)
+            await db.flush()
+            ids = [item.id for item in items]
+            for item_id, oid in zip(ids, oids):
+                await db.execute(update(Item).where(Item.id == item_id).values(content=func.lo_get(oid)))
+                await db.execute(text("SELECT lo_unlink(:oid)"), {"oid": oid})
+            if self.layout == "chunks":
+                for item, (_, stream) in zip(items, uploads):
+                    await self._write_chunks(db, item.id, stream)
+                    item.size_bytes = stream.size
+                    item.content_hash = stream.content_hash
+            await db.commit()
+            # One query reloads all records expired by the commit
+            if ids:
+                await db.execute(select(Item).where(Item.id.in_(ids)))
+            return items
+        except Exception as e:
+            await db.rollback()
+            return [HTTPException(status_code=500, detail=f"Database storage failure: {str(e)}") for _ in uploads]
+
     async def load_file(self, db: AsyncSession, item_id: int) -> bytes:
         """Retrieves BLOB content through database-record lookup.
 
@@ -64,23 +246,116 @@ class DBStorage(StorageInterface):
             HTTPException: 404 for missing records, 500 for query errors
         """
         try:
-            stmt = select(Item).where(Item.id == item_id)
-            result = await db.execute(stmt)
-            item = result.scalars().first()
+            meta = await get_item_meta(db, item_id)
 
-            if not item:
+            if meta is None:
                 raise HTTPException(
                     status_code=404,
                     detail=f"Item {item_id} not found in database storage"
                 )
 
-            return item.content
+            if meta.path_or_key == CHUNKED_LOCATION:
+                stmt = select(ItemChunk.data).where(ItemChunk.item_id == item_id).order_by(ItemChunk.seq)
+                return b"".join((await db.execute(stmt)).scalars())
+
+            return (await db.execute(select(Item.content).where(Item.id == item_id))).scalar()
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Database retrieval failure: {str(e)}"
             )
 
+    async def open_file(self, db: AsyncSession, item_id: int) -> StoredObject:
+        """Looks up BLOB metadata with one lean query, without transferring the content.
+
+        Args:
+            db: Async database session with read consistency
+            item_id: Primary key of persisted Item record
+
+        Returns:
+            StoredObject: Handle with the recorded content size
+
+        Raises:
+            HTTPException: 404 for missing records
+        """
+        meta = await get_item_meta(db, item_id)
+
+        if meta is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Item {item_id} not found in database storage"
+            )
+
+        return await self._handle(db, meta)
+
+    async def open_files(self, db: AsyncSession, item_ids: List[int]) -> Dict[int, StoredObject]:
+        """Resolves several items with one metadata query."""
+        return {meta.id: await self._handle(db, meta) for meta in await get_items_meta(db, item_ids)}
+
+    async def handle(self, meta) -> StoredObject:
+        """Builds the handle of an item row (see get_item_meta) on a session of its own."""
+        async with SessionLocal() as db:
+            return await self._handle(db, meta)
+
+    @staticmethod
+    async def _handle(db: AsyncSession, meta) -> StoredObject:
+        """Builds the handle of an item row; measures the BLOB only if its size was not recorded."""
+        size = meta.size_bytes
+        if size is None:
+            # Rows stored before sizes were recorded
+            size = (await db.execute(select(func.length(Item.content)).where(Item.id == meta.id))).scalar() or 0
+
+        return StoredObject(
+            meta.id, meta.filename, meta.path_or_key, size, meta.content_hash, storage_type=meta.storage_type
+        )
+
+    async def iter_chunks(
+            self,
+            obj: StoredObject,
+            offset: int = 0,
+            length: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Streams the requested BLOB range through successive substring queries.
+
+        Each query runs on its own short-lived session, because iteration outlives
+        the request-scoped one and a pooled connection must not be held while the
+        client receives a slice. For chunked items each query reads from a single ``item_chunks`` row. Content
+        columns are stored uncompressed (see EXTERNAL_STORAGE_COLUMNS), so each query
+        only fetches the TOAST slices of its range.
+
+        Args:
+            obj: Handle returned by open_file
+            offset: Position of the first byte to read
+            length: Number of bytes to read (None reads to end of BLOB)
+            chunk_size: Maximum bytes fetched per query
+
+        Yields:
+            bytes: Consecutive BLOB slices
+        """
+        end = obj.size if length is None else min(obj.size, offset + length)
+        while offset < end:
+            # SQL substring positions are 1-based
+            if obj.variant is not None:
+                stmt = select(
+                    func.substr(ItemVariant.content, offset + 1, min(chunk_size, end - offset))
+                ).where(ItemVariant.item_id == obj.item_id, ItemVariant.name == obj.variant)
+            elif obj.location == CHUNKED_LOCATION:
+                seq, start = divmod(offset, CONTENT_CHUNK_SIZE)
+                stmt = select(
+                    func.substr(ItemChunk.data, start + 1, min(chunk_size, end - offset, CONTENT_CHUNK_SIZE - start))
+                ).where(ItemChunk.item_id == obj.item_id, ItemChunk.seq == seq)
+            else:
+                stmt = select(
+                    func.substr(Item.content, offset + 1, min(chunk_size, end - offset))
+                ).where(Item.id == obj.item_id)
+            async with SessionLocal() as session:
+                chunk = (await session.execute(stmt)).scalar()
+            if not chunk:
+                break
+            offset += len(chunk)
+            yield bytes(chunk)
+
     async def delete_file(self, db: AsyncSession, item_id: int) -> None:
         """Atomic deletion of database record and associated BLOB content.
 
@@ -102,6 +377,8 @@ class DBStorage(StorageInterface):
                     detail=f"Item {item_id} not found for deletion"
                 )
 
+            await db.execute(delete(ItemChunk).where(ItemChunk.item_id == item_id))
+            await variants.delete_all(db, item_id)
             await db.delete(item)
             await db.commit()
         except Exception as e:
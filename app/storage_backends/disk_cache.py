@@ -0,0 +1,215 @@
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Minimum interval between persisted last-access updates of one entry (seconds)
+TOUCH_INTERVAL = 60.0
+# Unindexed files (and tombstones) younger than this may matter to a fill in another process (seconds)
+ORPHAN_AGE = 3600.0
+
+
+class DiskCache:
+    """Persistent, size-bounded object cache in a local directory.
+
+    Payloads are stored as one file per key below ``<directory>/objects`` and
+    read through memory maps. The index lives in a SQLite database in the same
+    directory, so it survives restarts and is shared by every worker process
+    using the directory; SQLite's file locking serialises concurrent writers.
+
+    Deletions are recorded in a tombstone journal. A fill that raced with a
+    deletion (in this or another process) is discarded on commit, so a deleted
+    object can never reappear in the cache. Entries are keyed by Item id, so the
+    directory must be cleared when the database is reset outside the API.
+
+    Attributes:
+        directory (str): Root directory of the cache
+        max_bytes (int): Total payload budget in bytes
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.objects_directory = os.path.join(directory, "objects")
+        os.makedirs(self.objects_directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._touched: Dict[int, float] = {}
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.sqlite3"),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key INTEGER PRIMARY KEY, filename TEXT NOT NULL, location TEXT, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL, content_hash TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+        if "content_hash" not in columns:
+            # Index created before content hashes were cached
+            self._conn.execute("ALTER TABLE entries ADD COLUMN content_hash TEXT")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tombstones (key INTEGER PRIMARY KEY, deleted_at REAL NOT NULL)")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._recover()
+
+    def _path(self, key: int) -> str:
+        return os.path.join(self.objects_directory, f"{key}.bin")
+
+    def _recover(self) -> None:
+        """Drops index rows without payload, payload files without index row and old tombstones."""
+        with self._lock:
+            self._conn.execute("DELETE FROM tombstones WHERE deleted_at < ?", (time.time() - ORPHAN_AGE,))
+            keys = {row[0] for row in self._conn.execute("SELECT key FROM entries")}
+            for key in list(keys):
+                if not os.path.exists(self._path(key)):
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    keys.discard(key)
+        now = time.time()
+        for name in os.listdir(self.objects_directory):
+            stem, ext = os.path.splitext(name)
+            if ext == ".bin" and stem.isdigit() and int(stem) in keys:
+                continue
+            path = os.path.join(self.objects_directory, name)
+            try:
+                if now - os.path.getmtime(path) >= ORPHAN_AGE:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def lookup(self, key: int) -> Optional[Tuple[str, Optional[str], int, Optional[str]]]:
+        """Returns ``(filename, location, size, content_hash)`` of a cached entry and records the access."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT filename, location, size, content_hash FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            now = time.time()
+            if now - self._touched.get(key, 0.0) >= TOUCH_INTERVAL:
+                self._touched[key] = now
+                self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            return row
+
+    def open(self, key: int) -> Optional[mmap.mmap]:
+        """Memory-maps a cached payload, or returns None if it was evicted meanwhile."""
+        try:
+            with open(self._path(key), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def create_temp(self):
+        """Creates a uniquely named temp file inside the cache for a new payload.
+
+        Returns:
+            Tuple of the open file, its path and the fill start time to pass to commit
+        """
+        started = time.time()
+        fd, temp_path = tempfile.mkstemp(dir=self.objects_directory, suffix=".tmp")
+        return os.fdopen(fd, "wb"), temp_path, started
+
+    def commit(
+            self,
+            key: int,
+            temp_path: str,
+            started: float,
+            filename: str,
+            location: Optional[str],
+            size: int,
+            content_hash: Optional[str] = None
+    ) -> bool:
+        """Publishes a completely written temp file as the entry for ``key``.
+
+        Returns:
+            bool: False if the key was deleted after the fill started (the temp file is discarded)
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute(
+                        "SELECT 1 FROM tombstones WHERE key = ? AND deleted_at >= ?", (key, started)
+                ).fetchone():
+                    self._conn.execute("ROLLBACK")
+                    os.remove(temp_path)
+                    return False
+                os.replace(temp_path, self._path(key))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, filename, location, size, last_access, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, filename, location, size, time.time(), content_hash)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._evict()
+        return True
+
+    def discard(self, temp_path: str) -> None:
+        """Removes an abandoned temp file."""
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+    def invalidate(self, key: int) -> None:
+        """Removes an entry for all processes and blocks future fills of the key."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tombstones (key, deleted_at) VALUES (?, ?)", (key, time.time())
+            )
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._remove_payload(key)
+            self._conn.execute("COMMIT")
+            self._touched.pop(key, None)
+
+    def _remove_payload(self, key: int) -> None:
+        """Deletes a payload file; callers hold the index write lock."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        """Removes least recently used entries until the budget is met."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            victims = []
+            if total > self.max_bytes:
+                for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append(key)
+                    total -= size
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in victims])
+                for key in victims:
+                    self._remove_payload(key)
+            self._conn.execute("COMMIT")
+            self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns process-local hit/miss/eviction counters and shared occupancy."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
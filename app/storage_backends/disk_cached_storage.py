@@ -0,0 +1,176 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.models import Item
+from .base_interface import StorageInterface, StoredObject
+from .disk_cache import DiskCache
+from .streaming import IngestStream, CHUNK_SIZE
+
+
+class DiskCachedStorage(StorageInterface):
+    """Read-through local disk cache for remote StorageInterface implementations.
+
+    Complete downloads are written to a DiskCache directory while they stream,
+    and later reads of the item are served from memory-mapped local files
+    without a metadata query or backend request. The cache directory (and its
+    index) is shared by all worker processes pointing at it and survives
+    restarts, so repeat reads stay at local-disk speed after a redeploy.
+
+    Features:
+    - Persistent, cross-process cache index with LRU/size-based eviction
+    - Memory-mapped reads, including byte ranges
+    - Deletions invalidate the entry for every process
+    """
+
+    def __init__(self, backend: StorageInterface, cache: DiskCache):
+        """Wraps a backend with a persistent disk cache.
+
+        Args:
+            backend: Storage implementation serving cache misses
+            cache: Disk cache holding local copies
+        """
+        self.backend = backend
+        self.cache = cache
+        self._filling = set()
+
+    async def startup(self) -> None:
+        """Delegates to the wrapped backend."""
+        await self.backend.startup()
+
+    async def shutdown(self) -> None:
+        """Delegates to the wrapped backend."""
+        await self.backend.shutdown()
+
+    async def save_stream(self, db: AsyncSession, name: str, stream: IngestStream) -> Item:
+        """Delegates the upload to the wrapped backend."""
+        return await self.backend.save_stream(db, name, stream)
+
+    async def save_batch(
+            self,
+            db: AsyncSession,
+            uploads: List[Tuple[str, IngestStream]]
+    ) -> List[Union[Item, HTTPException]]:
+        """Delegates the batch to the wrapped backend."""
+        return await self.backend.save_batch(db, uploads)
+
+    async def save_variant(
+            self,
+            db: AsyncSession,
+            obj: StoredObject,
+            variant: str,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None
+    ) -> StoredObject:
+        """Delegates to the wrapped backend."""
+        return await self.backend.save_variant(db, obj, variant, stream, filename, encoding)
+
+    async def open_variant(self, db: AsyncSession, item_id: int, variant: str) -> Optional[StoredObject]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.open_variant(db, item_id, variant)
+
+    async def content_size(self, db: AsyncSession, content_hash: str) -> Optional[int]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.content_size(db, content_hash)
+
+    async def link_content(self, db: AsyncSession, name: str, content_hash: str) -> Optional[Item]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.link_content(db, name, content_hash)
+
+    async def load_file(self, db: AsyncSession, item_id: int) -> bytes:
+        """Returns the cached copy or loads the content from the wrapped backend."""
+        mapped = await run_in_threadpool(self.cache.open, item_id)
+        if mapped is not None:
+            with mapped:
+                return mapped[:]
+        return await self.backend.load_file(db, item_id)
+
+    async def open_file(self, db: AsyncSession, item_id: int) -> StoredObject:
+        """Answers from the cache index on a hit, otherwise resolves via the wrapped backend."""
+        entry = await run_in_threadpool(self.cache.lookup, item_id)
+        if entry is not None:
+            return StoredObject(item_id, *entry)
+        return await self.backend.open_file(db, item_id)
+
+    async def open_files(self, db: AsyncSession, item_ids: List[int]) -> Dict[int, StoredObject]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.open_files(db, item_ids)
+
+    async def iter_chunks(
+            self,
+            obj: StoredObject,
+            offset: int = 0,
+            length: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Serves the range from the local copy if present, otherwise streams and fills it."""
+        if obj.variant is not None:
+            # The cache index is keyed by item; variants are served by the wrapped backend
+            async for chunk in self.backend.iter_chunks(obj, offset, length, chunk_size):
+                yield chunk
+            return
+
+        mapped = await run_in_threadpool(self.cache.open, obj.item_id) if obj.size else None
+        if mapped is not None:
+            with mapped:
+                end = len(mapped) if length is None else min(len(mapped), offset + length)
+                for start in range(offset, end, chunk_size):
+                    # Slicing may fault pages in from disk, so keep it off the event loop
+                    yield await run_in_threadpool(mapped.__getitem__, slice(start, min(start + chunk_size, end)))
+            return
+
+        complete = offset == 0 and (length is None or length >= obj.size)
+        if not complete or obj.item_id in self._filling or obj.size > self.cache.max_bytes:
+            async for chunk in self.backend.iter_chunks(obj, offset, length, chunk_size):
+                yield chunk
+            return
+
+        self._filling.add(obj.item_id)
+        f, temp_path, started = await run_in_threadpool(self.cache.create_temp)
+        written = 0
+        try:
+            async for chunk in self.backend.iter_chunks(obj, offset, length, chunk_size):
+                await run_in_threadpool(f.write, chunk)
+                written += len(chunk)
+                yield chunk
+            await run_in_threadpool(f.close)
+            if written == obj.size:
+                await run_in_threadpool(
+                    self.cache.commit,
+                    obj.item_id,
+                    temp_path,
+                    started,
+                    obj.filename,
+                    obj.location,
+                    obj.size,
+                    obj.content_hash
+                )
+        finally:
+            self._filling.discard(obj.item_id)
+            # Also runs when the download is aborted: flushing and removing the temp file block
+            await run_in_threadpool(f.close)
+            await run_in_threadpool(self.cache.discard, temp_path)
+
+    def local_path(self, obj: StoredObject) -> Optional[str]:
+        """Defers to the wrapped backend."""
+        return self.backend.local_path(obj)
+
+    def redirect_url(self, obj: StoredObject) -> Optional[str]:
+        """Defers to the wrapped backend."""
+        return self.backend.redirect_url(obj)
+
+    def record_access(self, obj: StoredObject) -> None:
+        """Delegates to the wrapped backend."""
+        self.backend.record_access(obj)
+
+    async def delete_file(self, db: AsyncSession, item_id: int) -> None:
+        """Invalidates the cached copy for all processes and deletes via the wrapped backend."""
+        await run_in_threadpool(self.cache.invalidate, item_id)
+        await self.backend.delete_file(db, item_id)
+
+    def stats(self) -> dict:
+        """Returns disk cache counters merged with those of the wrapped backend."""
+        return {**self.backend.stats(), "disk_cache": self.cache.stats()}
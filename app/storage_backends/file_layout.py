@@ -0,0 +1,120 @@
+import hashlib
+import os
+import uuid
+from typing import Dict, Optional
+
+from .hash_ring import HashRing
+
+# Hex digits available for the directory levels (SHA-256)
+MAX_FANOUT_DIGITS = 64
+# Directories of the kinds of stored objects below each volume root.
+# Uploaded items, named "<random hex>_<filename>" ("<item id>_<filename>" if moved in by TieredStorage or a migration)
+ITEMS = "items"
+# Content-addressed payloads of deduplicated uploads, named by their SHA-256
+BLOBS = "blobs"
+# Derived representations of items (see ItemVariant), named "<item id>.<variant>"
+VARIANTS = "variants"
+
+
+class FileLayout:
+    """Maps object names to paths in a hashed fan-out directory tree.
+
+    An object named ``name`` is stored at ``<root>/<d1>/<d2>/.../<name>``,
+    where ``d1``, ``d2``, ... are consecutive ``width``-digit slices of the
+    hex SHA-256 digest of the name. With the default two levels of two hex
+    digits, objects spread evenly over 65536 leaf directories, so a leaf holds
+    about 15 entries per million objects and lookups, creates and renames stay
+    fast regardless of the total number of objects. ``levels=0`` stores all
+    objects directly in ``root`` (flat layout).
+
+    Attributes:
+        root (str): Directory the tree is rooted at
+        levels (int): Directory levels between the root and the objects
+        width (int): Hex digits (1-4) naming the directories of each level
+    """
+
+    def __init__(self, root: str, levels: int = 2, width: int = 2):
+        if levels < 0 or not 1 <= width <= 4 or levels * width > MAX_FANOUT_DIGITS:
+            raise ValueError(f"Unsupported fan-out of {levels} levels of {width} hex digits")
+        self.root = root
+        self.levels = levels
+        self.width = width
+
+    def path(self, name: str) -> str:
+        """Returns the path of the object ``name`` (a plain file name, no directories)."""
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()
+        parts = [digest[level * self.width:(level + 1) * self.width] for level in range(self.levels)]
+        return os.path.join(self.root, *parts, name)
+
+    def placed(self, path: str) -> bool:
+        """Tells whether ``path`` is where this layout stores an object of its name."""
+        return path == self.path(os.path.basename(path))
+
+
+class FilePlacement:
+    """Places stored objects on volumes by consistent hashing, and in the fan-out tree of their kind.
+
+    The volume of an object is chosen by a weighted HashRing over the volume
+    roots, keyed by the object name; below the volume, the object goes to
+    ``<root>/<kind>/`` laid out by a FileLayout. Adding a volume therefore
+    only reassigns about its share of the objects (see file_migration).
+
+    Attributes:
+        ring (HashRing): Volume roots and their weights
+    """
+
+    def __init__(self, volumes: Dict[str, float], levels: int = 2, width: int = 2):
+        """Lays out the volumes.
+
+        Args:
+            volumes: Weight of each volume root (e.g. relative bandwidth of its drive)
+            levels: Fan-out directory levels below each kind directory
+            width: Hex digits naming the directories of each level
+        """
+        volumes = {os.path.normpath(root): weight for root, weight in volumes.items()}
+        self.ring = HashRing(volumes)
+        self._layouts = {
+            root: {kind: FileLayout(os.path.join(root, kind), levels, width) for kind in (ITEMS, BLOBS, VARIANTS)}
+            for root in volumes
+        }
+        # Longest root first, so nested roots resolve to the innermost volume
+        self._roots = sorted(volumes, key=len, reverse=True)
+
+    @property
+    def volumes(self):
+        """Returns the volume roots."""
+        return list(self._layouts)
+
+    def directories(self, root: str):
+        """Returns the kind directories of a volume."""
+        return [layout.root for layout in self._layouts[root].values()]
+
+    def path(self, kind: str, name: str) -> str:
+        """Returns the path of the object ``name`` of ``kind`` (ITEMS, BLOBS or VARIANTS)."""
+        return self._layouts[self.ring.node(name)][kind].path(name)
+
+    def placed(self, kind: str, path: str) -> bool:
+        """Tells whether ``path`` is where the object of its name is placed."""
+        return path == self.path(kind, os.path.basename(path))
+
+    def volume(self, path: str) -> Optional[str]:
+        """Returns the root of the configured volume holding ``path``, None if it is on none of them."""
+        for root in self._roots:
+            if path.startswith(os.path.join(root, "")):
+                return root
+        return None
+
+
+def is_blob(path: str, content_hash: str) -> bool:
+    """Tells whether a path is a shared blob (in any layout or volume, or stored before them)."""
+    return os.path.basename(path) == content_hash and f"{os.sep}{BLOBS}{os.sep}" in path
+
+
+def unique_name(filename: str) -> str:
+    """Returns a collision-free object name keeping the upload's file name readable."""
+    return f"{uuid.uuid4().hex}_{os.path.basename(filename)}"
+
+
+def temp_path(path: str) -> str:
+    """Returns a private temporary path next to ``path``, for an atomic write-and-rename."""
+    return f"{path}.{uuid.uuid4().hex}.tmp"
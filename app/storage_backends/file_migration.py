@@ -0,0 +1,237 @@
+"""Moves files to where the configured volumes and fan-out layout place them (see FilePlacement).
+
+Run as ``python -m app.storage_backends.file_migration [--levels N] [--width N] [--dry-run]``
+with the same DATABASE_URL, FILE_VOLUMES and FILE_FANOUT_* settings as the
+API, to move files stored before the fan-out layout into it, or to rebalance
+after adding a volume: consistent hashing only reassigns the share of files
+the new volume takes over, and only those are moved. Files on a volume removed
+from FILE_VOLUMES are moved off it as long as its directory is still mounted.
+
+Items, shared blobs and variants of the 'file' backend whose recorded path is
+not where they are placed get a hard link (another volume: a copy) at their
+new path; the record is switched to it with a conditional UPDATE and only then
+is the old path removed, so a file is never missing for a record. Rows changed
+concurrently are skipped (their new copy is removed). Running the tool again
+resumes it.
+
+Changed items are announced to the metadata indexes of running workers, but
+downloads resolved just before their item moved may fail, so migrate while the
+API is idle.
+"""
+
+import argparse
+import asyncio
+import errno
+import os
+import shutil
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import select, update
+
+from app.config import get_file_volumes
+from app.models import Blob, Item, ItemVariant, SessionLocal, StorageTypeEnum
+from .file_layout import BLOBS, ITEMS, VARIANTS, FilePlacement, is_blob, temp_path
+from .file_storage import UPLOAD_DIRECTORY
+from .metadata_index import publish_change
+
+# Rows read per query
+BATCH = 1000
+
+
+def _relink(old: str, new: str) -> bool:
+    """Hard-links ``old`` at ``new``, or copies it there if ``new`` is on another filesystem.
+
+    Returns:
+        bool: False if ``old`` is missing
+    """
+    if not os.path.exists(old):
+        return False
+    os.makedirs(os.path.dirname(new), exist_ok=True)
+    if os.path.exists(new):
+        if os.path.samefile(old, new):
+            return True
+        # Leftover of an interrupted run, the record still points to the old path
+        os.remove(new)
+    try:
+        os.link(old, new)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        temp = temp_path(new)
+        try:
+            shutil.copyfile(old, temp)
+            os.rename(temp, new)
+        except BaseException:
+            _remove(temp)
+            raise
+    return True
+
+
+def _remove(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class FileLayoutMigration:
+    """Moves the files of items, blobs and variants to their placement.
+
+    Attributes:
+        dry_run (bool): Count the files to move without touching anything
+        moved (dict): Files moved per kind ('items', 'blobs', 'variants')
+        missing (int): Recorded files not found on disk (left alone)
+        skipped (int): Files whose record changed during the move
+    """
+
+    def __init__(
+            self,
+            volumes: Optional[Dict[str, float]] = None,
+            levels: int = 2,
+            width: int = 2,
+            dry_run: bool = False
+    ):
+        self.placement = FilePlacement(volumes or {UPLOAD_DIRECTORY: 1.0}, levels, width)
+        self.dry_run = dry_run
+        self.moved = {"items": 0, "blobs": 0, "variants": 0}
+        self.missing = 0
+        self.skipped = 0
+
+    async def run(self) -> dict:
+        """Migrates blobs, items and variants, and returns the counters."""
+        await self._blobs()
+        await self._items()
+        await self._variants()
+        return {"moved": self.moved, "missing": self.missing, "skipped": self.skipped}
+
+    async def _move(self, kind: str, old: str, new: str, switch: Callable) -> Optional[bool]:
+        """Links ``old`` at ``new``, lets ``switch`` update the records, then removes ``old``.
+
+        Returns:
+            bool | None: Whether the records were switched (None on a dry run or a missing file)
+        """
+        if self.dry_run:
+            if os.path.exists(old):
+                self.moved[kind] += 1
+            else:
+                self.missing += 1
+            return None
+        if not await asyncio.to_thread(_relink, old, new):
+            self.missing += 1
+            return None
+        async with SessionLocal() as db:
+            switched = await switch(db)
+            await db.commit()
+        await asyncio.to_thread(_remove, new if not switched else old)
+        if switched:
+            self.moved[kind] += 1
+        else:
+            self.skipped += 1
+        return switched
+
+    async def _blobs(self) -> None:
+        last = ""
+        while True:
+            async with SessionLocal() as db:
+                rows = (await db.execute(
+                    select(Blob.content_hash, Blob.location)
+                    .where(Blob.content_hash > last)
+                    .order_by(Blob.content_hash).limit(BATCH)
+                )).all()
+            if not rows:
+                return
+            for content_hash, location in rows:
+                new = self.placement.path(BLOBS, content_hash)
+                # Object keys of MinIO blobs are relative
+                if not os.path.isabs(location) or location == new:
+                    continue
+
+                async def switch(db, content_hash=content_hash, old=location, new=new):
+                    blob = await db.execute(
+                        update(Blob).where(Blob.content_hash == content_hash, Blob.location == old).values(location=new)
+                    )
+                    if blob.rowcount != 1:
+                        return False
+                    await db.execute(
+                        update(Item).where(Item.storage_type == StorageTypeEnum.file, Item.path_or_key == old)
+                        .values(path_or_key=new)
+                    )
+                    return True
+
+                if await self._move("blobs", location, new, switch):
+                    async with SessionLocal() as db:
+                        ids = (await db.execute(select(Item.id).where(Item.path_or_key == new))).scalars().all()
+                    for item_id in ids:
+                        await publish_change("update", item_id)
+            last = rows[-1].content_hash
+
+    async def _items(self) -> None:
+        last = 0
+        while True:
+            async with SessionLocal() as db:
+                rows = (await db.execute(
+                    select(Item.id, Item.filename, Item.path_or_key, Item.content_hash)
+                    .where(Item.id > last, Item.storage_type == StorageTypeEnum.file, Item.path_or_key.isnot(None))
+                    .order_by(Item.id).limit(BATCH)
+                )).all()
+            if not rows:
+                return
+            for item_id, filename, location, content_hash in rows:
+                if (content_hash and is_blob(location, content_hash)) or self.placement.placed(ITEMS, location):
+                    continue
+                if f"{os.sep}{ITEMS}{os.sep}" in location:
+                    # Already named uniquely, only on another volume
+                    name = os.path.basename(location)
+                else:
+                    # Flat names were not unique: another item may have the same filename
+                    name = f"{item_id}_{os.path.basename(filename)}"
+                new = self.placement.path(ITEMS, name)
+
+                async def switch(db, item_id=item_id, old=location, new=new):
+                    result = await db.execute(
+                        update(Item).where(Item.id == item_id, Item.path_or_key == old).values(path_or_key=new)
+                    )
+                    return result.rowcount == 1
+
+                if await self._move("items", location, new, switch):
+                    await publish_change("update", item_id)
+            last = rows[-1].id
+
+    async def _variants(self) -> None:
+        last = 0
+        while True:
+            async with SessionLocal() as db:
+                rows = (await db.execute(
+                    select(ItemVariant.id, ItemVariant.item_id, ItemVariant.name, ItemVariant.path_or_key)
+                    .where(ItemVariant.id > last, ItemVariant.path_or_key.isnot(None))
+                    .order_by(ItemVariant.id).limit(BATCH)
+                )).all()
+            if not rows:
+                return
+            for variant_id, item_id, name, location in rows:
+                new = self.placement.path(VARIANTS, f"{item_id}.{name}")
+                # Object keys of MinIO variants are relative
+                if not os.path.isabs(location) or location == new:
+                    continue
+
+                async def switch(db, variant_id=variant_id, old=location, new=new):
+                    result = await db.execute(
+                        update(ItemVariant).where(ItemVariant.id == variant_id, ItemVariant.path_or_key == old)
+                        .values(path_or_key=new)
+                    )
+                    return result.rowcount == 1
+
+                await self._move("variants", location, new, switch)
+            last = rows[-1].id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move FileStorage files to their volume and fan-out directory.")
+    parser.add_argument("--levels", type=int, default=int(os.getenv("FILE_FANOUT_LEVELS", "2")))
+    parser.add_argument("--width", type=int, default=int(os.getenv("FILE_FANOUT_WIDTH", "2")))
+    parser.add_argument("--dry-run", action="store_true", help="only count the files to move")
+    args = parser.parse_args()
+    migration = FileLayoutMigration(get_file_volumes(), args.levels, args.width, args.dry_run)
+    print(asyncio.run(migration.run()))
+
+
+if __name__ == "__main__":
+    main()
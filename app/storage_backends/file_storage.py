@@ -1,14 +1,49 @@
 import os
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
 from fastapi import HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .base_interface import StorageInterface
-from ..models import Item
+from . import batch_ingest, content_refs, variants
+from .base_interface import StorageInterface, StoredObject
+from .file_layout import BLOBS, ITEMS, VARIANTS, FilePlacement, is_blob, temp_path, unique_name
+from .io_pool import IOPool
+from .streaming import IngestStream, CHUNK_SIZE
+from ..models import Item, get_item_meta, get_items_meta
 
+# Volume used unless volumes are configured
 UPLOAD_DIRECTORY = "/tmp/3d_objects/"
 
 
+class Volume:
+    """A mount point files are stored on, with its own I/O pool and transfer counters.
+
+    Attributes:
+        root (str): Directory the volume's files are stored below
+        weight (float): Share of new files placed on the volume, relative to the other volumes
+        io (IOPool): Thread pool running the blocking calls on the volume's files
+        bytes_read (int): Bytes read through Python (sendfile transfers are not seen)
+        bytes_written (int): Bytes written
+    """
+
+    def __init__(self, root: str, weight: float, io: IOPool):
+        self.root = root
+        self.weight = weight
+        self.io = io
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def stats(self) -> dict:
+        """Returns the weight, transfer counters and I/O pool gauges."""
+        return {
+            "weight": self.weight,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "io": self.io.stats(),
+        }
+
+
 class FileStorage(StorageInterface):
     """Filesystem implementation of StorageInterface using a dedicated directory.
 
@@ -17,53 +52,217 @@ class FileStorage(StorageInterface):
     - Metadata synchronization with database
     - Safe path handling to prevent directory traversal
     - Automatic cleanup on deletion
+    - Blocking filesystem calls run on a bounded I/O pool, never on the event loop
+    - Optional content-addressed deduplication with reference counting
+    - Hashed fan-out directories (see FileLayout) and collision-free object names,
+      so identical filenames never overwrite each other and no directory grows large
+    - Files spread over several volumes by weighted consistent hashing (see FilePlacement),
+      each volume with its own I/O pool, so bandwidth and IOPS scale with the number of drives
+
+    Files are read from the path recorded for them, so files stored before the
+    fan-out layout or before a volume was added stay readable where they are;
+    ``python -m app.storage_backends.file_migration`` moves them to where the
+    current configuration places them.
     """
 
-    def __init__(self):
-        os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+    def __init__(
+            self,
+            sendfile: bool = True,
+            io_pools: Optional[Callable[[str], IOPool]] = None,
+            dedup: bool = False,
+            fanout_levels: int = 2,
+            fanout_width: int = 2,
+            volumes: Optional[Dict[str, float]] = None
+    ):
+        """Prepares the volume directories.
+
+        Args:
+            sendfile: Expose stored paths via local_path so downloads are sent
+                by the server (zero-copy) instead of streamed through Python
+            io_pools: Builds the thread pool for the filesystem calls of a volume from
+                its root (default: 16 workers, queue of 256 per volume)
+            dedup: Store each distinct content once as a shared blob and let
+                items with identical content share it
+            fanout_levels: Directory levels below the item, blob and variant directories
+            fanout_width: Hex digits naming the directories of each level
+            volumes: Weight of each volume root (default: UPLOAD_DIRECTORY only)
+        """
+        self.sendfile = sendfile
+        self.dedup = dedup
+        self.placement = FilePlacement(volumes or {UPLOAD_DIRECTORY: 1.0}, fanout_levels, fanout_width)
+        io_pools = io_pools or (lambda root: IOPool(name="file-io"))
+        self.volumes = {root: Volume(root, self.placement.ring.weights[root], io_pools(root))
+                        for root in self.placement.volumes}
+        # Files outside all volumes (stored before volumes were configured or on a removed one) use the first
+        self._default = self.volumes[self.placement.volumes[0]]
+        # Directories known to exist, so writes only create a fan-out directory once per process
+        self._directories = set()
+        for root in self.placement.volumes:
+            for directory in self.placement.directories(root):
+                if dedup or not directory.endswith(BLOBS):
+                    os.makedirs(directory, exist_ok=True)
+
+    def _volume(self, path: str) -> Volume:
+        root = self.placement.volume(path)
+        return self._default if root is None else self.volumes[root]
+
+    def _io(self, path: str) -> IOPool:
+        """Returns the I/O pool of the volume holding ``path``."""
+        return self._volume(path).io
+
+    async def shutdown(self) -> None:
+        """Stops the I/O pools."""
+        for volume in self.volumes.values():
+            volume.io.shutdown()
 
-    async def save_file(self, db: AsyncSession, name: str, data: bytes) -> Item:
-        """Persists file to filesystem and stores metadata in database.
+    async def save_stream(self, db: AsyncSession, name: str, stream: IngestStream) -> Item:
+        """Appends upload chunks to a temp file, then stores metadata in database.
+
+        With deduplication enabled, content whose hash is known upfront is
+        stored as a shared blob; if the blob exists already, the upload is not
+        written at all and the new item only takes a reference on it.
 
         Args:
             db: Async database session for metadata transaction
             name: Sanitized filename (should be validated externally)
-            data: Raw binary content for storage
+            stream: Upload content as async chunk stream
 
         Returns:
-            Item: Database record with filesystem path
+            Item: Database record with filesystem path, size and content hash
 
         Raises:
             HTTPException: 500 for filesystem/database errors
             400 for invalid filenames (implicit via OS error)
 
         Notes:
-            - Uses atomic write via tempfile pattern internally
-            - Concurrent writes to same filename will overwrite
+            - Uses atomic write via a private temp file per upload
+            - Every upload gets its own path, so uploads with the same filename never overwrite each other
         """
+        created_blob = None
         try:
-            # Secure path construction prevents directory traversal
-            path = os.path.join(UPLOAD_DIRECTORY, os.path.basename(name))
-
-            # Atomic write using write-and-rename pattern
-            temp_path = f"{path}.tmp"
-            with open(temp_path, "wb") as f:
-                f.write(data)
-            os.rename(temp_path, path)
+            if self.dedup and stream.known_hash:
+                path, created = await content_refs.acquire(
+                    db, stream.known_hash, stream.length, self.placement.path(BLOBS, stream.known_hash)
+                )
+                if created:
+                    created_blob = path
+                    await self._write(path, stream)
+                size = stream.length
+            else:
+                # Secure path construction (basename) prevents directory traversal
+                path = self.placement.path(ITEMS, unique_name(name))
+                await self._write(path, stream)
+                size = stream.size
 
             # Database record with filesystem metadata
             item = Item(
                 name=name,
                 filename=name,
                 path_or_key=path,
-                storage_type='file'
+                storage_type='file',
+                size_bytes=size,
+                content_hash=stream.content_hash
             )
             db.add(item)
             await db.commit()
             await db.refresh(item)
             return item
         except (OSError, IOError) as e:
-            await db.rollback()
+            await self._rollback_blob(db, created_blob)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Filesystem error: {str(e)}"
+            )
+        except Exception as e:
+            await self._rollback_blob(db, created_blob)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database error: {str(e)}"
+            )
+
+    async def save_batch(
+            self,
+            db: AsyncSession,
+            uploads: List[Tuple[str, IngestStream]]
+    ) -> List[Union[Item, HTTPException]]:
+        """Writes the files of a batch concurrently and records them in one transaction.
+
+        Files written for uploads whose records cannot be committed are removed again.
+        Each upload gets its own path, so several uploads of a batch may share a filename.
+        """
+        return await batch_ingest.save_batch(
+            db,
+            uploads,
+            'file',
+            location=lambda name: self.placement.path(ITEMS, unique_name(name)),
+            blob_location=(lambda content_hash: self.placement.path(BLOBS, content_hash)) if self.dedup else None,
+            write=self._write,
+            remove=self.remove_object
+        )
+
+    async def _write(self, path: str, stream: IngestStream) -> None:
+        """Atomic write using write-and-rename pattern, one chunk at a time.
+
+        The temp file is private to this write (concurrent writers never share
+        it) and lives next to the target, so the rename stays within one directory.
+        """
+        volume = self._volume(path)
+        io = volume.io
+        directory = os.path.dirname(path)
+        if directory not in self._directories:
+            await io.run("mkdir", os.makedirs, directory, exist_ok=True)
+            self._directories.add(directory)
+        temp = temp_path(path)
+        f = await io.run("open", open, temp, "wb")
+        try:
+            try:
+                async for chunk in stream:
+                    await io.run("write", f.write, chunk)
+                    volume.bytes_written += len(chunk)
+            finally:
+                await io.run("close", f.close)
+            await io.run("rename", os.rename, temp, path)
+        except BaseException:
+            await io.run("remove", self._remove_if_exists, temp)
+            raise
+
+    def item_location(self, item_id: int, filename: str) -> str:
+        """Returns the path an item moved to this backend is written to (unique per item, see TieredStorage)."""
+        return self.placement.path(ITEMS, f"{item_id}_{os.path.basename(filename)}")
+
+    async def write_object(self, path: str, stream: IngestStream) -> None:
+        """Writes content to a path, atomically."""
+        await self._write(path, stream)
+
+    async def remove_object(self, path: str) -> None:
+        """Removes stored content if it exists."""
+        await self._io(path).run("remove", self._remove_if_exists, path)
+
+    async def _rollback_blob(self, db: AsyncSession, created_blob: Optional[str]) -> None:
+        """Rolls back the transaction and removes a blob written for it."""
+        await db.rollback()
+        if created_blob:
+            await self.remove_object(created_blob)
+
+    async def save_variant(
+            self,
+            db: AsyncSession,
+            obj: StoredObject,
+            variant: str,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None
+    ) -> StoredObject:
+        """Writes a variant into the variant tree of its volume and records it.
+
+        Raises:
+            HTTPException: 500 for filesystem or database errors
+        """
+        path = self.placement.path(VARIANTS, f"{obj.item_id}.{variant}")
+        try:
+            await self._write(path, stream)
+            return await variants.record(db, obj, variant, stream, path, filename, encoding, storage_type='file')
+        except (OSError, IOError) as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Filesystem error: {str(e)}"
@@ -75,6 +274,23 @@ class FileStorage(StorageInterface):
                 detail=f"Database error: {str(e)}"
             )
 
+    async def open_variant(self, db: AsyncSession, item_id: int, variant: str) -> Optional[StoredObject]:
+        """Resolves the path and size of a variant from its record."""
+        return await variants.find(db, item_id, variant)
+
+    async def content_size(self, db: AsyncSession, content_hash: str) -> Optional[int]:
+        """Returns the size of a deduplicated blob with this hash, if stored."""
+        if not self.dedup:
+            return None
+        blob = await content_refs.find(db, content_hash)
+        return None if blob is None else blob.size
+
+    async def link_content(self, db: AsyncSession, name: str, content_hash: str) -> Optional[Item]:
+        """Creates an item referencing an already stored blob, without any upload."""
+        if not self.dedup:
+            return None
+        return await content_refs.link(db, name, content_hash, 'file')
+
     async def load_file(self, db: AsyncSession, item_id: int) -> bytes:
         """Retrieves file content from filesystem using database-stored path.
 
@@ -89,18 +305,75 @@ class FileStorage(StorageInterface):
             HTTPException: 404 if record/path invalid, 500 for read errors
         """
         try:
-            result = await db.execute(select(Item).where(Item.id == item_id))
-            item = result.scalars().first()
+            meta = await get_item_meta(db, item_id)
 
-            if not item or not item.path_or_key:
+            if not meta or not meta.path_or_key:
                 raise HTTPException(
                     status_code=404,
                     detail=f"File {item_id} metadata not found"
                 )
 
-            with open(item.path_or_key, "rb") as f:
-                return f.read()
+            volume = self._volume(meta.path_or_key)
+            content = await volume.io.run("read", self._read_all, meta.path_or_key)
+            volume.bytes_read += len(content)
+            return content
+
+        except FileNotFoundError as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"File missing at stored path: {str(e)}"
+            )
+        except (PermissionError, IOError) as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Filesystem access error: {str(e)}"
+            )
+
+    @staticmethod
+    def _read_all(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    async def open_file(self, db: AsyncSession, item_id: int) -> StoredObject:
+        """Resolves the stored path and size of a file without reading it.
+
+        Args:
+            db: Async session for metadata lookup
+            item_id: Primary key of file metadata record
+
+        Returns:
+            StoredObject: Handle with filesystem path and size on disk
+
+        Raises:
+            HTTPException: 404 if record/path invalid, 500 for stat errors
+        """
+        meta = await get_item_meta(db, item_id)
+
+        if not meta or not meta.path_or_key:
+            raise HTTPException(
+                status_code=404,
+                detail=f"File {item_id} metadata not found"
+            )
+
+        return await self.handle(meta)
+
+    async def open_files(self, db: AsyncSession, item_ids: List[int]) -> Dict[int, StoredObject]:
+        """Resolves several items with one metadata query; files missing on disk are left out."""
+        found = {}
+        for meta in await get_items_meta(db, item_ids):
+            if meta.path_or_key:
+                try:
+                    found[meta.id] = await self.handle(meta)
+                except HTTPException as e:
+                    if e.status_code != 404:
+                        raise
+        return found
 
+    async def handle(self, meta) -> StoredObject:
+        """Builds the handle of an item row (see get_item_meta), with the size of the file on disk."""
+        try:
+            # A local stat is cheap and reflects the file actually on disk
+            size = await self._io(meta.path_or_key).run("stat", os.path.getsize, meta.path_or_key)
         except FileNotFoundError as e:
             raise HTTPException(
                 status_code=404,
@@ -112,6 +385,53 @@ class FileStorage(StorageInterface):
                 detail=f"Filesystem access error: {str(e)}"
             )
 
+        return StoredObject(
+            meta.id, meta.filename, meta.path_or_key, size, meta.content_hash, storage_type=meta.storage_type
+        )
+
+    async def iter_chunks(
+            self,
+            obj: StoredObject,
+            offset: int = 0,
+            length: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Reads the range in fixed-size positional reads on the I/O pool.
+
+        Args:
+            obj: Handle returned by open_file
+            offset: Position of the first byte to read
+            length: Number of bytes to read (None reads to end of file)
+            chunk_size: Maximum bytes per chunk
+
+        Yields:
+            bytes: Consecutive file chunks
+        """
+        remaining = obj.size - offset if length is None else length
+        volume = self._volume(obj.location)
+        io = volume.io
+        fd = await io.run("open", os.open, obj.location, os.O_RDONLY)
+        try:
+            while remaining > 0:
+                chunk = await io.run("read", os.pread, fd, min(chunk_size, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                volume.bytes_read += len(chunk)
+                yield chunk
+        finally:
+            await io.run("close", os.close, fd)
+
+    @staticmethod
+    def _remove_if_exists(path: str) -> None:
+        if os.path.exists(path):
+            os.remove(path)
+
+    def local_path(self, obj: StoredObject) -> Optional[str]:
+        """Returns the stored path when sendfile serving is enabled."""
+        return obj.location if self.sendfile else None
+
     async def delete_file(self, db: AsyncSession, item_id: int) -> None:
         """Atomically removes file and database record.
 
@@ -136,8 +456,14 @@ class FileStorage(StorageInterface):
                     detail=f"Item {item_id} not found"
                 )
 
-            if item.path_or_key and os.path.exists(item.path_or_key):
-                os.remove(item.path_or_key)
+            path = item.path_or_key
+            if path and item.content_hash and is_blob(path, item.content_hash):
+                # Shared blob: only removed with its last reference, before the commit releases the lock
+                path = await content_refs.release(db, item.content_hash)
+            if path:
+                await self.remove_object(path)
+            for variant_path in await variants.delete_all(db, item_id):
+                await self.remove_object(variant_path)
 
             await db.delete(item)
             await db.commit()
@@ -154,3 +480,7 @@ class FileStorage(StorageInterface):
                 status_code=500,
                 detail=f"Deletion failed: {str(e)}"
             )
+
+    def stats(self) -> dict:
+        """Returns the I/O pool gauges and transfer counters of each volume."""
+        return {"file_volumes": {root: volume.stats() for root, volume in self.volumes.items()}}
@@ -0,0 +1,49 @@
+import bisect
+import hashlib
+from typing import Dict, List
+
+# Points placed on the ring per unit of weight
+POINTS_PER_WEIGHT = 160
+
+
+def _position(key: str) -> int:
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Weighted consistent hashing of keys onto nodes.
+
+    Every node owns ``weight * POINTS_PER_WEIGHT`` points on a 64-bit ring;
+    a key belongs to the node owning the first point at or after the key's
+    position. Nodes receive keys in proportion to their weight, and adding
+    (or removing) a node only moves the keys that the new node takes over (or
+    that the removed node owned): about ``weight / total weight`` of them.
+
+    Points are derived from the node names, so a node keeps its keys as long
+    as its name and weight stay the same, independent of the order or set of
+    the other nodes.
+    """
+
+    def __init__(self, nodes: Dict[str, float]):
+        """Places the nodes on the ring.
+
+        Args:
+            nodes: Weight of each node name (positive)
+        """
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        points = []
+        for node, weight in nodes.items():
+            if weight <= 0:
+                raise ValueError(f"Weight of {node} must be positive")
+            for replica in range(max(1, round(weight * POINTS_PER_WEIGHT))):
+                points.append((_position(f"{node}#{replica}"), node))
+        points.sort()
+        self.weights = dict(nodes)
+        self._positions: List[int] = [position for position, _ in points]
+        self._nodes: List[str] = [node for _, node in points]
+
+    def node(self, key: str) -> str:
+        """Returns the node a key belongs to."""
+        index = bisect.bisect_left(self._positions, _position(key))
+        return self._nodes[index % len(self._nodes)]
@@ -0,0 +1,157 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Item
+from .base_interface import StorageInterface, StoredObject
+from .metadata_index import MetadataIndex
+from .streaming import IngestStream, CHUNK_SIZE
+
+
+class IndexedStorage(StorageInterface):
+    """Metadata-index decorator for any StorageInterface implementation.
+
+    Resolves downloads from an in-process MetadataIndex, so a hot download
+    needs neither a metadata query nor a pooled database connection. Uploads
+    and deletions update the local index; uploads are announced to the indexes
+    of all other worker processes, deletions by ItemService (see publish_change),
+    which also has variant caches to invalidate.
+
+    Features:
+    - Session-free open_file for indexed items
+    - Bulk load at startup, fill on miss
+    - Cross-process coherence via change notifications
+    """
+
+    def __init__(self, backend: StorageInterface, index: MetadataIndex):
+        """Wraps a backend with an in-memory metadata index.
+
+        Args:
+            backend: Storage implementation resolving index misses
+            index: Index of item handles
+        """
+        self.backend = backend
+        self.index = index
+
+    async def startup(self) -> None:
+        """Subscribes to change notifications, then loads the index."""
+        await self.backend.startup()
+        try:
+            await self.index.listen()
+            await self.index.load()
+        except Exception as e:
+            # The index is an accelerator: without it every lookup falls back to the backend
+            print(f"Metadata index unavailable: {str(e)}")
+
+    async def shutdown(self) -> None:
+        """Stops listening for change notifications."""
+        await self.index.close()
+        await self.backend.shutdown()
+
+    async def save_stream(self, db: AsyncSession, name: str, stream: IngestStream) -> Item:
+        """Delegates the upload to the wrapped backend and indexes the new item."""
+        return await self._created(await self.backend.save_stream(db, name, stream))
+
+    async def save_batch(
+            self,
+            db: AsyncSession,
+            uploads: List[Tuple[str, IngestStream]]
+    ) -> List[Union[Item, HTTPException]]:
+        """Delegates the batch to the wrapped backend and indexes the new items."""
+        results = await self.backend.save_batch(db, uploads)
+        return [result if isinstance(result, HTTPException) else await self._created(result) for result in results]
+
+    async def save_variant(
+            self,
+            db: AsyncSession,
+            obj: StoredObject,
+            variant: str,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None
+    ) -> StoredObject:
+        """Delegates to the wrapped backend."""
+        return await self.backend.save_variant(db, obj, variant, stream, filename, encoding)
+
+    async def open_variant(self, db: AsyncSession, item_id: int, variant: str) -> Optional[StoredObject]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.open_variant(db, item_id, variant)
+
+    async def content_size(self, db: AsyncSession, content_hash: str) -> Optional[int]:
+        """Delegates to the wrapped backend."""
+        return await self.backend.content_size(db, content_hash)
+
+    async def link_content(self, db: AsyncSession, name: str, content_hash: str) -> Optional[Item]:
+        """Delegates to the wrapped backend and indexes the new item."""
+        item = await self.backend.link_content(db, name, content_hash)
+        return None if item is None else await self._created(item)
+
+    async def _created(self, item: Item) -> Item:
+        if item.size_bytes is not None:
+            self.index.put(StoredObject.of_item(item))
+        await self.index.publish("create", item.id)
+        return item
+
+    async def load_file(self, db: AsyncSession, item_id: int) -> bytes:
+        """Delegates to the wrapped backend."""
+        return await self.backend.load_file(db, item_id)
+
+    async def open_file(self, db: AsyncSession, item_id: int) -> StoredObject:
+        """Answers from the index, resolving and indexing the item via the backend on a miss."""
+        obj = self.index.get(item_id)
+        if obj is not None:
+            return obj
+        generation = self.index.generation
+        obj = await self.backend.open_file(db, item_id)
+        self.index.put(obj, generation)
+        return obj
+
+    async def open_files(self, db: AsyncSession, item_ids: List[int]) -> Dict[int, StoredObject]:
+        """Answers from the index, resolving and indexing all misses with one backend call."""
+        found = {}
+        for item_id in item_ids:
+            obj = self.index.get(item_id)
+            if obj is not None:
+                found[item_id] = obj
+        missing = [item_id for item_id in item_ids if item_id not in found]
+        if missing:
+            generation = self.index.generation
+            resolved = await self.backend.open_files(db, missing)
+            for obj in resolved.values():
+                self.index.put(obj, generation)
+            found.update(resolved)
+        return found
+
+    def iter_chunks(
+            self,
+            obj: StoredObject,
+            offset: int = 0,
+            length: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Delegates to the wrapped backend."""
+        return self.backend.iter_chunks(obj, offset, length, chunk_size)
+
+    def local_path(self, obj: StoredObject) -> Optional[str]:
+        """Defers to the wrapped backend."""
+        return self.backend.local_path(obj)
+
+    def redirect_url(self, obj: StoredObject) -> Optional[str]:
+        """Defers to the wrapped backend."""
+        return self.backend.redirect_url(obj)
+
+    def record_access(self, obj: StoredObject) -> None:
+        """Delegates to the wrapped backend."""
+        self.backend.record_access(obj)
+
+    async def delete_file(self, db: AsyncSession, item_id: int) -> None:
+        """Drops the item from the local index and deletes via the wrapped backend."""
+        self.index.discard(item_id)
+        await self.backend.delete_file(db, item_id)
+        # A miss that started during the deletion may have re-indexed the item
+        self.index.discard(item_id)
+
+    def stats(self) -> dict:
+        """Returns index counters merged with those of the wrapped backend."""
+        return {**self.backend.stats(), "metadata_index": self.index.stats()}
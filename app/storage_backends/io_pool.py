@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+
+class IOPool:
+    """Bounded thread pool for blocking filesystem calls, with backpressure and gauges.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue`` more
+    wait for a thread. Further callers are suspended on the event loop until a
+    slot frees up, so a slow disk delays I/O-bound requests instead of piling
+    up unbounded work (and memory) in the executor queue.
+
+    Gauges:
+    - ``in_flight``: calls currently running on a thread
+    - ``queued``: calls submitted and waiting for a thread
+    - ``waiting``: callers suspended because the queue is full
+    - per-operation count, mean and max latency (submission to completion)
+    """
+
+    def __init__(self, max_workers: int = 16, max_queue: int = 256, name: str = "io"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._running = 0
+        self.waiting = 0
+        self._latency: Dict[str, list] = {}
+
+    async def run(self, op: str, fn, *args, **kwargs):
+        """Runs ``fn(*args, **kwargs)`` on the pool, waiting for a slot if the queue is full.
+
+        Args:
+            op: Operation name the latency is recorded under
+            fn: Blocking callable
+
+        Returns:
+            The result of ``fn``
+        """
+        if self._slots is None:
+            # Created lazily so it binds to the running event loop
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self._submitted += 1
+        future = self._executor.submit(self._call, fn, *args, **kwargs)
+        # The slot is held until the call itself completes: a cancelled caller
+        # stops waiting, but the call keeps its thread until it returns
+        future.add_done_callback(lambda _: self._threadsafe(loop, self._finished, op, started))
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def _threadsafe(loop: asyncio.AbstractEventLoop, callback, *args) -> None:
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The event loop has been closed, along with the semaphore bound to it
+            pass
+
+    def _finished(self, op: str, started: float) -> None:
+        self._submitted -= 1
+        self._slots.release()
+        self._record(op, time.perf_counter() - started)
+
+    def _call(self, fn, *args, **kwargs):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _record(self, op: str, seconds: float) -> None:
+        entry = self._latency.setdefault(op, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    def shutdown(self) -> None:
+        """Stops accepting work; running calls are left to finish."""
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """Returns the pool gauges and per-operation latencies in milliseconds."""
+        with self._lock:
+            running = self._running
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": running,
+            "queued": max(self._submitted - running, 0),
+            "waiting": self.waiting,
+            "ops": {
+                op: {
+                    "count": count,
+                    "avg_ms": round(total / count * 1000, 3),
+                    "max_ms": round(peak * 1000, 3),
+                }
+                for op, (count, total, peak) in self._latency.items()
+            },
+        }
@@ -0,0 +1,271 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import select, text
+
+from app.models import Item, SessionLocal, engine, get_item_meta
+from .base_interface import StoredObject
+
+# PostgreSQL NOTIFY channel carrying "<create|update|delete>:<item id>" change events
+NOTIFY_CHANNEL = "item_changes"
+# Rows fetched per round-trip while loading the index
+LOAD_BATCH = 10000
+# Seconds between attempts to re-establish a lost LISTEN connection
+RECONNECT_DELAY = 1.0
+
+
+class MetadataIndex:
+    """In-process map from item id to a StoredObject handle.
+
+    Holds the few fields a download needs (filename, location, size, hash) for every
+    item, so hot downloads are resolved without touching the database. Handles
+    are slotted objects of a few hundred bytes including their strings, so
+    millions of items fit in a worker's memory.
+
+    The index is bulk-loaded at startup and kept coherent across worker
+    processes through PostgreSQL LISTEN/NOTIFY: every create, delete or move
+    to another storage tier is published on ``NOTIFY_CHANNEL`` and applied by all listening processes.
+    Lookups of ids not (yet) indexed fall back to the database and fill the
+    index; a generation counter keeps such fills from resurrecting an item
+    deleted while the lookup was running. If the LISTEN connection is lost,
+    it is re-established and the index reloaded, since changes published
+    meanwhile were missed.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, StoredObject] = {}
+        self._generation = 0
+        self.changes = ChangeListener(self._changed, reconnected=self._reload)
+        self._changes: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.notifications = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def generation(self) -> int:
+        """Counter advanced by every removal; pass it to :meth:`put` for fills."""
+        return self._generation
+
+    def get(self, item_id: int) -> Optional[StoredObject]:
+        """Returns the indexed handle of an item, or None if it is not indexed."""
+        obj = self._entries.get(item_id)
+        if obj is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return obj
+
+    def put(self, obj: StoredObject, generation: Optional[int] = None) -> bool:
+        """Indexes a handle.
+
+        Args:
+            obj: Handle to index under its item id
+            generation: Value of :attr:`generation` read before the handle was
+                looked up; the put is dropped if a removal happened since
+
+        Returns:
+            bool: Whether the handle was indexed
+        """
+        if generation is not None and generation != self._generation:
+            return False
+        self._entries[obj.item_id] = obj
+        return True
+
+    def discard(self, item_id: int) -> None:
+        """Removes an item and invalidates fills that are still in flight."""
+        self._entries.pop(item_id, None)
+        self._generation += 1
+
+    @staticmethod
+    def _handle(row) -> Optional[StoredObject]:
+        if row is None or row.size_bytes is None:
+            # Rows stored before sizes were recorded are resolved by the backend
+            return None
+        return StoredObject(
+            row.id, row.filename, row.path_or_key, row.size_bytes, row.content_hash, storage_type=row.storage_type
+        )
+
+    async def load(self) -> None:
+        """Bulk-loads all items, streaming the rows in batches."""
+        stmt = select(
+            Item.id, Item.filename, Item.storage_type, Item.path_or_key, Item.size_bytes, Item.content_hash
+        ).execution_options(yield_per=LOAD_BATCH)
+        generation = self._generation
+        async with SessionLocal() as db:
+            result = await db.stream(stmt)
+            async for row in result:
+                obj = self._handle(row)
+                if obj is not None:
+                    self.put(obj, generation)
+
+    async def listen(self) -> None:
+        """Subscribes to change notifications (PostgreSQL only) and applies them in order."""
+        if engine.dialect.name != "postgresql":
+            return
+        self._changes = asyncio.Queue()
+        await self.changes.start()
+        self._task = asyncio.ensure_future(self._apply_changes())
+
+    def _changed(self, op: str, item_id: int) -> None:
+        self._changes.put_nowait((op, item_id))
+
+    async def _apply_changes(self) -> None:
+        while True:
+            op, item_id = await self._changes.get()
+            self.notifications += 1
+            try:
+                if op == "delete":
+                    self.discard(item_id)
+                elif op in ("create", "update"):
+                    generation = self._generation
+                    async with SessionLocal() as db:
+                        obj = self._handle(await get_item_meta(db, item_id))
+                    if obj is not None:
+                        self.put(obj, generation)
+            except Exception as e:
+                print(f"Metadata index update failed for {op}:{item_id}: {str(e)}")
+
+    async def _reload(self) -> None:
+        """Rebuilds the index after the LISTEN connection was re-established."""
+        self._entries.clear()
+        self._generation += 1
+        await self.load()
+
+    async def publish(self, op: str, item_id: int) -> None:
+        """Announces a create or delete to the indexes of all worker processes."""
+        await publish_change(op, item_id)
+
+    async def close(self) -> None:
+        """Stops listening for change notifications."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.changes.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns lookup counters, the number of indexed items and applied notifications."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "notifications": self.notifications,
+            "listening": self.changes.listening,
+        }
+
+
+class ChangeListener:
+    """Calls ``callback(op, item_id)`` for every change published on ``NOTIFY_CHANNEL`` by any process.
+
+    For in-process state derived from items outside the metadata index (e.g. the
+    variant handles of VariantBuilder). Listens with PostgreSQL only; elsewhere
+    there is a single process and :meth:`start` does nothing.
+
+    A lost connection is re-established every RECONNECT_DELAY seconds until it
+    succeeds; ``reconnected`` is then awaited, so the owner can catch up on
+    changes published while nobody was listening.
+    """
+
+    def __init__(
+            self,
+            callback: Callable[[str, int], None],
+            reconnected: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        self._callback = callback
+        self._reconnected = reconnected
+        self._connection = None
+        self._driver_connection = None
+        self._reconnecting: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def listening(self) -> bool:
+        """Whether the LISTEN connection is currently established."""
+        return self._connection is not None
+
+    async def start(self) -> None:
+        """Subscribes to change notifications."""
+        if engine.dialect.name != "postgresql":
+            return
+        self._closed = False
+        await self._connect()
+
+    async def _connect(self) -> None:
+        connection = await engine.connect()
+        try:
+            driver_connection = (await connection.get_raw_connection()).driver_connection
+            await driver_connection.add_listener(NOTIFY_CHANNEL, self._notified)
+            driver_connection.add_termination_listener(self._terminated)
+        except Exception:
+            await connection.invalidate()
+            raise
+        self._connection, self._driver_connection = connection, driver_connection
+
+    def _notified(self, connection, pid, channel, payload) -> None:
+        op, _, item_id = payload.partition(":")
+        try:
+            self._callback(op, int(item_id))
+        except Exception as e:
+            print(f"Change listener failed for {payload}: {str(e)}")
+
+    def _terminated(self, connection) -> None:
+        if self._closed:
+            return
+        lost, self._connection, self._driver_connection = self._connection, None, None
+        if self._reconnecting is None:
+            self._reconnecting = asyncio.ensure_future(self._reconnect(lost))
+
+    async def _reconnect(self, lost) -> None:
+        """Replaces the lost connection, then lets the owner catch up on the changes it missed."""
+        print("Change notification connection lost, reconnecting")
+        try:
+            if lost is not None:
+                try:
+                    await lost.invalidate()
+                except Exception:
+                    pass
+            while not self.listening:
+                try:
+                    await self._connect()
+                except Exception as e:
+                    print(f"Reconnecting the change listener failed: {str(e)}")
+                    await asyncio.sleep(RECONNECT_DELAY)
+        finally:
+            self._reconnecting = None
+        if self._reconnected is not None:
+            try:
+                await self._reconnected()
+            except Exception as e:
+                print(f"Catching up after reconnecting the change listener failed: {str(e)}")
+
+    async def close(self) -> None:
+        """Stops listening for change notifications."""
+        self._closed = True
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+            self._reconnecting = None
+        if self._connection is not None:
+            # The connection goes back to the pool: detach the listeners first
+            self._driver_connection.remove_termination_listener(self._terminated)
+            await self._driver_connection.remove_listener(NOTIFY_CHANNEL, self._notified)
+            await self._connection.close()
+            self._connection, self._driver_connection = None, None
+
+
+async def publish_change(op: str, item_id: int) -> None:
+    """Announces a change of an item ("create", "update" or "delete") to the indexes of all worker processes.
+
+    Updates (e.g. an item moved to another storage tier) are applied like
+    creates: listening indexes reload the item's handle.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    async with SessionLocal() as db:
+        await db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": NOTIFY_CHANNEL, "payload": f"{op}:{item_id}"}
+        )
+        await db.commit()
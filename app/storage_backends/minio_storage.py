@@ -1,16 +1,76 @@
-from io import BytesIO
+import asyncio
+import functools
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import urllib3
 from fastapi import HTTPException
 from minio import Minio
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .base_interface import StorageInterface
-from app.models import Item
+from . import batch_ingest, content_refs, variants
+from .base_interface import StorageInterface, StoredObject
+from .streaming import IngestStream, CHUNK_SIZE
+from app.models import Item, get_item_meta, get_items_meta
+
+# Presigned URLs kept for reuse; the least recently used one is dropped when full
+URL_CACHE_SIZE = 10000
+# Key prefix of content-addressed objects of deduplicated uploads
+BLOB_PREFIX = "blobs/"
+# Key prefix of derived representations of items (see ItemVariant)
+VARIANT_PREFIX = "variants/"
+# Key prefix of items moved here from another storage tier (see TieredStorage)
+ITEM_PREFIX = "items/"
+# The client buffers one part per upload in memory: keep it near the S3 minimum of 5 MiB
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+class _AsyncStreamReader:
+    """Blocking file-like view of an IngestStream for use from a worker thread.
+
+    Each ``read`` schedules the next chunk on the event loop and waits for it, so
+    the MinIO client can consume an async upload without buffering it upfront.
+    """
+
+    def __init__(self, stream: IngestStream, loop: asyncio.AbstractEventLoop):
+        self._stream = stream
+        self._loop = loop
+        self._buffer = bytearray()
+        self._eof = False
+
+    async def _next_chunk(self):
+        try:
+            return await self._stream.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
 
 
 class MinioStorage(StorageInterface):
     """MinIO object storage implementation of the StorageInterface.
 
+    The MinIO client is blocking, so every client call runs on a bounded
+    thread pool owned by the backend and never on the event loop. HTTP
+    connections come from a urllib3 pool sized for the expected number of
+    concurrent transfers.
+
     Features:
     - S3-compatible object storage integration
     - Automatic bucket creation
@@ -19,37 +79,117 @@ class MinioStorage(StorageInterface):
     - Connection cleanup for distributed systems
     """
 
-    def __init__(self, endpoint: str, access_key: str, secret_key: str, bucket_name: str):
-        """Initializes MinIO client and ensures bucket exists.
+    def __init__(
+            self,
+            endpoint: str,
+            access_key: str,
+            secret_key: str,
+            bucket_name: str,
+            max_workers: int = 32,
+            pool_size: int = 64,
+            part_size: int = DEFAULT_PART_SIZE,
+            presign_ttl: int = 0,
+            public_endpoint: Optional[str] = None,
+            region: str = "us-east-1",
+            dedup: bool = False
+    ):
+        """Initializes the MinIO client; the bucket is ensured on startup.
 
         Args:
             endpoint: MinIO server URL (e.g., 'play.min.io:9000')
             access_key: MinIO root user access key
             secret_key: MinIO root user secret key
             bucket_name: Target bucket name for object storage
+            max_workers: Threads running blocking client calls
+            pool_size: HTTP connections kept open to MinIO; each open download holds one
+            part_size: Uploads of known length up to this size are sent as one PUT,
+                larger ones as multipart upload with parts of this size (min. 5 MiB).
+                The client holds one part of every running upload in memory
+            presign_ttl: Lifetime in seconds of presigned download URLs; 0 disables
+                redirects, so downloads are proxied through the API
+            public_endpoint: Host clients use to reach MinIO, signed into presigned URLs
+                (default: ``endpoint``)
+            region: Region signed into presigned URLs, so signing needs no server round-trip
+            dedup: Store each distinct content once under BLOB_PREFIX and let
+                items with identical content share it
 
         Note:
             Uses insecure connection (secure=False) for local testing.
             For production, enable TLS and certificate verification.
         """
+        self._http = urllib3.PoolManager(
+            maxsize=pool_size,
+            timeout=urllib3.Timeout(connect=10, read=300),
+            retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+        )
         self.client = Minio(
             endpoint=endpoint,
             access_key=access_key,
             secret_key=secret_key,
-            secure=False
+            secure=False,
+            http_client=self._http
+        )
+        self.presign_client = Minio(
+            endpoint=public_endpoint or endpoint,
+            access_key=access_key,
+            secret_key=secret_key,
+            secure=False,
+            region=region
         )
         self.bucket_name = bucket_name
+        self.dedup = dedup
+        self.presign_ttl = presign_ttl
+        self._urls: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self.urls_signed = 0
+        self.urls_reused = 0
+        self.max_workers = max_workers
+        self.pool_size = pool_size
+        self.part_size = part_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="minio")
+        self._bucket_ready = False
+        self.in_flight = 0
+
+    async def _run(self, fn, *args, **kwargs):
+        """Runs a blocking client call on the backend's thread pool."""
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self.in_flight -= 1
+
+    async def _ensure_bucket(self) -> None:
+        if not self._bucket_ready:
+            if not await self._run(self.client.bucket_exists, self.bucket_name):
+                await self._run(self.client.make_bucket, self.bucket_name)
+            self._bucket_ready = True
 
-        if not self.client.bucket_exists(self.bucket_name):
-            self.client.make_bucket(self.bucket_name)
+    async def startup(self) -> None:
+        """Creates the bucket if it does not exist yet."""
+        await self._ensure_bucket()
 
-    async def save_file(self, db: AsyncSession, name: str, data: bytes) -> Item:
-        """Stores file in MinIO with streaming upload and creates database record.
+    async def shutdown(self) -> None:
+        """Stops the client thread pool and closes pooled connections."""
+        self._executor.shutdown(wait=False)
+        self._http.clear()
+
+    async def save_stream(self, db: AsyncSession, name: str, stream: IngestStream) -> Item:
+        """Pipes upload chunks into MinIO and creates database record.
+
+        The blocking MinIO client runs in a worker thread and pulls chunks from the
+        async stream on demand. Uploads of known length up to ``part_size`` are
+        sent as a single PUT; larger or unsized ones as multipart upload, so at
+        most one part is buffered per upload.
+
+        With deduplication enabled, content whose hash is known upfront is
+        stored as a shared object; if it exists already, nothing is sent to
+        MinIO and the new item only takes a reference on it.
 
         Args:
             db: Async database session
             name: Object key (should be URL-safe)
-            data: Binary content to store
+            stream: Upload content as async chunk stream
 
         Returns:
             Item: Created database record with storage metadata
@@ -58,26 +198,31 @@ class MinioStorage(StorageInterface):
             HTTPException: 500 - Storage/Database failure
                           400 - Invalid object key
 
-        Note:
-            Uses multipart upload with 10MB chunks for large files
         """
+        created_blob = None
         try:
-            # Stream data with chunked upload
-            with BytesIO(data) as file_stream:
-                self.client.put_object(
-                    bucket_name=self.bucket_name,
-                    object_name=name,
-                    data=file_stream,
-                    length=-1,
-                    part_size=10 * 1024 * 1024  # 10MB chunks
+            await self._ensure_bucket()
+            if self.dedup and stream.known_hash:
+                key, created = await content_refs.acquire(
+                    db, stream.known_hash, stream.length, BLOB_PREFIX + stream.known_hash
                 )
+                if created:
+                    created_blob = key
+                    await self._put(key, stream)
+                size = stream.length
+            else:
+                key = name
+                await self._put(key, stream)
+                size = stream.size
 
             # Create database record
             item = Item(
                 name=name,
                 filename=name,
-                path_or_key=name,
-                storage_type='minio'
+                path_or_key=key,
+                storage_type='minio',
+                size_bytes=size,
+                content_hash=stream.content_hash
             )
             db.add(item)
             await db.commit()
@@ -86,11 +231,104 @@ class MinioStorage(StorageInterface):
 
         except Exception as e:
             await db.rollback()
+            if created_blob:
+                await self._run(self.client.remove_object, self.bucket_name, created_blob)
             raise HTTPException(
                 status_code=500,
                 detail=f"MinIO storage failure: {str(e)}"
             )
 
+    async def save_batch(
+            self,
+            db: AsyncSession,
+            uploads: List[Tuple[str, IngestStream]]
+    ) -> List[Union[Item, HTTPException]]:
+        """Uploads the objects of a batch concurrently and records them in one transaction.
+
+        Objects uploaded for uploads whose records cannot be committed are removed
+        again; uploads with a key used earlier in the same batch are rejected (400).
+        """
+        try:
+            await self._ensure_bucket()
+        except Exception as e:
+            return [HTTPException(status_code=500, detail=f"MinIO storage failure: {str(e)}") for _ in uploads]
+        return await batch_ingest.save_batch(
+            db,
+            uploads,
+            'minio',
+            location=lambda name: name,
+            blob_location=(lambda content_hash: BLOB_PREFIX + content_hash) if self.dedup else None,
+            write=self._put,
+            remove=lambda key: self._run(self.client.remove_object, self.bucket_name, key)
+        )
+
+    async def _put(self, key: str, stream: IngestStream) -> None:
+        reader = _AsyncStreamReader(stream, asyncio.get_running_loop())
+        await self._run(
+            self.client.put_object,
+            bucket_name=self.bucket_name,
+            object_name=key,
+            data=reader,
+            length=-1 if stream.length is None else stream.length,
+            part_size=self.part_size
+        )
+
+    def item_location(self, item_id: int, filename: str) -> str:
+        """Returns the key an item moved to this backend is uploaded to (unique per item, see TieredStorage)."""
+        return f"{ITEM_PREFIX}{item_id}/{os.path.basename(filename)}"
+
+    async def write_object(self, key: str, stream: IngestStream) -> None:
+        """Uploads content to a key."""
+        await self._ensure_bucket()
+        await self._put(key, stream)
+
+    async def remove_object(self, key: str) -> None:
+        """Removes an object; removing a missing key is not an error."""
+        await self._run(self.client.remove_object, self.bucket_name, key)
+
+    async def save_variant(
+            self,
+            db: AsyncSession,
+            obj: StoredObject,
+            variant: str,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None
+    ) -> StoredObject:
+        """Uploads a variant below VARIANT_PREFIX and records it.
+
+        Raises:
+            HTTPException: 500 for MinIO or database errors
+        """
+        key = f"{VARIANT_PREFIX}{obj.item_id}.{variant}"
+        try:
+            await self._ensure_bucket()
+            await self._put(key, stream)
+            return await variants.record(db, obj, variant, stream, key, filename, encoding, storage_type='minio')
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"MinIO variant upload failed: {str(e)}"
+            )
+
+    async def open_variant(self, db: AsyncSession, item_id: int, variant: str) -> Optional[StoredObject]:
+        """Resolves the key and size of a variant from its record."""
+        return await variants.find(db, item_id, variant)
+
+    async def content_size(self, db: AsyncSession, content_hash: str) -> Optional[int]:
+        """Returns the size of a deduplicated object with this hash, if stored."""
+        if not self.dedup:
+            return None
+        blob = await content_refs.find(db, content_hash)
+        return None if blob is None else blob.size
+
+    async def link_content(self, db: AsyncSession, name: str, content_hash: str) -> Optional[Item]:
+        """Creates an item referencing an already stored object, without any upload."""
+        if not self.dedup:
+            return None
+        return await content_refs.link(db, name, content_hash, 'minio')
+
     async def load_file(self, db: AsyncSession, item_id: int) -> bytes:
         """Retrieves file content from MinIO with proper connection cleanup.
 
@@ -110,20 +348,20 @@ class MinioStorage(StorageInterface):
         """
         response = None
         try:
-            result = await db.execute(select(Item).where(Item.id == item_id))
-            item = result.scalars().first()
+            meta = await get_item_meta(db, item_id)
 
-            if not item:
+            if not meta:
                 raise HTTPException(
                     status_code=404,
                     detail=f"Item {item_id} not found"
                 )
 
-            response = self.client.get_object(
+            response = await self._run(
+                self.client.get_object,
                 bucket_name=self.bucket_name,
-                object_name=item.path_or_key
+                object_name=meta.path_or_key
             )
-            return response.read()
+            return await self._run(response.read)
 
         except Exception as e:
             raise HTTPException(
@@ -138,6 +376,142 @@ class MinioStorage(StorageInterface):
                 except Exception as e:
                     print(f"Connection cleanup error: {str(e)}")
 
+    async def open_file(self, db: AsyncSession, item_id: int) -> StoredObject:
+        """Resolves the object key and size from the item metadata.
+
+        Falls back to a HEAD request only for objects stored before sizes were
+        recorded, so a download costs no MinIO round-trip before the GET.
+
+        Args:
+            db: Async database session
+            item_id: Database record ID
+
+        Returns:
+            StoredObject: Handle with object key and size
+
+        Raises:
+            HTTPException: 404 - Item not found
+                          500 - Stat error
+        """
+        meta = await get_item_meta(db, item_id)
+
+        if not meta:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Item {item_id} not found"
+            )
+
+        return await self.handle(meta)
+
+    async def open_files(self, db: AsyncSession, item_ids: List[int]) -> Dict[int, StoredObject]:
+        """Resolves several items with one metadata query."""
+        return {meta.id: await self.handle(meta) for meta in await get_items_meta(db, item_ids)}
+
+    async def handle(self, meta) -> StoredObject:
+        """Builds the handle of an item row (see get_item_meta); HEADs the object only if its size was not recorded."""
+        size = meta.size_bytes
+        if size is None:
+            try:
+                size = (await self._run(self.client.stat_object, self.bucket_name, meta.path_or_key)).size
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"MinIO stat failure: {str(e)}"
+                )
+
+        return StoredObject(
+            meta.id, meta.filename, meta.path_or_key, size, meta.content_hash, storage_type=meta.storage_type
+        )
+
+    async def iter_chunks(
+            self,
+            obj: StoredObject,
+            offset: int = 0,
+            length: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Relays the requested object range chunk by chunk as it arrives from MinIO.
+
+        The range is forwarded to MinIO so only the requested bytes leave storage.
+
+        Args:
+            obj: Handle returned by open_file
+            offset: Position of the first byte to fetch
+            length: Number of bytes to fetch (None fetches to end of object)
+            chunk_size: Maximum bytes per chunk
+
+        Yields:
+            bytes: Consecutive object chunks
+
+        Warning:
+            Always closes MinIO response connections to prevent leaks
+        """
+        if length == 0:
+            return
+        response = await self._run(
+            self.client.get_object,
+            self.bucket_name,
+            obj.location,
+            offset=offset,
+            length=length or 0
+        )
+        try:
+            while True:
+                chunk = await self._run(response.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            try:
+                response.close()
+                response.release_conn()
+            except Exception as e:
+                print(f"Connection cleanup error: {str(e)}")
+
+    def redirect_url(self, obj: StoredObject) -> Optional[str]:
+        """Returns a presigned GET URL for the object when redirect mode is enabled.
+
+        URLs are cached and reused until less than half of their lifetime is
+        left, so hot objects are not re-signed on every download and clients
+        always get at least ``presign_ttl / 2`` seconds to start the transfer.
+
+        Args:
+            obj: Handle returned by open_file
+
+        Returns:
+            str | None: Presigned URL, or None if downloads are proxied
+        """
+        if not self.presign_ttl:
+            return None
+        key = (obj.location, obj.filename)
+        now = time.monotonic()
+        cached = self._urls.get(key)
+        if cached is not None and cached[1] - now > self.presign_ttl / 2:
+            self._urls.move_to_end(key)
+            self.urls_reused += 1
+            return cached[0]
+
+        url = self.presign_client.presigned_get_object(
+            self.bucket_name,
+            obj.location,
+            expires=timedelta(seconds=self.presign_ttl),
+            response_headers=self._response_headers(obj)
+        )
+        self._urls[key] = (url, now + self.presign_ttl)
+        self._urls.move_to_end(key)
+        if len(self._urls) > URL_CACHE_SIZE:
+            self._urls.popitem(last=False)
+        self.urls_signed += 1
+        return url
+
+    @staticmethod
+    def _response_headers(obj: StoredObject) -> dict:
+        """Response header overrides signed into a presigned URL."""
+        headers = {"response-content-disposition": f"attachment; filename={obj.filename}"}
+        if obj.encoding:
+            headers["response-content-encoding"] = obj.encoding
+        return headers
+
     async def delete_file(self, db: AsyncSession, item_id: int) -> None:
         """Atomically removes object from MinIO and database.
 
@@ -165,14 +539,25 @@ class MinioStorage(StorageInterface):
                     detail=f"Item {item_id} not found"
                 )
 
-            # Delete from MinIO
-            self.client.remove_object(
-                bucket_name=self.bucket_name,
-                object_name=item.path_or_key
-            )
+            key = item.path_or_key
+            if item.content_hash and key == BLOB_PREFIX + item.content_hash:
+                # Shared object: only removed with its last reference, before the commit releases the lock
+                key = await content_refs.release(db, item.content_hash)
+
+            # Delete from MinIO, along with the variants of the item
+            keys = await variants.delete_all(db, item_id)
+            if key:
+                keys.append(key)
+            for key in keys:
+                await self._run(
+                    self.client.remove_object,
+                    bucket_name=self.bucket_name,
+                    object_name=key
+                )
 
             await db.delete(item)
             await db.commit()
+            self._urls.pop((item.path_or_key, item.filename), None)
 
         except Exception as e:
             await db.rollback()
@@ -180,3 +565,15 @@ class MinioStorage(StorageInterface):
                 status_code=500,
                 detail=f"MinIO deletion failure: {str(e)}"
             )
+
+    def stats(self) -> dict:
+        """Returns pool settings, running client calls and presigned URL counters."""
+        return {
+            "minio": {
+                "in_flight": self.in_flight,
+                "max_workers": self.max_workers,
+                "pool_size": self.pool_size,
+                "urls_signed": self.urls_signed,
+                "urls_reused": self.urls_reused,
+            }
+        }
@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class FrequencySketch:
+    """Count-min sketch estimating recent access frequencies (TinyLFU).
+
+    Counters are halved once ``sample_size`` increments have been recorded, so
+    the estimates follow the current workload instead of all-time popularity.
+    """
+
+    DEPTH = 4
+
+    def __init__(self, width: int = 4096):
+        self.width = width
+        self.sample_size = 10 * width
+        self.additions = 0
+        self.rows = [[0] * width for _ in range(self.DEPTH)]
+
+    def _indexes(self, key: Hashable):
+        for seed in range(self.DEPTH):
+            yield hash((seed, key)) % self.width
+
+    def increment(self, key: Hashable) -> None:
+        for row, index in zip(self.rows, self._indexes(key)):
+            row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+    def _age(self) -> None:
+        for row in self.rows:
+            for index, count in enumerate(row):
+                row[index] = count >> 1
+        self.additions //= 2
+
+
+class ObjectCache:
+    """Byte-budgeted LRU cache with TinyLFU admission for whole-object payloads.
+
+    A new entry that does not fit is only admitted if it is accessed more often
+    than every entry it would evict, so a burst of large, rarely repeated reads
+    cannot flush a small hot set. Objects above ``max_object_bytes`` are never
+    cached.
+
+    Attributes:
+        max_bytes (int): Total payload budget in bytes
+        max_object_bytes (int): Largest single payload that may be cached
+        size (int): Bytes currently held
+    """
+
+    def __init__(self, max_bytes: int, max_object_bytes: Optional[int] = None, sketch_width: int = 4096):
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_bytes if max_object_bytes is None else min(max_object_bytes, max_bytes)
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, Tuple[object, bytes]]" = OrderedDict()
+        self._sketch = FrequencySketch(sketch_width)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Tuple[object, bytes]]:
+        """Returns the cached ``(meta, payload)`` pair and records the access."""
+        self._sketch.increment(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def peek(self, key: Hashable) -> Optional[Tuple[object, bytes]]:
+        """Returns the cached ``(meta, payload)`` pair without recording an access."""
+        return self._entries.get(key)
+
+    def admits(self, key: Hashable, size: int) -> bool:
+        """Tells whether a payload of ``size`` bytes would currently be admitted."""
+        return self._victims(key, size) is not None
+
+    def put(self, key: Hashable, meta: object, payload: bytes) -> bool:
+        """Offers a payload to the cache.
+
+        Args:
+            key: Cache key (the Item id)
+            meta: Metadata stored alongside the payload
+            payload: Object content
+
+        Returns:
+            bool: True if the payload was admitted
+        """
+        self.invalidate(key)
+        victims = self._victims(key, len(payload))
+        if victims is None:
+            self.rejections += 1
+            return False
+
+        for victim_key in victims:
+            self.invalidate(victim_key)
+            self.evictions += 1
+
+        self._entries[key] = (meta, payload)
+        self.size += len(payload)
+        return True
+
+    def _victims(self, key: Hashable, size: int):
+        """Returns the LRU keys to evict for a new entry, or None if it is not admitted.
+
+        The candidate is admitted only if it is accessed more often than every
+        entry it would displace.
+        """
+        if size > self.max_object_bytes:
+            return None
+
+        candidate_frequency = self._sketch.estimate(key)
+        victims = []
+        freed = 0
+        for victim_key, (_, victim_payload) in self._entries.items():
+            if self.size - freed + size <= self.max_bytes:
+                break
+            if victim_key == key:
+                continue
+            if self._sketch.estimate(victim_key) >= candidate_frequency:
+                return None
+            victims.append(victim_key)
+            freed += len(victim_payload)
+        return victims
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drops a cached entry, if present."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def stats(self) -> Dict[str, int]:
+        """Returns counters for sizing the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,161 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+_DETACHED = object()
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one in-flight execution.
+
+    The first caller starts the call as a task; callers arriving while it runs
+    await the same task and receive its result or exception.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Runs ``fn`` unless a call with ``key`` is already in flight, then shares it."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+            self.executions += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+class StreamFlight:
+    """One backend stream fanned out to every subscriber that joins early enough.
+
+    A producer task reads the source and hands each chunk to all subscribers'
+    queues. It runs at the pace of the fastest subscriber: a subscriber holding
+    ``window`` undelivered chunks is detached (it then continues with its own
+    read from its current position), so memory stays bounded by ``window``
+    chunks per subscriber. New subscribers can join while fewer than ``window``
+    chunks have been produced; they replay the chunks produced so far.
+    """
+
+    def __init__(self, source: AsyncIterator[bytes], window: int, on_closed: Callable[[], None]):
+        self._source = source
+        self._window = window
+        self._on_closed = on_closed
+        self._subscribers: List[asyncio.Queue] = []
+        self._head: List[bytes] = []
+        self._room = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.joinable = True
+        self.detached = 0
+
+    def subscribe(self) -> Optional[asyncio.Queue]:
+        """Registers a subscriber, or returns None if the flight is too far along."""
+        if not self.joinable:
+            return None
+        queue = asyncio.Queue()
+        for chunk in self._head:
+            queue.put_nowait(chunk)
+        self._subscribers.append(queue)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Removes a subscriber; the last one leaving cancels the backend read."""
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+        self._room.set()
+        if not self._subscribers and self._task is not None and not self._task.done():
+            # Closed before cancelling, so nobody joins a flight that will never deliver again
+            self._close_joining()
+            self._task.cancel()
+
+    def consumed(self) -> None:
+        """Signals the producer that a subscriber has taken a chunk off its queue."""
+        self._room.set()
+
+    def _close_joining(self) -> None:
+        if self.joinable:
+            self.joinable = False
+            self._head = []
+            self._on_closed()
+
+    async def _run(self) -> None:
+        try:
+            async for chunk in self._source:
+                while self._subscribers and all(q.qsize() >= self._window for q in self._subscribers):
+                    self._room.clear()
+                    await self._room.wait()
+                if not self._subscribers:
+                    return
+
+                for queue in list(self._subscribers):
+                    if queue.qsize() >= self._window:
+                        # Too slow for the group: let it continue on its own
+                        self._subscribers.remove(queue)
+                        queue.put_nowait(_DETACHED)
+                        self.detached += 1
+                    else:
+                        queue.put_nowait(chunk)
+
+                if self.joinable:
+                    self._head.append(chunk)
+                    if len(self._head) >= self._window:
+                        self._close_joining()
+
+            for queue in self._subscribers:
+                queue.put_nowait(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            for queue in self._subscribers:
+                queue.put_nowait(e)
+        finally:
+            self._close_joining()
+            aclose = getattr(self._source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+async def consume_flight(
+        flight: StreamFlight,
+        queue: asyncio.Queue,
+        resume: Callable[[int], AsyncIterator[bytes]]
+) -> AsyncIterator[bytes]:
+    """Yields the chunks delivered to ``queue``, resuming independently if detached.
+
+    Args:
+        flight: Flight the queue is subscribed to
+        queue: Subscription returned by StreamFlight.subscribe
+        resume: Callable opening a private stream starting ``n`` bytes into the range
+
+    Yields:
+        bytes: Consecutive chunks of the shared stream
+    """
+    delivered = 0
+    try:
+        while True:
+            item = await queue.get()
+            flight.consumed()
+            if item is _END:
+                return
+            if item is _DETACHED:
+                async for chunk in resume(delivered):
+                    yield chunk
+                return
+            if isinstance(item, Exception):
+                raise item
+            delivered += len(item)
+            yield item
+    finally:
+        flight.unsubscribe(queue)
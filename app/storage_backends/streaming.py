@@ -0,0 +1,99 @@
+import hashlib
+from typing import AsyncIterator, List, Optional
+
+from fastapi import UploadFile
+
+# Default read size for streamed uploads and downloads (1 MiB)
+CHUNK_SIZE = 1024 * 1024
+
+
+async def _read_upload(file: UploadFile, chunk_size: int) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class IngestStream:
+    """Async chunk stream for uploads that measures size and SHA-256 on the fly.
+
+    Backends consume the stream with ``async for`` and read :attr:`size` and
+    :attr:`content_hash` once it is exhausted, so an upload never has to be held
+    in memory as a whole.
+
+    Attributes:
+        length (int | None): Declared total length, if known before reading
+        known_hash (str | None): SHA-256 of the whole content, if known before
+            reading; lets backends deduplicate without consuming the stream
+        size (int): Number of bytes consumed so far
+    """
+
+    def __init__(
+            self,
+            chunks: AsyncIterator[bytes],
+            length: Optional[int] = None,
+            known_hash: Optional[str] = None
+    ):
+        self._chunks = chunks
+        self._digest = None if known_hash else hashlib.sha256()
+        self.length = length
+        self.known_hash = known_hash
+        self.size = 0
+
+    @classmethod
+    def from_upload(cls, file: UploadFile, chunk_size: int = CHUNK_SIZE) -> "IngestStream":
+        """Wraps a multipart UploadFile, reading it in ``chunk_size`` pieces."""
+        return cls(_read_upload(file, chunk_size), getattr(file, "size", None))
+
+    @classmethod
+    async def from_received_upload(cls, file: UploadFile, chunk_size: int = CHUNK_SIZE) -> "IngestStream":
+        """Wraps a multipart UploadFile after hashing it in a first pass.
+
+        The request body has already been spooled to memory or a local temp
+        file when the route runs, so the extra pass costs a local read and
+        gives backends the content hash before they write anything.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        async for chunk in _read_upload(file, chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+        await file.seek(0)
+        return cls(_read_upload(file, chunk_size), size, digest.hexdigest())
+
+    @classmethod
+    def from_bytes(cls, data: bytes, chunk_size: int = CHUNK_SIZE) -> "IngestStream":
+        """Wraps an in-memory payload, yielding ``chunk_size`` slices of it."""
+
+        async def chunks():
+            view = memoryview(data)
+            for offset in range(0, len(view), chunk_size):
+                yield bytes(view[offset:offset + chunk_size])
+
+        return cls(chunks(), len(data), hashlib.sha256(data).hexdigest())
+
+    @classmethod
+    def from_chunks(cls, chunks: List[bytes]) -> "IngestStream":
+        """Wraps content already split into chunks (e.g. built in memory), without copying it."""
+
+        async def iterate():
+            for chunk in chunks:
+                yield chunk
+
+        return cls(iterate(), sum(len(chunk) for chunk in chunks))
+
+    @property
+    def content_hash(self) -> str:
+        """Hex SHA-256 digest of all bytes consumed so far (or of the whole content, if known)."""
+        return self.known_hash or self._digest.hexdigest()
+
+    def __aiter__(self) -> "IngestStream":
+        return self
+
+    async def __anext__(self) -> bytes:
+        chunk = await self._chunks.__anext__()
+        self.size += len(chunk)
+        if self._digest is not None:
+            self._digest.update(chunk)
+        return chunk
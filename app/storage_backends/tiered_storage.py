@@ -0,0 +1,533 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Item, ItemAccess, RetiredObject, SessionLocal, engine, get_item_meta, get_items_meta
+from . import variants
+from .access_counter import AccessCounter
+from .base_interface import StorageInterface, StoredObject
+from .db_storage import DBStorage
+from .file_storage import FileStorage
+from .metadata_index import publish_change
+from .minio_storage import MinioStorage
+from .streaming import IngestStream, CHUNK_SIZE
+
+HOT_TIER = "file"
+COLD_TIER = "minio"
+# Items stored in the database before tiering was enabled; served in place, never moved
+DB_TIER = "db"
+# Moves remembered per process, so handles cached before a move are redirected
+KNOWN_MOVES = 10000
+# Advisory lock serialising tiering passes across worker processes (PostgreSQL)
+TIERING_LOCK = 0x7469657273
+# Demotion candidates considered per pass, per allowed move
+CANDIDATES_PER_MOVE = 4
+
+# (item id, size in bytes, decayed hits, unix time of the last flushed read)
+Placement = Tuple[int, int, float, int]
+
+
+def _stored(meta) -> bool:
+    """Tells whether an item row (see get_item_meta) refers to stored content."""
+    return bool(meta.path_or_key) or getattr(meta.storage_type, "value", meta.storage_type) == DB_TIER
+
+
+def plan_moves(
+        hot: List[Placement],
+        cold: List[Placement],
+        hot_bytes: int,
+        hot_max_bytes: int,
+        promote_hits: float,
+        demote_hits: float,
+        settled_before: int
+) -> Tuple[List[int], List[int]]:
+    """Chooses the items a tiering pass demotes and promotes.
+
+    Hot items are demoted when they are cold (fewer than ``demote_hits`` and
+    not read since ``settled_before``) or while the hot tier exceeds its
+    budget. Cold items reaching ``promote_hits`` are promoted while they fit
+    the budget, displacing hot items with less than half their hits.
+
+    Args:
+        hot: Items on the hot tier, fewest hits first
+        cold: Items on the cold tier with at least ``promote_hits``, most hits first
+        hot_bytes: Bytes currently stored on the hot tier
+        hot_max_bytes: Budget of the hot tier
+        promote_hits: Hits making a cold item hot
+        demote_hits: Hits below which a hot item is cold
+        settled_before: Items read (or uploaded) after this unix time are not demoted for being cold
+
+    Returns:
+        Tuple of the ids to demote and the ids to promote
+    """
+    demote, remaining = [], []
+    for item_id, size, hits, accessed_at in hot:
+        if hot_bytes > hot_max_bytes or (hits < demote_hits and accessed_at <= settled_before):
+            demote.append(item_id)
+            hot_bytes -= size
+        else:
+            remaining.append((item_id, size, hits))
+
+    promote = []
+    for item_id, size, hits, _ in cold:
+        if hits < promote_hits:
+            break
+        while hot_bytes + size > hot_max_bytes and remaining and remaining[0][2] * 2 < hits:
+            victim, victim_size, _ = remaining.pop(0)
+            demote.append(victim)
+            hot_bytes -= victim_size
+        if hot_bytes + size <= hot_max_bytes:
+            promote.append(item_id)
+            hot_bytes += size
+    return demote, promote
+
+
+class TieredStorage(StorageInterface):
+    """Places each item on a local file tier or a MinIO tier depending on how often it is read.
+
+    Items are served from the tier recorded in their ``storage_type``.
+    Downloads are counted in memory (see record_access and AccessCounter) and
+    flushed in batches into counters decaying with a half-life; a background
+    pass promotes items read often to the local file tier (within its byte
+    budget) and demotes items no longer read to MinIO. Moves copy the content first and then switch
+    ``storage_type`` and ``path_or_key`` with one conditional UPDATE, so
+    readers see either the old or the new placement; the old copy is removed
+    after a grace period, giving downloads in flight and handles cached by
+    other processes time to move on. Moves are throttled to a byte rate and a
+    number per pass.
+
+    Variants stay on the tier their item was on when they were built (see
+    ItemVariant.storage_type); only originals are moved.
+
+    Items stored with the ``db`` backend before tiering was enabled are
+    served and deleted in place but never moved: their content lives in the
+    item row (or its ``item_chunks``), so a move could not switch it with a
+    conditional UPDATE of the location, and reads of such items are not hot.
+    """
+
+    def __init__(
+            self,
+            hot: FileStorage,
+            cold: MinioStorage,
+            db: Optional[DBStorage] = None,
+            ingest: str = HOT_TIER,
+            hot_max_bytes: int = 10 * 1024 ** 3,
+            promote_hits: float = 5.0,
+            demote_hits: float = 1.0,
+            half_life: float = 3600.0,
+            min_residency: float = 3600.0,
+            interval: float = 60.0,
+            flush_interval: float = 10.0,
+            rate_bytes: int = 50 * 1024 ** 2,
+            max_moves: int = 100,
+            grace: float = 300.0
+    ):
+        """Configures the tiers and the tiering policy.
+
+        Args:
+            hot: Local file tier
+            cold: MinIO tier
+            db: Database storage serving items stored before tiering was enabled
+            ingest: Tier new uploads are stored on ('file' or 'minio')
+            hot_max_bytes: Budget of originals on the file tier
+            promote_hits: Decayed reads making an item on MinIO hot
+            demote_hits: Decayed reads below which an item on the file tier is cold
+            half_life: Seconds after which an unread item's counter has halved
+            min_residency: Seconds an item stays on the file tier after its last read or upload
+                before it may be demoted for being cold
+            interval: Seconds between tiering passes
+            flush_interval: Seconds between flushes of the read counters
+            rate_bytes: Bytes moved per second at most (0: unthrottled)
+            max_moves: Items moved per pass at most
+            grace: Seconds the old copy of a moved item is kept
+        """
+        if ingest not in (HOT_TIER, COLD_TIER):
+            raise ValueError(f"Unknown ingest tier: {ingest}")
+        if promote_hits <= demote_hits:
+            raise ValueError("Promotion needs more hits than demotion")
+        self.tiers: Dict[str, Union[FileStorage, MinioStorage, DBStorage]] = {HOT_TIER: hot, COLD_TIER: cold}
+        if db is not None:
+            self.tiers[DB_TIER] = db
+        self.ingest = self.tiers[ingest]
+        self.hot_max_bytes = hot_max_bytes
+        self.promote_hits = promote_hits
+        self.demote_hits = demote_hits
+        self.half_life = half_life
+        self.min_residency = min_residency
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.rate_bytes = rate_bytes
+        self.max_moves = max_moves
+        self.grace = grace
+        self.counter = AccessCounter(half_life)
+        self._moved: "OrderedDict[int, StoredObject]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        self.passes = 0
+        self.promoted = 0
+        self.demoted = 0
+        self.bytes_moved = 0
+        self.failed_moves = 0
+        self.removed_copies = 0
+
+    async def startup(self) -> None:
+        """Prepares both tiers and starts counter flushes and tiering passes."""
+        for tier in self.tiers.values():
+            await tier.startup()
+        self._tasks = [asyncio.ensure_future(self._flush_loop()), asyncio.ensure_future(self._tiering_loop())]
+
+    async def shutdown(self) -> None:
+        """Stops the background work and flushes pending counters.
+
+        Retired copies still in their grace period are left to the next
+        process; they are recorded in ``retired_objects``.
+        """
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await self.counter.flush()
+        for tier in self.tiers.values():
+            await tier.shutdown()
+
+    def _tier(self, storage_type: Optional[str], item_id: int) -> Union[FileStorage, MinioStorage, DBStorage]:
+        tier = self.tiers.get(getattr(storage_type, "value", storage_type))
+        if tier is None:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Item {item_id} is stored on '{storage_type}', which is not a configured tier"
+            )
+        return tier
+
+    def _current(self, obj: StoredObject) -> StoredObject:
+        """Redirects handles of originals that this process has moved since they were resolved."""
+        if obj.variant is None:
+            moved = self._moved.get(obj.item_id)
+            if moved is not None and moved.location != obj.location:
+                return moved
+        return obj
+
+    async def save_stream(self, db: AsyncSession, name: str, stream: IngestStream) -> Item:
+        """Stores the upload on the ingest tier; the upload counts as a read."""
+        item = await self.ingest.save_stream(db, name, stream)
+        self.counter.hit(item.id)
+        return item
+
+    async def save_batch(
+            self,
+            db: AsyncSession,
+            uploads: List[Tuple[str, IngestStream]]
+    ) -> List[Union[Item, HTTPException]]:
+        """Stores the batch on the ingest tier; each upload counts as a read."""
+        results = await self.ingest.save_batch(db, uploads)
+        for result in results:
+            if isinstance(result, Item):
+                self.counter.hit(result.id)
+        return results
+
+    async def save_variant(
+            self,
+            db: AsyncSession,
+            obj: StoredObject,
+            variant: str,
+            stream: IngestStream,
+            filename: Optional[str] = None,
+            encoding: Optional[str] = None
+    ) -> StoredObject:
+        """Stores the variant on the tier currently holding its original."""
+        obj = self._current(obj)
+        return await self._tier(obj.storage_type, obj.item_id).save_variant(
+            db, obj, variant, stream, filename, encoding
+        )
+
+    async def open_variant(self, db: AsyncSession, item_id: int, variant: str) -> Optional[StoredObject]:
+        """Resolves a variant from its record, which names its tier."""
+        return await variants.find(db, item_id, variant)
+
+    async def load_file(self, db: AsyncSession, item_id: int) -> bytes:
+        """Loads the content from the tier holding the item."""
+        meta = await get_item_meta(db, item_id)
+        if meta is None:
+            raise HTTPException(status_code=404, detail=f"Item {item_id} not found")
+        return await self._tier(meta.storage_type, item_id).load_file(db, item_id)
+
+    async def open_file(self, db: AsyncSession, item_id: int) -> StoredObject:
+        """Resolves the item with one metadata query and builds the handle of its tier."""
+        meta = await get_item_meta(db, item_id)
+        if meta is None or not _stored(meta):
+            raise HTTPException(status_code=404, detail=f"Item {item_id} not found")
+        return await self._tier(meta.storage_type, item_id).handle(meta)
+
+    async def open_files(self, db: AsyncSession, item_ids: List[int]) -> Dict[int, StoredObject]:
+        """Resolves several items with one metadata query; content missing on its tier is left out."""
+        found = {}
+        for meta in await get_items_meta(db, item_ids):
+            if _stored(meta):
+                try:
+                    found[meta.id] = await self._tier(meta.storage_type, meta.id).handle(meta)
+                except HTTPException as e:
+                    if e.status_code != 404:
+                        raise
+        return found
+
+    def iter_chunks(
+            self,
+            obj: StoredObject,
+            offset: int = 0,
+            length: Optional[int] = None,
+            chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Streams from the tier holding the content."""
+        obj = self._current(obj)
+        return self._tier(obj.storage_type, obj.item_id).iter_chunks(obj, offset, length, chunk_size)
+
+    def local_path(self, obj: StoredObject) -> Optional[str]:
+        """Returns the path of content on the file tier (sendfile)."""
+        obj = self._current(obj)
+        return self._tier(obj.storage_type, obj.item_id).local_path(obj)
+
+    def redirect_url(self, obj: StoredObject) -> Optional[str]:
+        """Returns a presigned URL for content on the MinIO tier."""
+        obj = self._current(obj)
+        return self._tier(obj.storage_type, obj.item_id).redirect_url(obj)
+
+    def record_access(self, obj: StoredObject) -> None:
+        """Counts a download of the item; downloads of its variants count for the original."""
+        self.counter.hit(obj.item_id)
+
+    async def delete_file(self, db: AsyncSession, item_id: int) -> None:
+        """Removes the variants from their tiers, then deletes the item via its own tier."""
+        meta = await get_item_meta(db, item_id)
+        if meta is None:
+            raise HTTPException(status_code=404, detail=f"Item {item_id} not found")
+        try:
+            for storage_type, location in await variants.delete_all_placed(db, item_id):
+                await self._tier(storage_type or meta.storage_type, item_id).remove_object(location)
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Deletion failed: {str(e)}")
+        await self._tier(meta.storage_type, item_id).delete_file(db, item_id)
+        self._moved.pop(item_id, None)
+
+    async def move(self, item_id: int, target: str) -> int:
+        """Moves the content of an item to another tier.
+
+        The content is copied to the target tier, then the item record is
+        switched to it if it still points to the copied content; otherwise
+        (the item was deleted or moved concurrently) the copy is discarded.
+
+        Args:
+            item_id: Item to move
+            target: Tier to move it to ('file' or 'minio')
+
+        Returns:
+            int: Bytes moved, 0 if the item was not moved
+        """
+        async with SessionLocal() as db:
+            meta = await get_item_meta(db, item_id)
+        if meta is None or not meta.path_or_key or meta.size_bytes is None:
+            return 0
+        source_type = getattr(meta.storage_type, "value", meta.storage_type)
+        if source_type == target or {source_type, target} != {HOT_TIER, COLD_TIER}:
+            return 0
+        source = self._tier(source_type, item_id)
+        destination = self._tier(target, item_id)
+        obj = await source.handle(meta)
+        location = destination.item_location(item_id, meta.filename)
+
+        stream = IngestStream(source.iter_chunks(obj), obj.size, obj.content_hash)
+        await destination.write_object(location, stream)
+        if stream.size != obj.size:
+            await destination.remove_object(location)
+            raise IOError(f"Copied {stream.size} of {obj.size} bytes")
+
+        async with SessionLocal() as db:
+            result = await db.execute(
+                update(Item).where(
+                    Item.id == item_id, Item.storage_type == source_type, Item.path_or_key == meta.path_or_key
+                ).values(storage_type=target, path_or_key=location)
+            )
+            await db.commit()
+        if result.rowcount != 1:
+            await self._retire(target, location, due=0)
+            return 0
+
+        self._moved[item_id] = StoredObject(
+            item_id, obj.filename, location, obj.size, obj.content_hash, storage_type=target
+        )
+        self._moved.move_to_end(item_id)
+        if len(self._moved) > KNOWN_MOVES:
+            self._moved.popitem(last=False)
+        await self._retire(source_type, meta.path_or_key, due=time.time() + self.grace)
+        await publish_change("update", item_id)
+        return obj.size
+
+    @staticmethod
+    async def _retire(storage_type: str, location: str, due: float) -> None:
+        """Records an old copy to remove once ``due`` (unix time) has passed.
+
+        The record is persisted, so copies are still removed after a restart
+        and by whichever process sweeps first.
+        """
+        async with SessionLocal() as db:
+            db.add(RetiredObject(storage_type=storage_type, location=location, due_at=int(due)))
+            await db.commit()
+
+    async def _remove_retired(self) -> None:
+        """Removes old copies whose grace period is over, unless an item refers to them again."""
+        async with SessionLocal() as db:
+            due = (await db.execute(
+                select(RetiredObject).where(RetiredObject.due_at <= int(time.time())).order_by(RetiredObject.due_at)
+            )).scalars().all()
+        for retired in due:
+            try:
+                async with SessionLocal() as db:
+                    # Deleting the record first claims it; the deletion is rolled back if the removal fails
+                    claimed = await db.execute(delete(RetiredObject).where(RetiredObject.id == retired.id))
+                    if claimed.rowcount != 1:
+                        continue
+                    referenced = (await db.execute(
+                        select(func.count()).select_from(Item).where(
+                            Item.storage_type == retired.storage_type, Item.path_or_key == retired.location
+                        )
+                    )).scalar()
+                    if not referenced:
+                        await self.tiers[retired.storage_type].remove_object(retired.location)
+                    await db.commit()
+                if not referenced:
+                    self.removed_copies += 1
+            except Exception as e:
+                print(f"Removing the old copy {retired.location} on {retired.storage_type} failed: {str(e)}")
+
+    @asynccontextmanager
+    async def _locked(self) -> AsyncIterator[bool]:
+        """Holds the tiering lock (PostgreSQL advisory lock) if it is free; yields whether it was acquired."""
+        if engine.dialect.name != "postgresql":
+            yield True
+            return
+        async with engine.connect() as lock:
+            acquired = (await lock.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": TIERING_LOCK})).scalar()
+            if not acquired:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                await lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": TIERING_LOCK})
+
+    async def rebalance(self) -> dict:
+        """Runs one tiering pass: drops counters that decayed away, then demotes and promotes items.
+
+        With PostgreSQL, passes of several worker processes are serialised by an
+        advisory lock: the pass is planned and each move is made holding it,
+        while the connection holding it is returned to the pool during the
+        rate-limit pauses between moves. A process finding the lock taken skips
+        the pass, or ends it if another process took the lock during a pause.
+
+        Returns:
+            dict: Number of items demoted and promoted and the bytes moved
+        """
+        summary = {"demoted": 0, "promoted": 0, "bytes_moved": 0}
+        async with self._locked() as acquired:
+            if not acquired:
+                return summary
+            moves = await self._plan()
+        for item_id, target in moves:
+            async with self._locked() as acquired:
+                if not acquired:
+                    break
+                try:
+                    moved = await self.move(item_id, target)
+                except Exception as e:
+                    self.failed_moves += 1
+                    print(f"Moving item {item_id} to {target} failed: {str(e)}")
+                    continue
+            if moved:
+                key = "promoted" if target == HOT_TIER else "demoted"
+                summary[key] += 1
+                summary["bytes_moved"] += moved
+                if self.rate_bytes:
+                    await asyncio.sleep(moved / self.rate_bytes)
+        self.passes += 1
+        self.promoted += summary["promoted"]
+        self.demoted += summary["demoted"]
+        self.bytes_moved += summary["bytes_moved"]
+        return summary
+
+    async def _plan(self) -> List[Tuple[int, str]]:
+        """Returns the moves of a pass as (item id, target tier), demotions first."""
+        now = time.time()
+        await self.counter.prune()
+
+        decayed = self.counter.decayed(int(now))
+        hits = func.coalesce(decayed, 0.0)
+        accessed_at = func.coalesce(ItemAccess.accessed_at, 0)
+        async with SessionLocal() as db:
+            hot_bytes = (await db.execute(
+                select(func.coalesce(func.sum(Item.size_bytes), 0)).where(Item.storage_type == HOT_TIER)
+            )).scalar()
+            hot = (await db.execute(
+                select(Item.id, Item.size_bytes, hits, accessed_at)
+                .outerjoin(ItemAccess, ItemAccess.item_id == Item.id)
+                .where(Item.storage_type == HOT_TIER, Item.size_bytes.isnot(None))
+                .order_by(hits, Item.id)
+                .limit(self.max_moves * CANDIDATES_PER_MOVE)
+            )).all()
+            cold = (await db.execute(
+                select(Item.id, Item.size_bytes, decayed, ItemAccess.accessed_at)
+                .join(ItemAccess, ItemAccess.item_id == Item.id)
+                .where(
+                    Item.storage_type == COLD_TIER, Item.size_bytes.isnot(None),
+                    # Stored counters are never below their decayed value
+                    ItemAccess.hits >= self.promote_hits, decayed >= self.promote_hits
+                )
+                .order_by(decayed.desc(), Item.id)
+                .limit(self.max_moves)
+            )).all()
+
+        demote, promote = plan_moves(
+            [tuple(row) for row in hot], [tuple(row) for row in cold], hot_bytes, self.hot_max_bytes,
+            self.promote_hits, self.demote_hits, int(now - self.min_residency)
+        )
+        # Demotions first, to make room on the file tier
+        moves = [(item_id, COLD_TIER) for item_id in demote] + [(item_id, HOT_TIER) for item_id in promote]
+        return moves[:self.max_moves]
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.counter.flush()
+            try:
+                await self._remove_retired()
+            except Exception as e:
+                print(f"Sweeping retired copies failed: {str(e)}")
+
+    async def _tiering_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                summary = await self.rebalance()
+                if summary["promoted"] or summary["demoted"]:
+                    print(f"Tiering pass: {summary}")
+            except Exception as e:
+                print(f"Tiering pass failed: {str(e)}")
+
+    def stats(self) -> dict:
+        """Returns the counters of both tiers and of tiering."""
+        return {
+            **self.tiers[HOT_TIER].stats(),
+            **self.tiers[COLD_TIER].stats(),
+            "tiering": {
+                "passes": self.passes,
+                "promoted": self.promoted,
+                "demoted": self.demoted,
+                "bytes_moved": self.bytes_moved,
+                "failed_moves": self.failed_moves,
+                "removed_copies": self.removed_copies,
+                "access_counter": self.counter.stats(),
+            },
+        }
@@ -0,0 +1,140 @@
+"""Records of derived item representations (see ItemVariant).
+
+Backends store the variant content the same way they store originals and use
+these helpers for the metadata, so every backend resolves, records and drops
+variants alike.
+"""
+
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Item, ItemVariant
+from .base_interface import StoredObject
+from .streaming import IngestStream
+
+
+def handle(item_id: int, row) -> StoredObject:
+    """Builds the streamable handle of a variant row."""
+    return StoredObject(
+        item_id, row.filename, row.path_or_key, row.size_bytes, row.content_hash, row.name, row.encoding,
+        row.storage_type
+    )
+
+
+def _storage_type():
+    # Variants recorded before tiers were tracked live with their item
+    return func.coalesce(ItemVariant.storage_type, Item.storage_type).label("storage_type")
+
+
+async def find(db: AsyncSession, item_id: int, variant: str) -> Optional[StoredObject]:
+    """Returns the handle of a stored variant, or None if it has not been built."""
+    row = (await db.execute(
+        select(
+            ItemVariant.name, ItemVariant.filename, ItemVariant.encoding, ItemVariant.path_or_key,
+            ItemVariant.size_bytes, ItemVariant.content_hash, _storage_type()
+        ).join(Item, Item.id == ItemVariant.item_id).where(ItemVariant.item_id == item_id, ItemVariant.name == variant)
+    )).first()
+    return None if row is None else handle(item_id, row)
+
+
+async def record(
+        db: AsyncSession,
+        obj: StoredObject,
+        variant: str,
+        stream: IngestStream,
+        location: Optional[str],
+        filename: Optional[str] = None,
+        encoding: Optional[str] = None,
+        content=None,
+        storage_type: Optional[str] = None
+) -> StoredObject:
+    """Records a variant whose content has been stored, and commits.
+
+    Args:
+        db: Async database session of the calling transaction
+        obj: Handle of the original the variant was derived from
+        variant: Variant name, unique per item
+        stream: Exhausted stream the variant content was stored from
+        location: Filesystem path or object key of the stored content
+        filename: Download filename of the variant (default: that of the original)
+        encoding: HTTP content coding of the variant, if any
+        content: SQL expression filling the content column ('db' storage)
+        storage_type: Storage tier the content was stored on
+
+    Returns:
+        StoredObject: Handle of the variant; if the same variant was recorded
+            concurrently (e.g. by another worker), the handle of that one
+    """
+    row = ItemVariant(
+        item_id=obj.item_id,
+        name=variant,
+        filename=filename or obj.filename,
+        encoding=encoding,
+        path_or_key=location,
+        storage_type=storage_type,
+        size_bytes=stream.size,
+        content_hash=stream.content_hash
+    )
+    try:
+        db.add(row)
+        await db.flush()
+        if content is not None:
+            await db.execute(update(ItemVariant).where(ItemVariant.id == row.id).values(content=content))
+        # Built before the commit expires the row's attributes
+        stored = handle(obj.item_id, row)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        existing = await find(db, obj.item_id, variant)
+        if existing is None:
+            raise
+        return existing
+    return stored
+
+
+async def annotate(db: AsyncSession, item_id: int, variant: str, report: dict) -> None:
+    """Records build details (e.g. bytes saved) with a stored variant, and commits."""
+    await db.execute(
+        update(ItemVariant).where(ItemVariant.item_id == item_id, ItemVariant.name == variant).values(report=report)
+    )
+    await db.commit()
+
+
+async def list_all(db: AsyncSession, item_id: int) -> list:
+    """Returns the rows of all stored variants of an item, ordered by name."""
+    return (await db.execute(
+        select(
+            ItemVariant.name, ItemVariant.filename, ItemVariant.encoding,
+            ItemVariant.size_bytes, ItemVariant.content_hash, ItemVariant.report
+        ).where(ItemVariant.item_id == item_id).order_by(ItemVariant.name)
+    )).all()
+
+
+async def delete_all(db: AsyncSession, item_id: int) -> List[str]:
+    """Deletes the variant rows of an item within the caller's transaction.
+
+    Returns:
+        List[str]: Paths or object keys of the variant content the caller has to remove
+    """
+    result = await db.execute(
+        delete(ItemVariant).where(ItemVariant.item_id == item_id).returning(ItemVariant.path_or_key)
+    )
+    return [location for location in result.scalars() if location]
+
+
+async def delete_all_placed(db: AsyncSession, item_id: int) -> List[Tuple[Optional[str], str]]:
+    """Deletes the variant rows of an item like :func:`delete_all`, keeping track of their storage tiers.
+
+    Returns:
+        List[Tuple[str | None, str]]: Storage tier (None: that of the item) and
+            path or object key of each variant the caller has to remove
+    """
+    result = await db.execute(
+        delete(ItemVariant).where(ItemVariant.item_id == item_id).returning(
+            ItemVariant.storage_type, ItemVariant.path_or_key
+        )
+    )
+    return [(getattr(storage_type, "value", storage_type), location) for storage_type, location in result if location]
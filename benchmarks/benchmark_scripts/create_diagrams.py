@@ -12,8 +12,9 @@ plt.style.use(PLOT_STYLE)
 FONT_SIZE = 12
 DPI = 400
 FIGSIZE = (12, 6)
-COLORS = {'file': '#4C72B0', 'db': '#DD8452', 'minio': '#55A868'}
-LINE_STYLES = {'file': '-', 'db': '-', 'minio': '-'}
+# Presigned MinIO downloads are drawn in a lighter shade of proxied MinIO
+COLORS = {'file': '#4C72B0', 'db': '#DD8452', 'minio': '#55A868', 'minio_presigned': '#8DC891'}
+LINE_STYLES = {'file': '-', 'db': '-', 'minio': '-', 'minio_presigned': '--'}
 
 
 def format_axis(value, pos):
@@ -64,7 +65,7 @@ def load_data(filepath: str) -> pd.DataFrame:
 
         Returns:
             pd.DataFrame: Processed DataFrame with:
-            - storage: Storage backend type (file/db/minio)
+            - storage: Storage backend type (file/db/minio/minio_presigned)
             - file_size: Categorical size (small/medium/large)
             - Metrics as numpy arrays (latency, cpu_usage, memory_usage)
 
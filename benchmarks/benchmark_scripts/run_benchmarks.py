@@ -8,10 +8,12 @@ import docker
 WEB_FILE_URL = "http://web_file:8000"
 WEB_DB_URL = "http://web_db:8000"
 WEB_MINIO_URL = "http://web_minio:8000"
+WEB_MINIO_PRESIGNED_URL = "http://web_minio_presigned:8000"
 
 LOCALHOST_FILE_URL = "http://localhost:8001"
 LOCALHOST_DB_URL = "http://localhost:8002"
 LOCALHOST_MINIO_URL = "http://localhost:8000"
+LOCALHOST_MINIO_PRESIGNED_URL = "http://localhost:8003"
 
 BENCHMARKS = [
     {"storage": "file", "file_size": "small", "host": f"{WEB_FILE_URL}", "storage_container_name": "file"},
@@ -22,7 +24,14 @@ BENCHMARKS = [
     {"storage": "db", "file_size": "large", "host": f"{WEB_DB_URL}", "storage_container_name": "arpas_postgres"},
     {"storage": "minio", "file_size": "small", "host": f"{WEB_MINIO_URL}", "storage_container_name": "minio-storage"},
     {"storage": "minio", "file_size": "medium", "host": f"{WEB_MINIO_URL}", "storage_container_name": "minio-storage"},
-    {"storage": "minio", "file_size": "large", "host": f"{WEB_MINIO_URL}", "storage_container_name": "minio-storage"}
+    {"storage": "minio", "file_size": "large", "host": f"{WEB_MINIO_URL}", "storage_container_name": "minio-storage"},
+    # Downloads answered with a redirect to a presigned MinIO URL (followed by the Locust client)
+    {"storage": "minio_presigned", "file_size": "small", "host": f"{WEB_MINIO_PRESIGNED_URL}",
+     "storage_container_name": "minio-storage"},
+    {"storage": "minio_presigned", "file_size": "medium", "host": f"{WEB_MINIO_PRESIGNED_URL}",
+     "storage_container_name": "minio-storage"},
+    {"storage": "minio_presigned", "file_size": "large", "host": f"{WEB_MINIO_PRESIGNED_URL}",
+     "storage_container_name": "minio-storage"}
 ]
 
 LOCUST_API = "http://localhost:8089"
@@ -34,6 +43,8 @@ RUNTIME = 600  # 60 seconds per benchmark
 PAUSE = 30  # Cooldown between benchmarks
 
 PREUPLOADED_FILE_COUNT = 20
+# Upper bound of the request body of one batch upload (the client builds it in memory)
+PREUPLOAD_BATCH_BYTES = 256 * 1024 * 1024
 
 client = docker.from_env()
 PREUPLOADED_IDS_FILE = "preuploaded_ids.json"
@@ -44,42 +55,46 @@ def preupload_files():
     """Uploads test files to all storage systems for benchmarking preparation.
 
         Iterates through configured storage systems and file sizes, uploading multiple
-        test files to each. Stores the uploaded file IDs in a JSON file for later use.
+        test files to each in batch requests. Stores the uploaded file IDs in a JSON file for later use.
 
         Raises:
-            Exception: If any file upload fails with non-200 status code.
+            Exception: If the batch request or any file of it fails.
 
         Side Effects:
             Creates/overwrites PREUPLOADED_IDS_FILE with uploaded file IDs.
         """
     preuploaded_ids = {}
 
-    for storage in ["file", "db", "minio"]:
+    for storage in ["file", "db", "minio", "minio_presigned"]:
         preuploaded_ids[storage] = {}
         host = {
             "file": LOCALHOST_FILE_URL,
             "db": LOCALHOST_DB_URL,
-            "minio": LOCALHOST_MINIO_URL
+            "minio": LOCALHOST_MINIO_URL,
+            "minio_presigned": LOCALHOST_MINIO_PRESIGNED_URL
         }[storage]
 
         for file_size in ["small", "medium", "large"]:
             file_path = BENCHMARK_FILES_DIR / f"{file_size}_model.gltf"
             print(f"Uploading {PREUPLOADED_FILE_COUNT} files with {file_size} file size to {storage}...")
 
+            # Few batch requests (one metadata transaction each) instead of one request per file
+            with open(file_path, "rb") as f:
+                content = f.read()
+            per_batch = max(1, PREUPLOAD_BATCH_BYTES // max(1, len(content)))
             preuploaded_ids[storage][file_size] = []
-            for i in range(PREUPLOADED_FILE_COUNT):
-                with open(file_path, "rb") as f:
-                    resp = requests.post(
-                        f"{host}/items/",
-                        files={"file": f},
-                        data={"name": f"{file_size}_model_{i}", "description": "Preuploaded for benchmark"}
-                    )
-                if resp.status_code == 200:
-                    item_id = resp.json().get("id")
-                    preuploaded_ids[storage][file_size].append(item_id)
-                    print(f"✅ Upload successfully (ID: {item_id})")
-                else:
+            for first in range(0, PREUPLOADED_FILE_COUNT, per_batch):
+                indices = range(first, min(first + per_batch, PREUPLOADED_FILE_COUNT))
+                resp = requests.post(
+                    f"{host}/items/batch",
+                    files=[("files", (file_path.name, content)) for _ in indices],
+                    data={"names": [f"{file_size}_model_{i}" for i in indices], "description": "Preuploaded for benchmark"}
+                )
+                if resp.status_code != 200 or resp.json()["failed"]:
                     raise Exception(f"❌ Upload failed: {resp.text}")
+                item_ids = [result["item"]["id"] for result in resp.json()["results"]]
+                preuploaded_ids[storage][file_size] += item_ids
+                print(f"✅ Upload successfully (IDs: {item_ids})")
 
     with open(PREUPLOADED_IDS_FILE, "w") as f:
         json.dump(preuploaded_ids, f, indent=2)
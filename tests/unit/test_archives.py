@@ -0,0 +1,101 @@
+import asyncio
+import io
+import zipfile
+from email import message_from_bytes
+
+import pytest
+
+from app.routes.archives import content_disposition, multipart_mixed, prefetched, zip_archive
+from app.storage_backends.base_interface import StoredObject
+
+CONTENTS = {1: b"glTF" * 3000, 2: b"", 3: b"solid cube\nendsolid cube\n"}
+OBJECTS = [
+    StoredObject(1, "model.glb", "model.glb", len(CONTENTS[1])),
+    StoredObject(2, "empty.obj", "empty.obj", 0),
+    StoredObject(3, "cube.stl", "cube.stl", len(CONTENTS[3])),
+]
+
+
+async def _read(obj, offset, length):
+    data = CONTENTS[obj.item_id][offset:offset + length]
+    for start in range(0, len(data), 1000):
+        await asyncio.sleep(0)
+        yield data[start:start + 1000]
+
+
+async def _collect(body):
+    return b"".join([chunk async for chunk in body])
+
+
+def test_zip_archive_is_readable_and_has_announced_length():
+    # Act
+    length, body = zip_archive(OBJECTS, _read, window=2)
+    data = asyncio.run(_collect(body))
+
+    # Assert
+    assert len(data) == length
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["1/model.glb", "2/empty.obj", "3/cube.stl"]
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+        assert archive.read("3/cube.stl") == CONTENTS[3]
+
+
+def test_multipart_mixed_parts_carry_files_in_order():
+    # Act
+    content_type, length, body = multipart_mixed(OBJECTS, _read)
+    data = asyncio.run(_collect(body))
+
+    # Assert
+    assert len(data) == length
+    message = message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + data)
+    parts = message.get_payload()
+    assert [part["X-Item-Id"] for part in parts] == ["1", "2", "3"]
+    assert [part.get_payload(decode=True) for part in parts] == [CONTENTS[1], CONTENTS[2], CONTENTS[3]]
+
+
+def test_multipart_mixed_escapes_file_names_in_part_headers():
+    # Arrange
+    name = 'evil".glb\r\nX-Item-Id: 99\r\n\r\nmodèle.glb'
+    objects = [StoredObject(1, name, name, len(CONTENTS[1]))]
+
+    # Act
+    content_type, length, body = multipart_mixed(objects, _read)
+    data = asyncio.run(_collect(body))
+
+    # Assert
+    message = message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + data)
+    [part] = message.get_payload()
+    assert part.get_all("X-Item-Id") == ["1"]
+    assert part.get_filename() == 'evil".glbX-Item-Id: 99mod?le.glb'
+    assert part["Content-Disposition"].endswith("filename*=UTF-8''evil%22.glbX-Item-Id%3A%2099mod%C3%A8le.glb")
+    assert part.get_payload(decode=True) == CONTENTS[1]
+
+
+def test_content_disposition_quotes_fallback_and_encodes_utf8_name():
+    assert content_disposition('a "b"\\c.glb') == (
+        'attachment; filename="a \\"b\\"\\\\c.glb"; filename*=UTF-8\'\'a%20%22b%22%5Cc.glb'
+    )
+    assert content_disposition("modèle.glb") == (
+        "attachment; filename=\"mod?le.glb\"; filename*=UTF-8''mod%C3%A8le.glb"
+    )
+
+
+def test_prefetched_raises_read_errors_and_stops_reading_ahead():
+    # Arrange
+    started = []
+
+    async def failing(obj, offset, length):
+        started.append(obj.item_id)
+        if obj.item_id == 1:
+            raise OSError("disk gone")
+        yield b"x"
+
+    async def consume():
+        async for _ in prefetched(OBJECTS, failing, window=2):
+            pass
+
+    # Act / Assert
+    with pytest.raises(OSError):
+        asyncio.run(consume())
+    assert 3 not in started
@@ -0,0 +1,59 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import HTTPException
+
+from app.models import Item
+from app.storage_backends import batch_ingest
+from app.storage_backends.streaming import IngestStream
+
+
+def _session(commit_error: Exception = None) -> MagicMock:
+    db = MagicMock()
+    db.flush, db.rollback, db.execute = AsyncMock(), AsyncMock(), AsyncMock()
+    db.commit = AsyncMock(side_effect=commit_error)
+    return db
+
+
+def _save(db: MagicMock, names, write, remove):
+    uploads = [(name, IngestStream.from_bytes(name.encode())) for name in names]
+    return asyncio.run(batch_ingest.save_batch(
+        db, uploads, "file", location=lambda name: f"/store/{name}", blob_location=None, write=write, remove=remove
+    ))
+
+
+def test_save_batch_reports_failed_writes_per_file_and_commits_once():
+    # Arrange
+    db = _session()
+
+    async def write(path, stream):
+        async for _ in stream:
+            pass
+        if path.endswith("bad"):
+            raise OSError("disk full")
+
+    remove = AsyncMock()
+
+    # Act
+    results = _save(db, ["a", "bad", "c", "a"], write, remove)
+
+    # Assert
+    assert [type(result) for result in results] == [Item, HTTPException, Item, HTTPException]
+    assert (results[1].status_code, results[3].status_code) == (500, 400)
+    assert [item.path_or_key for item in db.add_all.call_args[0][0]] == ["/store/a", "/store/c"]
+    db.commit.assert_awaited_once()
+    remove.assert_not_awaited()
+
+
+def test_save_batch_removes_written_payloads_if_the_transaction_fails():
+    # Arrange
+    db = _session(commit_error=RuntimeError("connection lost"))
+    remove = AsyncMock()
+
+    # Act
+    results = _save(db, ["a", "b"], AsyncMock(), remove)
+
+    # Assert
+    assert all(isinstance(result, HTTPException) and result.status_code == 500 for result in results)
+    db.rollback.assert_awaited_once()
+    assert sorted(call.args[0] for call in remove.await_args_list) == ["/store/a", "/store/b"]
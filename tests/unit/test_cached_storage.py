@@ -0,0 +1,68 @@
+import asyncio
+
+from app.storage_backends.base_interface import StoredObject
+from app.storage_backends.cached_storage import CachedStorage
+from app.storage_backends.object_cache import ObjectCache
+
+
+class FakeBackend:
+    """Minimal backend serving one payload and recording deletions."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.reads = 0
+        self.deleted = []
+
+    async def iter_chunks(self, obj, offset=0, length=None, chunk_size=100):
+        self.reads += 1
+        end = len(self.data) if length is None else offset + length
+        for start in range(offset, end, chunk_size):
+            await asyncio.sleep(0)
+            yield self.data[start:min(start + chunk_size, end)]
+
+    async def delete_file(self, db, item_id):
+        self.deleted.append(item_id)
+
+
+DATA = bytes(range(256)) * 4
+OBJ = StoredObject(1, "model.glb", "items/1_model.glb", len(DATA))
+
+
+async def _read(storage, obj):
+    return b"".join([chunk async for chunk in storage.iter_chunks(obj, chunk_size=100)])
+
+
+def test_fill_streaming_during_deletion_is_not_cached():
+    # Arrange
+    backend = FakeBackend(DATA)
+    storage = CachedStorage(backend, ObjectCache(max_bytes=10000))
+
+    async def run():
+        stream = storage.iter_chunks(OBJ, chunk_size=100)
+        first = await stream.__anext__()
+        await storage.delete_file(None, 1)
+        return first + b"".join([chunk async for chunk in stream])
+
+    # Act
+    data = asyncio.run(run())
+
+    # Assert
+    assert data == DATA
+    assert backend.deleted == [1]
+    assert 1 not in storage.cache
+
+
+def test_changes_published_by_other_workers_invalidate_entries():
+    # Arrange
+    backend = FakeBackend(DATA)
+    storage = CachedStorage(backend, ObjectCache(max_bytes=10000))
+    asyncio.run(_read(storage, OBJ))
+    assert 1 in storage.cache
+
+    # Act
+    storage.changes._notified(None, 0, "item_changes", "update:1")
+
+    # Assert
+    assert 1 not in storage.cache
+    assert asyncio.run(_read(storage, OBJ)) == DATA
+    assert backend.reads == 2
@@ -0,0 +1,29 @@
+from app.routes.conditional import entity_tag, not_modified, range_applies
+from app.storage_backends.base_interface import StoredObject
+
+
+def test_entity_tag_is_quoted_content_hash():
+    obj = StoredObject(1, "model.glb", None, 10, "ab" * 32)
+
+    assert entity_tag(obj) == f'"{"ab" * 32}"'
+    assert entity_tag(StoredObject(1, "model.glb", None, 10)) is None
+
+
+def test_if_none_match_uses_weak_comparison():
+    # Arrange
+    etag = '"abc"'
+
+    # Act / Assert
+    assert not_modified('"xyz", W/"abc"', etag)
+    assert not_modified("*", etag)
+    assert not not_modified('"xyz"', etag)
+    assert not not_modified(None, etag)
+
+
+def test_if_range_requires_strong_match():
+    etag = '"abc"'
+
+    assert range_applies(None, etag)
+    assert range_applies('"abc"', etag)
+    assert not range_applies('W/"abc"', etag)
+    assert not range_applies("Wed, 21 Oct 2015 07:28:00 GMT", etag)
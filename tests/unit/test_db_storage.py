@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models import Base, Item, ItemChunk
+from app.storage_backends import db_storage
+from app.storage_backends.base_interface import StoredObject
+from app.storage_backends.db_storage import CHUNKED_LOCATION, DBStorage
+from app.storage_backends.streaming import CHUNK_SIZE, IngestStream
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Binds DBStorage to a fresh SQLite database; returns its engine and session factory."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'storage.db'}")
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    monkeypatch.setattr(db_storage, "SessionLocal", sessions)
+    yield engine, sessions
+    asyncio.run(engine.dispose())
+
+
+def test_paused_stream_holds_no_connection(database):
+    # Arrange
+    engine, sessions = database
+    data = bytes(range(256)) * 64
+
+    async def scenario():
+        async with sessions() as db:
+            item = Item(name="a.bin", filename="a.bin", storage_type="db", content=data, size_bytes=len(data))
+            db.add(item)
+            await db.commit()
+        obj = StoredObject(item.id, "a.bin", None, len(data))
+        chunks = DBStorage().iter_chunks(obj, chunk_size=4096)
+
+        # Act
+        first = await chunks.__anext__()
+        checked_out = engine.sync_engine.pool.checkedout()
+        rest = b"".join([chunk async for chunk in chunks])
+        return first, checked_out, rest
+
+    first, checked_out, rest = asyncio.run(scenario())
+
+    # Assert
+    assert checked_out == 0
+    assert first + rest == data
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _rows(sessions, item_id):
+    async with sessions() as db:
+        stmt = select(ItemChunk.seq, func.length(ItemChunk.data)).where(ItemChunk.item_id == item_id)
+        return (await db.execute(stmt.order_by(ItemChunk.seq))).all()
+
+
+async def _read(obj, offset=0, length=None, chunk_size=CHUNK_SIZE):
+    return b"".join([chunk async for chunk in DBStorage().iter_chunks(obj, offset, length, chunk_size)])
+
+
+def test_chunked_layout_splits_uploads_into_rows(database, monkeypatch):
+    # Arrange
+    _, sessions = database
+    monkeypatch.setattr(db_storage, "CONTENT_CHUNK_SIZE", 1000)
+    data = bytes(range(250)) * 10
+
+    async def scenario():
+        async with sessions() as db:
+            # Upload chunks not aligned with the rows
+            item = await DBStorage(layout="chunks").save_stream(db, "a.bin", IngestStream(_chunks(data, 300)))
+            return item, await _rows(sessions, item.id)
+
+    # Act
+    item, rows = asyncio.run(scenario())
+
+    # Assert
+    assert (item.path_or_key, item.size_bytes) == (CHUNKED_LOCATION, len(data))
+    assert rows == [(0, 1000), (1, 1000), (2, 500)]
+
+
+@pytest.mark.parametrize("offset, length", [
+    (0, None),  # whole content
+    (999, 2),  # last byte of a row and first of the next
+    (1000, 1000),  # exactly one row
+    (500, 1800),  # spans three rows
+    (2400, None),  # tail of the last row
+    (2000, 10000),  # length past the end
+])
+def test_chunked_ranges_are_read_across_rows(database, monkeypatch, offset, length):
+    # Arrange
+    _, sessions = database
+    monkeypatch.setattr(db_storage, "CONTENT_CHUNK_SIZE", 1000)
+    data = bytes(range(250)) * 10
+
+    async def scenario():
+        async with sessions() as db:
+            item = await DBStorage(layout="chunks").save_stream(db, "a.bin", IngestStream(_chunks(data, 300)))
+        obj = StoredObject(item.id, "a.bin", CHUNKED_LOCATION, len(data))
+
+        # Act: slices smaller than, and larger than, a row
+        return await _read(obj, offset, length, chunk_size=400), await _read(obj, offset, length, chunk_size=4096)
+
+    small, large = asyncio.run(scenario())
+
+    # Assert
+    expected = data[offset:] if length is None else data[offset:offset + length]
+    assert small == large == expected
+
+
+def test_chunked_batch_stores_each_upload_in_rows(database, monkeypatch):
+    # Arrange
+    _, sessions = database
+    monkeypatch.setattr(db_storage, "CONTENT_CHUNK_SIZE", 1000)
+    payloads = [b"a" * 2000, b"b" * 10, b""]
+
+    async def scenario():
+        async with sessions() as db:
+            items = await DBStorage(layout="chunks").save_batch(
+                db, [(f"{i}.bin", IngestStream(_chunks(data, 300))) for i, data in enumerate(payloads)]
+            )
+        rows = [await _rows(sessions, item.id) for item in items]
+        contents = []
+        for item in items:
+            async with sessions() as db:
+                contents.append(await DBStorage().load_file(db, item.id))
+        return items, rows, contents
+
+    # Act
+    items, rows, contents = asyncio.run(scenario())
+
+    # Assert
+    assert [(item.path_or_key, item.size_bytes) for item in items] == [(CHUNKED_LOCATION, len(p)) for p in payloads]
+    assert rows == [[(0, 1000), (1, 1000)], [(0, 10)], []]
+    assert contents == payloads
@@ -0,0 +1,58 @@
+from app.storage_backends.disk_cache import DiskCache
+
+
+def _fill(cache: DiskCache, key: int, payload: bytes) -> bool:
+    f, temp_path, started = cache.create_temp()
+    with f:
+        f.write(payload)
+    return cache.commit(key, temp_path, started, f"{key}.gltf", f"key-{key}", len(payload))
+
+
+def test_entries_survive_restart(tmp_path):
+    # Arrange
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    _fill(cache, 1, b"a" * 100)
+
+    # Act
+    reopened = DiskCache(str(tmp_path), max_bytes=1000)
+    mapped = reopened.open(1)
+
+    # Assert
+    assert reopened.lookup(1) == ("1.gltf", "key-1", 100, None)
+    assert mapped[:] == b"a" * 100
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    # Arrange
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    _fill(cache, 1, b"a" * 100)
+    _fill(cache, 2, b"b" * 100)
+
+    # Act
+    _fill(cache, 3, b"c" * 100)
+
+    # Assert
+    assert cache.lookup(1) is None
+    assert cache.lookup(2) is not None and cache.lookup(3) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.open(1) is None
+
+
+def test_invalidation_is_visible_to_other_processes_and_blocks_racing_fill(tmp_path):
+    # Arrange: two handles on one directory stand in for two workers
+    worker_a = DiskCache(str(tmp_path), max_bytes=1000)
+    worker_b = DiskCache(str(tmp_path), max_bytes=1000)
+    _fill(worker_a, 1, b"a" * 10)
+    f, temp_path, started = worker_b.create_temp()
+    with f:
+        f.write(b"b" * 10)
+
+    # Act
+    worker_a.invalidate(2)
+    worker_a.invalidate(1)
+    committed = worker_b.commit(2, temp_path, started, "2.gltf", None, 10)
+
+    # Assert
+    assert worker_b.lookup(1) is None
+    assert not committed
+    assert worker_b.lookup(2) is None
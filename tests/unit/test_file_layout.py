@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from app.storage_backends.file_layout import FileLayout, temp_path, unique_name
+
+
+def test_path_fans_out_by_name_hash():
+    layout = FileLayout("/data", levels=2, width=2)
+
+    path = layout.path("model.glb")
+
+    parts = os.path.relpath(path, "/data").split(os.sep)
+    assert len(parts) == 3
+    assert all(len(part) == 2 for part in parts[:2])
+    assert parts[2] == "model.glb"
+    assert layout.path("model.glb") == path
+
+
+def test_names_spread_over_directories():
+    layout = FileLayout("/data", levels=1, width=1)
+
+    directories = {os.path.dirname(layout.path(f"{i}.glb")) for i in range(200)}
+
+    assert len(directories) == 16
+
+
+def test_zero_levels_is_flat():
+    assert FileLayout("/data", levels=0).path("a.glb") == os.path.join("/data", "a.glb")
+
+
+def test_placed_recognises_layout_paths_only():
+    layout = FileLayout("/data")
+
+    assert layout.placed(layout.path("a.glb"))
+    assert not layout.placed(os.path.join("/data", "a.glb"))
+
+
+def test_rejects_unsupported_fanout():
+    with pytest.raises(ValueError):
+        FileLayout("/data", levels=2, width=5)
+
+
+def test_unique_names_keep_the_filename():
+    first, second = unique_name("dir/model.glb"), unique_name("model.glb")
+
+    assert first != second
+    assert first.endswith("_model.glb") and "/" not in first
+    assert temp_path("/data/x") != temp_path("/data/x")
@@ -0,0 +1,70 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+from pygltflib import GLTF2
+
+from app.services.gltf_compaction import QUANTIZATION_EXTENSION, compact_gltf, read_accessor
+
+
+def _model(positions: np.ndarray, indices: np.ndarray) -> bytes:
+    unused = np.zeros(4, dtype=np.float32)
+    payload = positions.tobytes() + indices.tobytes() + unused.tobytes()
+    return json.dumps({
+        "asset": {"version": "2.0"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0}, "indices": 1}]}],
+        "buffers": [{
+            "byteLength": len(payload),
+            "uri": "data:application/octet-stream;base64," + base64.b64encode(payload).decode(),
+        }],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": positions.nbytes},
+            {"buffer": 0, "byteOffset": positions.nbytes, "byteLength": indices.nbytes},
+            {"buffer": 0, "byteOffset": positions.nbytes + indices.nbytes, "byteLength": unused.nbytes},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": len(positions), "type": "VEC3",
+             "min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist()},
+            {"bufferView": 1, "componentType": 5125, "count": len(indices), "type": "SCALAR"},
+            {"bufferView": 2, "componentType": 5126, "count": 4, "type": "SCALAR"},
+        ],
+    }).encode()
+
+
+def test_compact_gltf_quantizes_narrows_and_strips():
+    # Arrange
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-5, 5, (300, 3)).astype(np.float32)
+    indices = rng.integers(0, 300, 900).astype(np.uint32)
+
+    # Act
+    chunks, report = compact_gltf(_model(positions, indices))
+
+    # Assert
+    compact = GLTF2.load_from_bytes(b"".join(chunks))
+    buffers = [compact.binary_blob()]
+    primitive = compact.meshes[0].primitives[0]
+    quantized = read_accessor(compact, buffers, primitive.attributes.POSITION).astype(np.float64)
+    child = compact.nodes[compact.nodes[0].children[0]]
+    restored = quantized * child.scale + child.translation
+    assert QUANTIZATION_EXTENSION in compact.extensionsRequired
+    assert np.abs(restored - positions).max() < 1e-3
+    assert compact.accessors[primitive.indices].componentType == 5123
+    assert np.array_equal(read_accessor(compact, buffers, primitive.indices).ravel(), indices)
+    assert len(compact.accessors) == 2
+    assert (report["quantized_positions"], report["narrowed_indices"], report["removed_accessors"]) == (1, 1, 1)
+
+
+def test_compact_gltf_rejects_extensions_referring_to_accessors():
+    # Arrange: instancing attributes are accessors repacking would drop
+    model = json.loads(_model(np.zeros((3, 3), dtype=np.float32), np.arange(3, dtype=np.uint32)))
+    model["extensionsUsed"] = ["EXT_mesh_gpu_instancing"]
+    model["nodes"][0]["extensions"] = {"EXT_mesh_gpu_instancing": {"attributes": {"TRANSLATION": 2}}}
+
+    # Act / Assert
+    with pytest.raises(ValueError, match="EXT_mesh_gpu_instancing"):
+        compact_gltf(json.dumps(model).encode())
@@ -0,0 +1,41 @@
+import base64
+import json
+
+import pytest
+from pygltflib import GLTF2
+
+from app.services.gltf_conversion import gltf_to_glb
+
+
+def _embedded(payload: bytes) -> dict:
+    return {"byteLength": len(payload), "uri": "data:application/octet-stream;base64," + base64.b64encode(payload).decode()}
+
+
+def test_gltf_to_glb_packs_all_buffers_and_rebases_views():
+    # Arrange
+    first, second = b"\x01" * 10, b"xyz"
+    model = {
+        "asset": {"version": "2.0"},
+        "buffers": [_embedded(first), _embedded(second)],
+        "bufferViews": [{"buffer": 1, "byteOffset": 1, "byteLength": 2}],
+    }
+
+    # Act
+    glb = b"".join(gltf_to_glb(json.dumps(model).encode()))
+
+    # Assert
+    converted = GLTF2.load_from_bytes(glb)
+    blob = converted.binary_blob()
+    view = converted.bufferViews[0]
+    assert len(glb) % 4 == 0
+    assert blob[:10] == first
+    assert (view.buffer, blob[view.byteOffset:view.byteOffset + view.byteLength]) == (0, b"yz")
+
+
+def test_gltf_to_glb_rejects_external_buffers():
+    # Arrange
+    model = {"asset": {"version": "2.0"}, "buffers": [{"byteLength": 4, "uri": "mesh.bin"}]}
+
+    # Act / Assert
+    with pytest.raises(ValueError):
+        gltf_to_glb(json.dumps(model).encode())
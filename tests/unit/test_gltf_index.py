@@ -0,0 +1,74 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from app.services import gltf_index
+from app.services.gltf_conversion import gltf_to_glb
+from app.services.gltf_index import GltfIndexer, index_glb
+from app.storage_backends.base_interface import StoredObject
+
+
+def test_index_glb_locates_json_buffers_and_views():
+    # Arrange
+    payload = bytes(range(16))
+    model = {
+        "asset": {"version": "2.0"},
+        "buffers": [{
+            "byteLength": len(payload),
+            "uri": "data:application/octet-stream;base64," + base64.b64encode(payload).decode(),
+        }],
+        "bufferViews": [{"buffer": 0, "byteOffset": 4, "byteLength": 8}, {"buffer": 0, "byteLength": 4}],
+    }
+    glb = b"".join(gltf_to_glb(json.dumps(model).encode()))
+
+    # Act
+    index = index_glb(glb, len(glb))
+
+    # Assert
+    offset, length = index["json_offset"], index["json_length"]
+    assert json.loads(glb[offset:offset + length])["asset"]["version"] == "2.0"
+    (buffer_offset, buffer_length), = index["buffers"]
+    assert glb[buffer_offset:buffer_offset + buffer_length] == payload
+    assert [glb[start:start + size] for start, size in index["buffer_views"]] == [payload[4:12], payload[:4]]
+
+
+def test_index_glb_rejects_json_gltf():
+    # Act / Assert
+    with pytest.raises(ValueError):
+        index_glb(b'{"asset": {"version": "2.0"}}', 29)
+
+
+class FakeStorage:
+    """Serves the same content for every handle and counts reads."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.reads = 0
+
+    async def iter_chunks(self, obj, offset=0, length=None):
+        self.reads += 1
+        yield self.data[offset:None if length is None else offset + length]
+
+
+def test_failed_index_builds_are_retried_after_a_while(monkeypatch):
+    # Arrange: an item that is not a GLB file despite its name
+    storage = FakeStorage(b"not a glb file at all")
+    indexer = GltfIndexer(storage, glb_converter=None)
+    obj = StoredObject(1, "model.glb", "/data/model.glb", len(storage.data))
+
+    async def scenario():
+        built = await indexer._schedule(obj)
+        # Act: looked up again within the retry window
+        found = await indexer.lookup(obj)
+        return built, found
+
+    built, found = asyncio.run(scenario())
+
+    # Assert
+    assert built is None and found == (None, None)
+    assert storage.reads == 1
+    assert indexer.stats()["failed"] == 1
+    monkeypatch.setattr(gltf_index, "RETRY_FAILED_AFTER", 0)
+    assert not indexer._failed_recently(1)
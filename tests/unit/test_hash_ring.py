@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from app.storage_backends.file_layout import ITEMS, FilePlacement, is_blob
+from app.storage_backends.hash_ring import HashRing
+
+KEYS = [f"{i}_model.glb" for i in range(20000)]
+
+
+def test_keys_spread_by_weight():
+    ring = HashRing({"a": 1, "b": 1, "c": 2})
+
+    counts = {"a": 0, "b": 0, "c": 0}
+    for key in KEYS:
+        counts[ring.node(key)] += 1
+
+    assert counts["c"] / len(KEYS) == pytest.approx(0.5, abs=0.05)
+    assert counts["a"] / len(KEYS) == pytest.approx(0.25, abs=0.05)
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before = HashRing({"a": 1, "b": 1, "c": 1})
+    after = HashRing({"a": 1, "b": 1, "c": 1, "d": 1})
+
+    moved = [key for key in KEYS if before.node(key) != after.node(key)]
+
+    assert all(after.node(key) == "d" for key in moved)
+    assert len(moved) / len(KEYS) == pytest.approx(0.25, abs=0.05)
+
+
+def test_rejects_empty_ring_and_bad_weights():
+    with pytest.raises(ValueError):
+        HashRing({})
+    with pytest.raises(ValueError):
+        HashRing({"a": 0})
+
+
+def test_placement_puts_kinds_below_their_volume():
+    placement = FilePlacement({"/mnt/a/": 1, "/mnt/b": 1}, levels=1, width=2)
+
+    path = placement.path(ITEMS, "x_model.glb")
+
+    root = placement.volume(path)
+    assert root in ("/mnt/a", "/mnt/b")
+    assert path.startswith(os.path.join(root, ITEMS, ""))
+    assert placement.placed(ITEMS, path)
+    assert placement.volume("/tmp/elsewhere/x") is None
+
+
+def test_is_blob_matches_blob_paths_only():
+    assert is_blob("/mnt/a/blobs/ab/cd/" + "f" * 64, "f" * 64)
+    assert not is_blob("/mnt/a/items/ab/cd/" + "f" * 64, "f" * 64)
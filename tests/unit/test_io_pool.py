@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+from app.storage_backends.io_pool import IOPool
+
+
+def test_run_returns_result_and_records_latency():
+    # Arrange
+    pool = IOPool(max_workers=2, max_queue=2)
+
+    # Act
+    result = asyncio.run(pool.run("add", lambda a, b: a + b, 1, 2))
+
+    # Assert
+    assert result == 3
+    assert pool.stats()["ops"]["add"]["count"] == 1
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_callers_wait_when_queue_is_full():
+    # Arrange: one worker, no queue, and a call blocking the worker
+    pool = IOPool(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run("block", release.wait))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(pool.run("noop", lambda: None))
+        await asyncio.sleep(0.05)
+        stats = pool.stats()
+        release.set()
+        await asyncio.gather(first, second)
+        return stats
+
+    # Act
+    stats = asyncio.run(scenario())
+
+    # Assert
+    assert stats["in_flight"] == 1
+    assert stats["waiting"] == 1
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_call_returns():
+    # Arrange: one worker, no queue
+    pool = IOPool(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run("block", release.wait))
+        await asyncio.sleep(0.05)
+
+        # Act: the caller gives up while its call still occupies the thread
+        first.cancel()
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(pool.run("noop", lambda: None))
+        await asyncio.sleep(0.05)
+        stats = pool.stats()
+        release.set()
+        await second
+        return stats, pool.stats()
+
+    during, after = asyncio.run(scenario())
+
+    # Assert
+    assert (during["in_flight"], during["queued"], during["waiting"]) == (1, 0, 1)
+    assert (after["in_flight"], after["queued"], after["waiting"]) == (0, 0, 0)
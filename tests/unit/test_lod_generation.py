@@ -0,0 +1,77 @@
+import base64
+import json
+
+import numpy as np
+from pygltflib import GLTF2
+
+from app.services.gltf_compaction import read_accessor
+from app.services.lod_generation import simplify_gltf
+
+
+def _grid_model(size: int) -> bytes:
+    xs, ys = np.meshgrid(np.linspace(0, 1, size), np.linspace(0, 1, size))
+    positions = np.stack([xs.ravel(), ys.ravel(), np.zeros(size * size)], axis=1).astype(np.float32)
+    corners = (np.arange(size - 1)[None, :] + size * np.arange(size - 1)[:, None]).ravel()
+    indices = np.concatenate([
+        np.stack([corners, corners + 1, corners + size], axis=1),
+        np.stack([corners + 1, corners + size + 1, corners + size], axis=1),
+    ]).astype(np.uint32).ravel()
+    payload = positions.tobytes() + indices.tobytes()
+    return json.dumps({
+        "asset": {"version": "2.0"},
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0}, "indices": 1}]}],
+        "buffers": [{
+            "byteLength": len(payload),
+            "uri": "data:application/octet-stream;base64," + base64.b64encode(payload).decode(),
+        }],
+        "bufferViews": [
+            {"buffer": 0, "byteLength": positions.nbytes},
+            {"buffer": 0, "byteOffset": positions.nbytes, "byteLength": indices.nbytes},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": len(positions), "type": "VEC3",
+             "min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist()},
+            {"bufferView": 1, "componentType": 5125, "count": len(indices), "type": "SCALAR"},
+        ],
+    }).encode()
+
+
+def test_simplify_gltf_clusters_vertices_and_drops_collapsed_triangles():
+    # Arrange
+    model = _grid_model(41)
+
+    # Act
+    chunks, report = simplify_gltf(model, grid=8)
+
+    # Assert
+    lod = GLTF2.load_from_bytes(b"".join(chunks))
+    buffers = [lod.binary_blob()]
+    primitive = lod.meshes[0].primitives[0]
+    positions = read_accessor(lod, buffers, primitive.attributes.POSITION)
+    triangles = read_accessor(lod, buffers, primitive.indices).reshape(-1, 3)
+    assert (report["vertices"], report["triangles"]) == (41 * 41, 2 * 40 * 40)
+    assert report["lod_vertices"] == len(positions) <= 9 * 9
+    assert report["lod_triangles"] == len(triangles) < 2 * 9 * 9
+    assert triangles.max() < len(positions)
+    assert np.all(triangles[:, 0] != triangles[:, 1])
+    assert positions.min() >= 0 and positions.max() <= 1
+
+
+def test_simplify_gltf_removes_primitives_and_meshes_without_triangles():
+    # Arrange: a triangle mesh collapsing to one vertex, and a mesh of lines left as is
+    model = json.loads(_grid_model(5))
+    model["accessors"].append(dict(model["accessors"][0]))
+    model["meshes"].append({"primitives": [{"attributes": {"POSITION": 2}, "mode": 1}]})
+    model["nodes"] = [{"mesh": 0}, {"mesh": 1}]
+    model["scenes"] = [{"nodes": [0, 1]}]
+
+    # Act
+    chunks, report = simplify_gltf(json.dumps(model).encode(), grid=1)
+
+    # Assert
+    lod = GLTF2.load_from_bytes(b"".join(chunks))
+    assert report["removed_primitives"] == 1
+    assert len(lod.meshes) == 1 and lod.meshes[0].primitives[0].mode == 1
+    assert [node.mesh for node in lod.nodes] == [None, 0]
+    assert all(accessor.count >= 1 for accessor in lod.accessors)
+    assert all(view.byteLength >= 1 for view in lod.bufferViews)
@@ -0,0 +1,74 @@
+import asyncio
+
+from app.storage_backends import metadata_index
+from app.storage_backends.base_interface import StoredObject
+from app.storage_backends.metadata_index import MetadataIndex
+
+
+def test_index_hit_and_miss_counters():
+    # Arrange
+    index = MetadataIndex()
+    obj = StoredObject(1, "model.glb", "/tmp/model.glb", 10)
+
+    # Act
+    first = index.get(1)
+    index.put(obj)
+    second = index.get(1)
+
+    # Assert
+    assert first is None
+    assert second is obj
+    assert index.stats()["hits"] == 1
+    assert index.stats()["misses"] == 1
+
+
+def test_fill_racing_with_delete_is_dropped():
+    # Arrange: a lookup misses and starts resolving the item
+    index = MetadataIndex()
+    generation = index.generation
+
+    # Act: the item is deleted before the lookup completes
+    index.discard(1)
+    filled = index.put(StoredObject(1, "model.glb", None, 10), generation)
+
+    # Assert
+    assert not filled
+    assert index.get(1) is None
+    assert len(index) == 0
+
+
+def test_lost_listen_connection_is_reestablished_and_the_index_reloaded(monkeypatch):
+    # Arrange: an index listening, with an entry deleted elsewhere while the connection was down
+    monkeypatch.setattr(metadata_index, "RECONNECT_DELAY", 0)
+    index = MetadataIndex()
+    index.put(StoredObject(1, "deleted.glb", None, 10))
+    attempts = []
+
+    async def connect():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise OSError("connection refused")
+        index.changes._connection = object()
+
+    async def load():
+        index.put(StoredObject(2, "model.glb", None, 10), index.generation)
+
+    monkeypatch.setattr(index.changes, "_connect", connect)
+    monkeypatch.setattr(index, "load", load)
+    index.changes._connection = object()
+
+    async def scenario():
+        # Act
+        index.changes._terminated(None)
+        listening = index.stats()["listening"]
+        await index.changes._reconnecting
+        return listening
+
+    listening_while_lost = asyncio.run(scenario())
+
+    # Assert
+    assert not listening_while_lost
+    assert index.stats()["listening"]
+    assert len(attempts) == 2
+    assert index.get(1) is None
+    assert index.get(2).filename == "model.glb"
@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.storage_backends.minio_storage import MinioStorage
+from app.storage_backends.streaming import IngestStream
+
+MiB = 1024 * 1024
+PART_SIZE = 5 * MiB
+
+
+class FakeMultipartClient:
+    """Records the requests put_object sends instead of sending them."""
+
+    def __init__(self, storage: MinioStorage):
+        self.single_puts = []
+        self.parts = []
+        self.completed = []
+        self.aborted = []
+        client = storage.client
+        client._put_object = lambda bucket, key, data, headers: self.single_puts.append(len(data))
+        client._create_multipart_upload = lambda bucket, key, headers: "upload-1"
+        client._upload_part = self._upload_part
+        client._complete_multipart_upload = self._complete
+        client._abort_multipart_upload = lambda bucket, key, upload_id: self.aborted.append(upload_id)
+
+    def _upload_part(self, bucket, key, data, headers, upload_id, part_number):
+        self.parts.append(len(data))
+        return f"etag-{part_number}"
+
+    def _complete(self, bucket, key, upload_id, parts, sse=None):
+        self.completed.append((upload_id, len(parts)))
+        return SimpleNamespace(
+            bucket_name=bucket, object_name=key, version_id=None, etag="etag", http_headers={}, location=None
+        )
+
+
+def _storage() -> MinioStorage:
+    return MinioStorage("localhost:9000", "minio", "minio123", "3d-files", part_size=PART_SIZE)
+
+
+async def _chunks(total: int, fail_after: int = None):
+    sent = 0
+    while sent < total:
+        if fail_after is not None and sent >= fail_after:
+            raise IOError("client disconnected")
+        chunk = b"x" * min(MiB, total - sent)
+        sent += len(chunk)
+        yield chunk
+
+
+@pytest.mark.parametrize("declared", [True, False])
+def test_large_upload_is_sent_in_parts_of_bounded_size(declared):
+    # Arrange
+    storage = _storage()
+    fake = FakeMultipartClient(storage)
+    total = 12 * MiB + 123
+    stream = IngestStream(_chunks(total), total if declared else None)
+
+    # Act
+    asyncio.run(storage._put("model.glb", stream))
+
+    # Assert: never more than one part buffered, all parts sent and the upload completed
+    assert max(fake.parts) <= PART_SIZE
+    assert sum(fake.parts) == total
+    assert fake.completed == [("upload-1", len(fake.parts))]
+    assert fake.aborted == []
+
+
+def test_small_upload_is_a_single_put():
+    storage = _storage()
+    fake = FakeMultipartClient(storage)
+
+    asyncio.run(storage._put("model.glb", IngestStream(_chunks(2 * MiB), 2 * MiB)))
+
+    assert fake.single_puts == [2 * MiB]
+    assert fake.parts == []
+
+
+def test_failed_upload_aborts_the_multipart_upload():
+    storage = _storage()
+    fake = FakeMultipartClient(storage)
+    stream = IngestStream(_chunks(20 * MiB, fail_after=7 * MiB))
+
+    with pytest.raises(IOError):
+        asyncio.run(storage._put("model.glb", stream))
+
+    assert fake.aborted == ["upload-1"]
+    assert fake.completed == []
@@ -0,0 +1,64 @@
+import asyncio
+import gzip
+
+from app.routes.negotiation import accepted_encodings, prefers_media_type
+from app.services.precompression import Precompressor
+
+
+def test_accepted_encodings_orders_by_weight_then_server_preference():
+    # Arrange
+    offered = ["br", "zstd", "gzip"]
+
+    # Act
+    ranked = accepted_encodings("gzip, zstd;q=0.5, br", offered)
+
+    # Assert
+    assert ranked == ["br", "gzip", "zstd"]
+
+
+def test_accepted_encodings_honours_wildcard_and_refusals():
+    # Arrange
+    offered = ["br", "gzip"]
+
+    # Act
+    wildcard = accepted_encodings("*;q=0.2, br;q=0", offered)
+    missing = accepted_encodings(None, offered)
+
+    # Assert
+    assert wildcard == ["gzip"]
+    assert missing == []
+
+
+def test_precompressor_streams_valid_gzip():
+    # Arrange
+    data = b'{"buffers":[{"uri":"data:application/octet-stream;base64,AAAA"}]}' * 2000
+    precompressor = Precompressor(storage=None, encodings=["gzip"])
+
+    async def source():
+        for offset in range(0, len(data), 4096):
+            yield data[offset:offset + 4096]
+
+    async def act():
+        return b"".join([chunk async for chunk in precompressor._compress(source(), "gzip")])
+
+    # Act
+    compressed = asyncio.run(act())
+
+    # Assert
+    assert gzip.decompress(compressed) == data
+    assert len(compressed) < len(data) // 10
+
+
+def test_prefers_media_type_requires_explicit_preference():
+    # Arrange
+    glb, gltf = "model/gltf-binary", "model/gltf+json"
+
+    # Act
+    explicit = prefers_media_type("model/gltf-binary, model/gltf+json;q=0.5", glb, gltf)
+    outweighed = prefers_media_type("model/gltf-binary;q=0.5, model/gltf+json", glb, gltf)
+    wildcard = prefers_media_type("*/*", glb, gltf)
+
+    # Assert
+    assert explicit
+    assert not outweighed
+    assert not wildcard
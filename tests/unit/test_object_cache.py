@@ -0,0 +1,71 @@
+from app.storage_backends.object_cache import ObjectCache
+
+
+def test_cache_hit_and_miss_counters():
+    # Arrange
+    cache = ObjectCache(max_bytes=100)
+
+    # Act
+    first = cache.get(1)
+    cache.put(1, "meta", b"x" * 10)
+    second = cache.get(1)
+
+    # Assert
+    assert first is None
+    assert second == ("meta", b"x" * 10)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_rejects_oversized_objects():
+    cache = ObjectCache(max_bytes=100, max_object_bytes=50)
+
+    assert not cache.put(1, None, b"x" * 51)
+    assert 1 not in cache
+    assert cache.stats()["rejections"] == 1
+
+
+def test_cold_object_cannot_flush_hot_set():
+    # Arrange: two hot entries filling the budget
+    cache = ObjectCache(max_bytes=100)
+    for key in (1, 2):
+        for _ in range(5):
+            cache.get(key)
+        cache.put(key, None, b"x" * 50)
+
+    # Act: a large object seen once competes for space
+    cache.get(3)
+    admitted = cache.put(3, None, b"y" * 60)
+
+    # Assert
+    assert not admitted
+    assert 1 in cache and 2 in cache
+
+
+def test_hotter_object_evicts_lru_entry():
+    # Arrange
+    cache = ObjectCache(max_bytes=100)
+    for key in (1, 2):
+        cache.get(key)
+        cache.put(key, None, b"x" * 50)
+
+    # Act
+    for _ in range(3):
+        cache.get(3)
+    admitted = cache.put(3, None, b"y" * 50)
+
+    # Assert
+    assert admitted
+    assert 1 not in cache and 2 in cache and 3 in cache
+    assert cache.stats()["evictions"] == 1
+    assert cache.size == 100
+
+
+def test_invalidate_releases_bytes():
+    cache = ObjectCache(max_bytes=100)
+    cache.put(1, None, b"x" * 40)
+
+    cache.invalidate(1)
+
+    assert 1 not in cache
+    assert cache.size == 0
@@ -0,0 +1,28 @@
+from app.storage_backends.base_interface import StoredObject
+from app.storage_backends.minio_storage import MinioStorage
+
+
+def _storage(presign_ttl: int) -> MinioStorage:
+    return MinioStorage("localhost:9000", "minio", "minio123", "3d-files", presign_ttl=presign_ttl)
+
+
+def test_presigned_url_is_reused_while_fresh():
+    # Arrange
+    storage = _storage(presign_ttl=300)
+    obj = StoredObject(1, "model.glb", "model.glb", 10)
+
+    # Act
+    first = storage.redirect_url(obj)
+    second = storage.redirect_url(obj)
+
+    # Assert
+    assert first == second
+    assert "X-Amz-Signature" in first
+    assert storage.stats()["minio"]["urls_signed"] == 1
+    assert storage.stats()["minio"]["urls_reused"] == 1
+
+
+def test_redirects_disabled_without_ttl():
+    storage = _storage(presign_ttl=0)
+
+    assert storage.redirect_url(StoredObject(1, "model.glb", "model.glb", 10)) is None
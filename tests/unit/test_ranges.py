@@ -0,0 +1,35 @@
+import pytest
+from fastapi import HTTPException
+
+from app.routes.ranges import parse_range_header, MAX_RANGES
+
+
+def test_parse_single_and_open_ranges():
+    assert parse_range_header("bytes=0-99", 1000) == [(0, 99)]
+    assert parse_range_header("bytes=900-", 1000) == [(900, 999)]
+    assert parse_range_header("bytes=-100", 1000) == [(900, 999)]
+    assert parse_range_header("bytes=990-2000", 1000) == [(990, 999)]
+
+
+def test_parse_coalesces_overlapping_ranges():
+    assert parse_range_header("bytes=10-19, 0-1, 5-12, 20-21", 1000) == [(0, 1), (5, 21)]
+
+
+def test_parse_ignores_malformed_headers():
+    assert parse_range_header("items=0-1", 1000) == []
+    assert parse_range_header("bytes=abc", 1000) == []
+    assert parse_range_header("bytes=10-5", 1000) == []
+    assert parse_range_header("bytes=", 1000) == []
+
+
+def test_parse_ignores_too_many_ranges():
+    header = "bytes=" + ",".join(f"{i * 10}-{i * 10}" for i in range(MAX_RANGES + 1))
+    assert parse_range_header(header, 100000) == []
+
+
+def test_parse_unsatisfiable_range():
+    with pytest.raises(HTTPException) as exc_info:
+        parse_range_header("bytes=1000-", 1000)
+
+    assert exc_info.value.status_code == 416
+    assert exc_info.value.headers["Content-Range"] == "bytes */1000"
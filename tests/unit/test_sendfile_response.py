@@ -0,0 +1,86 @@
+import asyncio
+import os
+from email import message_from_bytes
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes.responses import PATHSEND_EXTENSION, ZEROCOPY_EXTENSION, SendfileResponse
+
+DATA = bytes(range(256)) * 1000
+STRATEGIES = [{}, {PATHSEND_EXTENSION: {}}, {ZEROCOPY_EXTENSION: {}}]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+def _serve(response: SendfileResponse, extensions: dict):
+    """Runs the response against a fake ASGI server implementing the advertised extensions."""
+    messages = []
+
+    async def send(message):
+        if message["type"] == ZEROCOPY_EXTENSION:
+            # The server would call os.sendfile on the descriptor
+            body = os.pread(message["file"].fileno(), message["count"], message["offset"])
+            message = {"type": "http.response.body", "body": body, "more_body": message["more_body"]}
+        elif message["type"] == PATHSEND_EXTENSION:
+            with open(message["path"], "rb") as f:
+                message = {"type": "http.response.body", "body": f.read(), "more_body": False}
+        messages.append(message)
+
+    asyncio.run(response({"type": "http", "extensions": extensions}, None, send))
+    start, body = messages[0], messages[1:]
+    assert not body[-1]["more_body"]
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    return start["status"], headers, b"".join(message["body"] for message in body)
+
+
+@pytest.mark.parametrize("extensions", STRATEGIES)
+def test_full_file_is_sent(path, extensions):
+    status, headers, body = _serve(SendfileResponse(path, len(DATA)), extensions)
+
+    assert status == 200
+    assert body == DATA
+    assert headers["content-length"] == str(len(DATA))
+
+
+@pytest.mark.parametrize("extensions", STRATEGIES)
+def test_single_range_is_sent_as_partial_content(path, extensions):
+    status, headers, body = _serve(SendfileResponse(path, len(DATA), "bytes=1000-70999"), extensions)
+
+    assert status == 206
+    assert body == DATA[1000:71000]
+    assert headers["content-range"] == f"bytes 1000-70999/{len(DATA)}"
+    assert headers["content-length"] == str(len(body))
+
+
+@pytest.mark.parametrize("extensions", STRATEGIES)
+def test_multiple_ranges_are_sent_as_multipart_byteranges(path, extensions):
+    status, headers, body = _serve(SendfileResponse(path, len(DATA), "bytes=0-9,100000-"), extensions)
+
+    assert status == 206
+    assert headers["content-length"] == str(len(body))
+    message = message_from_bytes(f"Content-Type: {headers['content-type']}\r\n\r\n".encode() + body)
+    parts = message.get_payload()
+    assert [part["Content-Range"] for part in parts] == [
+        f"bytes 0-9/{len(DATA)}", f"bytes 100000-{len(DATA) - 1}/{len(DATA)}"
+    ]
+    assert [part.get_payload(decode=True) for part in parts] == [DATA[:10], DATA[100000:]]
+
+
+def test_file_removed_before_sending_is_not_found(path):
+    response = SendfileResponse(path, len(DATA))
+    os.remove(path)
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(response({"type": "http", "extensions": {PATHSEND_EXTENSION: {}}}, None, send))
+    assert error.value.status_code == 404
+    assert messages == []
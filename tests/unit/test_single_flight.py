@@ -0,0 +1,108 @@
+import asyncio
+
+from app.storage_backends.base_interface import StoredObject
+from app.storage_backends.coalescing_storage import CoalescingStorage
+from app.storage_backends.single_flight import SingleFlight, StreamFlight
+
+
+class FakeBackend:
+    """Minimal backend counting how often content is read."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.reads = 0
+
+    async def iter_chunks(self, obj, offset=0, length=None, chunk_size=100):
+        self.reads += 1
+        end = len(self.data) if length is None else offset + length
+        for start in range(offset, end, chunk_size):
+            await asyncio.sleep(0)
+            yield self.data[start:min(start + chunk_size, end)]
+
+
+async def _read(storage, obj, pause=0.0):
+    out = b""
+    async for chunk in storage.iter_chunks(obj, chunk_size=100):
+        out += chunk
+        await asyncio.sleep(pause)
+    return out
+
+
+def test_single_flight_shares_result():
+    calls = []
+
+    async def lookup():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "meta"
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(*[flight.do(1, lookup) for _ in range(5)])
+
+    assert asyncio.run(run()) == ["meta"] * 5
+    assert len(calls) == 1
+
+
+def test_concurrent_downloads_share_one_backend_stream():
+    data = bytes(range(256)) * 20
+    backend = FakeBackend(data)
+    storage = CoalescingStorage(backend, window=4)
+    obj = StoredObject(1, "model.gltf", None, len(data))
+
+    async def run():
+        return await asyncio.gather(*[_read(storage, obj) for _ in range(10)])
+
+    assert all(result == data for result in asyncio.run(run()))
+    assert backend.reads == 1
+
+
+def test_slow_reader_is_detached_and_resumes():
+    data = bytes(range(256)) * 20
+    backend = FakeBackend(data)
+    storage = CoalescingStorage(backend, window=2)
+    obj = StoredObject(1, "model.gltf", None, len(data))
+
+    async def run():
+        return await asyncio.gather(_read(storage, obj), _read(storage, obj, pause=0.01))
+
+    assert all(result == data for result in asyncio.run(run()))
+    assert backend.reads == 2
+
+
+def test_flight_is_not_joinable_after_last_subscriber_leaves():
+    closed = []
+
+    async def source():
+        while True:
+            await asyncio.sleep(0.01)
+            yield b"x"
+
+    async def run():
+        flight = StreamFlight(source(), 4, lambda: closed.append(1))
+        queue = flight.subscribe()
+        await asyncio.sleep(0)
+        flight.unsubscribe(queue)
+        # Joining before the cancelled producer has run its cleanup
+        late = flight.subscribe()
+        await asyncio.sleep(0.02)
+        return late
+
+    assert asyncio.run(run()) is None
+    assert closed == [1]
+
+
+def test_download_after_last_reader_left_starts_new_stream():
+    data = bytes(range(256)) * 20
+    backend = FakeBackend(data)
+    storage = CoalescingStorage(backend, window=4)
+    obj = StoredObject(1, "model.gltf", None, len(data))
+
+    async def run():
+        stream = storage.iter_chunks(obj, chunk_size=100)
+        await stream.__anext__()
+        await stream.aclose()
+        return await asyncio.wait_for(_read(storage, obj), timeout=1)
+
+    assert asyncio.run(run()) == data
+    assert backend.reads == 2
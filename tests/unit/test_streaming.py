@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+import io
+
+from fastapi import UploadFile
+
+from app.storage_backends.streaming import IngestStream
+
+
+async def _consume(stream: IngestStream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+def test_ingest_stream_measures_size_and_hash():
+    # Arrange
+    data = b"glTF" * 1000
+    stream = IngestStream.from_bytes(data, chunk_size=333)
+
+    # Act
+    consumed = asyncio.run(_consume(stream))
+
+    # Assert
+    assert consumed == data
+    assert stream.size == len(data)
+    assert stream.length == len(data)
+    assert stream.content_hash == hashlib.sha256(data).hexdigest()
+
+
+def test_ingest_stream_empty_payload():
+    # Arrange
+    stream = IngestStream.from_bytes(b"")
+
+    # Act
+    consumed = asyncio.run(_consume(stream))
+
+    # Assert
+    assert consumed == b""
+    assert stream.size == 0
+    assert stream.content_hash == hashlib.sha256(b"").hexdigest()
+
+
+def test_received_upload_is_hashed_before_streaming():
+    # Arrange
+    data = b"glb" * 5000
+    upload = UploadFile(io.BytesIO(data), filename="model.glb")
+
+    # Act
+    async def act():
+        stream = await IngestStream.from_received_upload(upload, chunk_size=1000)
+        known = stream.known_hash
+        return known, await _consume(stream)
+
+    known, consumed = asyncio.run(act())
+
+    # Assert
+    assert known == hashlib.sha256(data).hexdigest()
+    assert consumed == data
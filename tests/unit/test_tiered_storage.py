@@ -0,0 +1,247 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models import Base, Item, RetiredObject
+from app.storage_backends import tiered_storage
+from app.storage_backends.base_interface import StoredObject
+from app.storage_backends.cached_storage import CachedStorage
+from app.storage_backends.db_storage import DBStorage
+from app.storage_backends.object_cache import ObjectCache
+from app.storage_backends.tiered_storage import TieredStorage, plan_moves
+
+NOW = 10000
+DATA = b"glTF" * 1000
+
+
+class FakeTier:
+    """In-memory tier holding objects by location; ``on_write`` runs after each write."""
+
+    def __init__(self, storage_type: str, prefix: str):
+        self.storage_type = storage_type
+        self.prefix = prefix
+        self.objects = {}
+        self.on_write = None
+
+    async def handle(self, meta):
+        return StoredObject(
+            meta.id, meta.filename, meta.path_or_key, len(self.objects[meta.path_or_key]),
+            storage_type=self.storage_type
+        )
+
+    def item_location(self, item_id, filename):
+        return f"{self.prefix}/{item_id}_{filename}"
+
+    async def write_object(self, location, stream):
+        self.objects[location] = b"".join([chunk async for chunk in stream])
+        if self.on_write:
+            await self.on_write()
+
+    async def remove_object(self, location):
+        self.objects.pop(location, None)
+
+    async def iter_chunks(self, obj, offset=0, length=None, chunk_size=1000):
+        data = self.objects[obj.location]
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Binds TieredStorage to a fresh SQLite database; returns its session factory."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tiers.db'}")
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    monkeypatch.setattr(tiered_storage, "SessionLocal", sessions)
+    yield sessions
+    asyncio.run(engine.dispose())
+
+
+def _tiers():
+    hot, cold = FakeTier("file", "/data/items"), FakeTier("minio", "items")
+    cold.objects["items/1_model.glb"] = DATA
+    return hot, cold
+
+
+async def _add_item(sessions) -> int:
+    async with sessions() as db:
+        item = Item(
+            name="model.glb", filename="model.glb", storage_type="minio",
+            path_or_key="items/1_model.glb", size_bytes=len(DATA)
+        )
+        db.add(item)
+        await db.commit()
+        return item.id
+
+
+async def _placement(sessions, item_id):
+    async with sessions() as db:
+        item = await db.get(Item, item_id)
+        return item.storage_type, item.path_or_key
+
+
+async def _retired(sessions):
+    async with sessions() as db:
+        rows = (await db.execute(select(RetiredObject))).scalars().all()
+        return [(row.storage_type, row.location) for row in rows]
+
+
+def test_cold_hot_items_are_demoted_once_settled():
+    hot = [(1, 100, 0.0, 0), (2, 100, 0.5, NOW), (3, 100, 8.0, 0)]
+    demote, promote = plan_moves(hot, [], 300, 1000, 5.0, 1.0, NOW - 100)
+    assert demote == [1]
+    assert promote == []
+
+
+def test_hot_tier_over_budget_demotes_fewest_hits_first():
+    hot = [(1, 400, 3.0, NOW), (2, 400, 4.0, NOW), (3, 400, 9.0, NOW)]
+    demote, _ = plan_moves(hot, [], 1200, 800, 5.0, 1.0, 0)
+    assert demote == [1]
+
+
+def test_promotions_fill_the_budget():
+    cold = [(7, 300, 20.0, NOW), (8, 300, 10.0, NOW), (9, 300, 6.0, NOW)]
+    demote, promote = plan_moves([], cold, 200, 800, 5.0, 1.0, 0)
+    assert demote == []
+    assert promote == [7, 8]
+
+
+def test_promotion_displaces_much_colder_items():
+    hot = [(1, 500, 2.0, NOW), (2, 500, 9.0, NOW)]
+    cold = [(7, 400, 10.0, NOW)]
+    demote, promote = plan_moves(hot, cold, 1000, 1000, 5.0, 1.0, 0)
+    assert demote == [1]
+    assert promote == [7]
+
+
+def test_promotion_does_not_displace_comparable_items():
+    hot = [(1, 500, 6.0, NOW), (2, 500, 9.0, NOW)]
+    cold = [(7, 400, 10.0, NOW)]
+    assert plan_moves(hot, cold, 1000, 1000, 5.0, 1.0, 0) == ([], [])
+
+
+def test_downloads_served_from_the_object_cache_are_counted():
+    # Arrange
+    tiered = TieredStorage(hot=None, cold=None)
+    cache = ObjectCache(max_bytes=100)
+    obj = StoredObject(7, "model.glb", "items/7_model.glb", 10, storage_type="file")
+    cache.put(7, obj, b"x" * 10)
+    storage = CachedStorage(tiered, cache)
+
+    # Act
+    for _ in range(3):
+        handle = asyncio.run(storage.open_file(None, 7))
+        storage.record_access(handle)
+
+    # Assert
+    assert cache.stats()["hits"] == 3
+    assert tiered.counter.stats()["counted"] == 3
+    assert len(tiered.counter) == 1
+
+
+def test_move_switches_the_item_and_retires_the_old_copy(database):
+    # Arrange
+    hot, cold = _tiers()
+
+    async def scenario():
+        item_id = await _add_item(database)
+        moved = await TieredStorage(hot, cold, grace=0).move(item_id, "file")
+        placement = await _placement(database, item_id)
+        retired = await _retired(database)
+        # Another process (e.g. after a restart) sweeps the persisted record
+        await TieredStorage(hot, cold)._remove_retired()
+        return moved, placement, retired, await _retired(database)
+
+    # Act
+    moved, placement, retired, remaining = asyncio.run(scenario())
+
+    # Assert
+    assert moved == len(DATA)
+    assert placement == ("file", "/data/items/1_model.glb")
+    assert hot.objects["/data/items/1_model.glb"] == DATA
+    assert retired == [("minio", "items/1_model.glb")]
+    assert remaining == []
+    assert cold.objects == {}
+
+
+def test_move_losing_a_race_discards_the_copy(database):
+    # Arrange: the item is moved elsewhere while its content is being copied
+    hot, cold = _tiers()
+
+    async def move_concurrently():
+        async with database() as db:
+            await db.execute(update(Item).values(path_or_key="items/1_model_v2.glb"))
+            await db.commit()
+
+    hot.on_write = move_concurrently
+
+    async def scenario():
+        item_id = await _add_item(database)
+        storage = TieredStorage(hot, cold, grace=0)
+        moved = await storage.move(item_id, "file")
+        retired = await _retired(database)
+        await storage._remove_retired()
+        return moved, await _placement(database, item_id), retired, await _retired(database)
+
+    # Act
+    moved, placement, retired, remaining = asyncio.run(scenario())
+
+    # Assert
+    assert moved == 0
+    assert placement == ("minio", "items/1_model_v2.glb")
+    assert retired == [("file", "/data/items/1_model.glb")]
+    assert remaining == []
+    assert hot.objects == {}
+    assert cold.objects == {"items/1_model.glb": DATA}
+
+
+def test_retired_copy_referenced_again_is_kept(database):
+    # Arrange
+    hot, cold = _tiers()
+
+    async def scenario():
+        await _add_item(database)
+        storage = TieredStorage(hot, cold)
+        await storage._retire("minio", "items/1_model.glb", due=0)
+
+        # Act
+        await storage._remove_retired()
+        return await _retired(database), storage.removed_copies
+
+    retired, removed_copies = asyncio.run(scenario())
+
+    # Assert
+    assert retired == []
+    assert removed_copies == 0
+    assert cold.objects == {"items/1_model.glb": DATA}
+
+
+def test_items_stored_in_the_database_are_served_in_place(database):
+    # Arrange
+    hot, cold = _tiers()
+    storage = TieredStorage(hot, cold, db=DBStorage())
+
+    async def scenario():
+        async with database() as db:
+            item = Item(name="a.bin", filename="a.bin", storage_type="db", content=DATA, size_bytes=len(DATA))
+            db.add(item)
+            await db.commit()
+
+            # Act
+            obj = await storage.open_file(db, item.id)
+            moved = await storage.move(item.id, "file")
+        return obj, moved
+
+    obj, moved = asyncio.run(scenario())
+
+    # Assert
+    assert (obj.storage_type, obj.size) == ("db", len(DATA))
+    assert moved == 0
+    assert hot.objects == {}
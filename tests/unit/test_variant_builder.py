@@ -0,0 +1,49 @@
+import asyncio
+
+from app.services import variant_builder
+from app.services.variant_builder import VariantBuilder
+from app.storage_backends.base_interface import StoredObject
+
+
+class FakeStorage:
+    async def open_variant(self, db, item_id, variant):
+        return None
+
+
+class FailingBuilder(VariantBuilder):
+    def __init__(self):
+        super().__init__(FakeStorage(), ["small"], at_ingest=False)
+        self.attempts = 0
+
+    async def _derive(self, obj, variant):
+        self.attempts += 1
+        raise ValueError("cannot process")
+
+
+def test_failed_build_is_retried_after_a_while(monkeypatch):
+    builder = FailingBuilder()
+    obj = StoredObject(1, "model.glb", "model.glb", 10)
+
+    async def run():
+        assert await builder.lookup(obj, "small", wait=True) is None
+        assert await builder.lookup(obj, "small", wait=True) is None
+        attempts = builder.attempts
+        monkeypatch.setattr(variant_builder, "RETRY_FAILED_AFTER", 0)
+        await builder.lookup(obj, "small", wait=True)
+        return attempts
+
+    assert asyncio.run(run()) == 1
+    assert builder.attempts == 2
+
+
+def test_forget_drops_failures_of_deleted_items():
+    builder = FailingBuilder()
+    obj = StoredObject(1, "model.glb", "model.glb", 10)
+
+    async def run():
+        await builder.lookup(obj, "small", wait=True)
+        builder.forget(1)
+        await builder.lookup(obj, "small", wait=True)
+
+    asyncio.run(run())
+    assert builder.attempts == 2